@@ -0,0 +1,50 @@
+#################################
+##          SCENARIOS          ##
+#################################
+
+# Scaled down versions of simulations/*, all seeds are fixed
+# Params:
+#    data: length of data in sec and seeds passed to createSpikeTrainFromPatterns (dict)
+#    simTime: simulated time with learning in sec (float)
+#    modelParams: overwrite NETWORK_PARAMS of the simulation (dict)
+SCENARIOS = dict(
+    bars=dict(
+        data=dict(length=20., patternSeed=6868348, pdSeed=3451734, spikeTrainSeed=1234),
+        simTime=10.,
+        modelParams=dict(NUMEXC=100, NUMINH=25),
+    ),
+    oriented_bars=dict(
+        data=dict(length=20., patternSeed=7, pdSeed=3451734, spikeTrainSeed=1234),
+        simTime=5.,
+        modelParams=dict(NUMEXC=100, NUMINH=25),
+    ),
+    stp=dict(
+        data=dict(length=5., patternSeed=6868348, pdSeed=3451734, spikeTrainSeed=1234),
+        simTime=2.,
+        modelParams=dict(NUMEXC=100, NUMINH=25),
+    ),
+)
+
+BACKENDS = dict(                 # network model used for each backend, NEST stages are skipped if NEST is not installed
+    numpy="swta_numpy",
+    nest="swta",
+)
+
+
+#################################
+##       IMPORT TIME BUDGET    ##
+#################################
+
+IMPORT_MODULES = ['eim.settings_loader', 'eim.simulator', 'eim.network', 'eim.analysis', 'eim.plot']
+LAZY_MODULES = ['nest', 'matplotlib', 'scipy']   # must not be imported by IMPORT_MODULES
+IMPORT_TIME_BUDGET = 1.0                         # in sec
+
+
+#################################
+##       HISTORY / BASELINE    ##
+#################################
+
+WORK_PATH = "work/"                       # data and results of scenarios
+HISTORY_FILE = "results/history.jsonl"    # one line (JSON) per benchmark run
+BASELINE_FILE = "results/baseline.json"   # run to compare with, saved with --save-baseline
+THRESHOLD = 1.25                          # wall time or peak memory growing by more than this factor is a regression
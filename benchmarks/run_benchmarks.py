@@ -0,0 +1,82 @@
+"""
+Runs scaled down scenarios of simulations (data creation, simulation with each backend, analysis)
+and checks import time. Results are appended to history and compared with the baseline.
+
+usage: python3 run_benchmarks.py [--save-baseline] [scenario ...]
+"""
+import os
+import sys
+from eim.settings_loader import loadSettingsModule
+from eim import benchmark
+import stages
+
+benchmarkDir = os.path.dirname(os.path.realpath(__file__))
+repoDir = os.path.dirname(benchmarkDir)
+simulationsDir = os.path.join(repoDir, "simulations")
+
+
+def runScenario(name, scenario, bs):
+    scenarioDir = os.path.join(simulationsDir, name)
+    workDir = os.path.join(benchmarkDir, bs.WORK_PATH, name)
+    stages.prepareWorkDir(workDir, scenarioDir)
+
+    records = []
+    data = scenario['data']
+    records.append(benchmark.runStage(name, 'data', workDir, stages.createData, scenarioDir, data['length'],
+                                      data['patternSeed'], data['pdSeed'], data['spikeTrainSeed']))
+    for backend, model in sorted(bs.BACKENDS.items(), key=lambda b: b[0] != 'numpy'):
+        stage = 'simulate_' + backend
+        if backend == 'nest' and not benchmark.isNestAvailable():
+            records.append(benchmark.createRecord(name, stage, 'skipped', note="NEST not installed"))
+            records.append(benchmark.createRecord(name, 'analysis_' + backend, 'skipped', note="NEST not installed"))
+            continue
+        records.append(benchmark.runStage(name, stage, workDir, stages.simulateNetwork, scenarioDir, backend, model,
+                                          scenario['simTime'], scenario['modelParams']))
+        records.append(benchmark.runStage(name, 'analysis_' + backend, workDir, stages.analyseResults, scenarioDir, backend, model,
+                                          scenario['simTime'], scenario['modelParams']))
+    return records
+
+
+def runImport(bs):
+    importTime, loaded = benchmark.measureImportTime(bs.IMPORT_MODULES, bs.LAZY_MODULES)
+    status = 'ok' if importTime <= bs.IMPORT_TIME_BUDGET and not loaded else 'failed'
+    note = None
+    if status == 'failed':
+        note = "budget %.2f s, eagerly imported: %s" % (bs.IMPORT_TIME_BUDGET, ", ".join(loaded) or "-")
+    return benchmark.createRecord('all', 'import', status, wall=importTime, note=note)
+
+
+def main(args):
+    bs = loadSettingsModule(os.path.join(benchmarkDir, "benchmark_settings.py"))
+    saveBaseline = '--save-baseline' in args
+    names = [a for a in args if not a.startswith('--')] or list(bs.SCENARIOS.keys())
+
+    records = [runImport(bs)]
+    for name in names:
+        print("SCENARIO", name)
+        records += runScenario(name, bs.SCENARIOS[name], bs)
+
+    run = benchmark.createRun(records, repoDir)
+    historyFile = os.path.join(benchmarkDir, bs.HISTORY_FILE)
+    baselineFile = os.path.join(benchmarkDir, bs.BASELINE_FILE)
+    os.makedirs(os.path.dirname(historyFile), exist_ok=True)
+    benchmark.appendHistory(historyFile, run)
+    benchmark.printRecords(records)
+
+    failed = [r for r in records if r['status'] == 'failed']
+    if saveBaseline:
+        benchmark.saveBaseline(baselineFile, run)
+        print("Baseline saved:", baselineFile)
+        return 1 if failed else 0
+
+    baseline = benchmark.loadBaseline(baselineFile)
+    if baseline is None:
+        print("No baseline, save one with --save-baseline")
+        return 1 if failed else 0
+    regressions = benchmark.compareWithBaseline(run, baseline, bs.THRESHOLD)
+    benchmark.printRegressions(regressions, bs.THRESHOLD)
+    return 1 if failed or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,89 @@
+"""
+Stages of benchmark scenarios, each is run in a separate process with the scenario work folder
+as current directory and returns number of processed events (spikes).
+"""
+import os
+import shutil
+import numpy as np
+from eim.settings_loader import GeneralSettings, DataSettings, SimulationSettings, NetworkModelSettings
+from eim.common import DictClass
+from eim.data import loadData, saveData
+from eim.analysis import numberOfSpikesInTrain
+
+DATA_NAME = "benchmark"
+
+
+def prepareWorkDir(workDir, scenarioDir):
+    """
+    Creates work folder with data settings of the scenario (needed when data is loaded for simulation).
+    """
+    gs = GeneralSettings()
+    for path in (gs.dataPath, gs.resultsPath):
+        os.makedirs(os.path.join(workDir, path), exist_ok=True)
+    shutil.copy(os.path.join(scenarioDir, gs.dataPath + gs.dataSettings), os.path.join(workDir, gs.dataPath + gs.dataSettings))
+
+
+def getResultName(backend):
+    gs = GeneralSettings()
+    return gs.resultsPath + DATA_NAME + "_" + backend
+
+
+def createData(scenarioDir, length, patternSeed, pdSeed, spikeTrainSeed):
+    from eim.spike_train import createSpikeTrainFromPatterns
+    gs = GeneralSettings()
+    ds = DataSettings(gs.dataPath + gs.dataSettings)
+    train, pg = createSpikeTrainFromPatterns(ds, length, patternSeed=patternSeed, pdSeed=pdSeed, spikeTrainSeed=spikeTrainSeed)
+    train.patterns = None
+    saveData(gs.dataPath + DATA_NAME + gs.dataExt,
+             patternShape=ds.patternShape, nPatterns=ds.nPatterns, nChannels=ds.nChannels, train=train, length=length)
+    return numberOfSpikesInTrain(train.spikes)
+
+
+def simulateNetwork(scenarioDir, backend, model, simTime, modelParams):
+    from eim.simulation_chain import SimulationChainData
+    from eim.simulator import simulate
+    gs = GeneralSettings()
+    ss = SimulationSettings(os.path.join(scenarioDir, gs.simulationSettings))
+    ss.model = model
+    ss.modelAdditionalParams = dict(ss.modelAdditionalParams, **modelParams)
+    ss.showLearningProgress = False
+    ss.batchReplicas = None
+    chain = [DictClass(dict(data=gs.dataPath + DATA_NAME, simTime=simTime, learning=True, result=getResultName(backend), init=None,
+                            connectivity=None))]
+    scd = SimulationChainData(gs, chain)
+    ms = NetworkModelSettings(gs, ss.model, ss.modelAdditionalParams)
+    simulate(gs, ss, ms, scd)
+
+    r = scd.getResult(getResultName(backend))
+    inputSpikes = sum(np.count_nonzero(np.asarray(s) < simTime) for s in scd.getSimulationsData()[0].train.spikes)
+    return inputSpikes + sum(numberOfSpikesInTrain(spikes) for spikes in r['spikes'].values())
+
+
+def analyseResults(scenarioDir, backend, model, simTime, modelParams):
+    from eim.analysis import getActiveNeurons, getSpecializedNeurons, mapNeuronToPattern, groupNeuronsBySpecialization, \
+        convolveEventLists
+    from eim.measures import spikePrecisionMeasure, spikeF1Measure
+    from eim.spike_train import train_sec2ms
+    from eim.psp import createPSPShape
+    gs = GeneralSettings()
+    ss = SimulationSettings(os.path.join(scenarioDir, gs.simulationSettings))
+    ms = NetworkModelSettings(gs, model, dict(ss.modelAdditionalParams, **modelParams))
+    ds = DataSettings(gs.dataPath + gs.dataSettings)
+    r = DictClass(loadData(getResultName(backend) + gs.resultsExt))
+    d = DictClass(loadData(gs.dataPath + DATA_NAME + gs.dataExt))
+
+    spikesE_ms = train_sec2ms(r.spikes['e'])
+    simtime_ms = int(simTime * 1000)
+    tau_steps = int(np.ceil(ms.settings.REFRACTORY_E / 1000. / ss.dt))
+    pd, patlen = d.train.pd, d.train.patlen
+
+    precision = spikePrecisionMeasure(pd, patlen, spikesE_ms, simtime_ms, tau_steps)
+    active_neurons = getActiveNeurons(spikesE_ms, minSpikes=2)
+    spec, nonspec = getSpecializedNeurons(precision, 0.8, 0.7, active_neurons)
+    n2p = mapNeuronToPattern(precision, ds.patternIDs, thresh=0.8)
+    groups = groupNeuronsBySpecialization(n2p, spec, precision)
+    spikeF1Measure(pd, patlen, spikesE_ms, simtime_ms, tau_steps, groups)
+
+    psp = createPSPShape({'shape': "doubleexp", 'maxvalue': 1., 'trise': 1e-3, 'tfall': 20e-3, 'duration': 200e-3}, 1e-3)
+    convolveEventLists(spikesE_ms, simtime_ms, psp)
+    return numberOfSpikesInTrain(spikesE_ms)
@@ -0,0 +1,61 @@
+"""
+Checks batched simulation (eim.network_numpy.BatchedNumpyNetwork): replica k of a batch has to give the same
+spikes and weights as the network simulated alone with simulation seed SIMULATION_SEED + k. Replicas differ in
+general seed and learning rate, the swta_numpy model of simulations/bars is scaled down.
+
+usage: python3 validate_batch.py [simTime in sec]
+"""
+import os
+import sys
+import copy
+import numpy as np
+from eim.settings_loader import GeneralSettings, SimulationSettings, NetworkModelSettings
+from eim.network import findPool
+from eim.network_numpy import NumpyNetwork, BatchedNumpyNetwork
+
+NCHANNELS = 64
+INPUT_RATE = 20.        # Hz
+MODEL_PARAMS = dict(NUMEXC=40, NUMINH=10)
+REPLICAS = [dict(), dict(GENERAL_SEED=5), dict(ETA=0.1)]   # NETWORK_PARAMS overrides of each replica
+
+
+def createModelSettings(gs, params):
+    ms = NetworkModelSettings(gs, 'swta_numpy', dict(MODEL_PARAMS, **params))
+    findPool(ms.pools, 'in')['N'] = NCHANNELS
+    findPool(ms.pools, 'in_')['N'] = NCHANNELS
+    return ms
+
+
+def run(net, spikes, simTime):
+    net.simulate(0., spikes)
+    net.setLearning(True, 'in', 'e')
+    net.simulate(simTime, None, reset=False)
+
+
+def main(args):
+    simTime = float(args[0]) if args else 2.
+    os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'simulations', 'bars'))
+    gs = GeneralSettings()
+    ss = SimulationSettings(gs.simulationSettings)
+    rng = np.random.default_rng(3)
+    spikes = [np.unique(rng.integers(1, int(simTime * 1000), int(simTime * INPUT_RATE))) * 1e-3
+              for _ in range(NCHANNELS)]
+
+    batch = BatchedNumpyNetwork(ss, [createModelSettings(gs, params) for params in REPLICAS])
+    run(batch, spikes, simTime)
+    ok = True
+    for k, params in enumerate(REPLICAS):
+        single = copy.copy(ss)
+        single.simulationRNGSeed = ss.simulationRNGSeed + k
+        net = NumpyNetwork(single, createModelSettings(gs, params))
+        run(net, spikes, simTime)
+        a, b = net.getAllSpikes(), batch.getAllSpikes(k)
+        same = (all(np.array_equal(x, y) for pool in a for x, y in zip(a[pool], b[pool])) and
+                np.array_equal(net.getShapedWeights('in', 'e'), batch.getShapedWeights('in', 'e', k)))
+        ok &= same
+        print("replica %d %-20s %d spikes  %s" % (k, params, sum(len(s) for s in a['e']), 'ok' if same else 'FAILED'))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,117 @@
+"""
+Checks chunked data sets (eim.dataset): a data set created with length L1 and extended to L2 has to be identical
+to the data set created with length L2 at once (pattern onsets and spikes), patterns have to continue across
+chunk boundaries, and the input rate has to match the data created by createSpikeTrainFromPatterns. The spike file
+written chunk by chunk has to equal the one written from the whole train, and a chain entry reading its input from
+the spike file (spikeFile, spikes of data are not loaded) has to give the same results as one with the data spikes
+(NumPy backend, scaled down swta model).
+
+usage: python3 validate_dataset.py [simulation name]
+"""
+import os
+import sys
+import copy
+import shutil
+import tempfile
+import numpy as np
+from eim.settings_loader import DataSettings
+from eim.spike_train import createSpikeTrainFromPatterns
+from eim.dataset import ChunkedDataset
+from eim.analysis import numberOfSpikesInTrain
+from eim.spike_file import writeSpikeFile
+
+CHUNK = 10.             # chunk duration in sec
+LENGTH = 25.            # length of data set before extension in sec
+EXTENSION = 15.         # extension in sec
+SEEDS = dict(patternSeed=1, pdSeed=2, spikeTrainSeed=3)
+RATE_TOLERANCE = 0.05   # relative difference of input rate to unchunked data
+SIM_TIME = 2.           # simulation of chain entry in sec
+MODEL_PARAMS = dict(NUMEXC=40, NUMINH=10)
+
+
+def sameTrains(a, b):
+    return (a.duration == b.duration and a.pd == b.pd and
+            all(np.array_equal(x, y) for x, y in zip(a.spikes, b.spikes)))
+
+
+def simulateEntry(simulationDir, data, spikeFile):
+    """
+    Simulates learning chain entry on data (NumPy backend), returns result.
+    """
+    from eim.common import DictClass
+    from eim.settings_loader import GeneralSettings, SimulationSettings, NetworkModelSettings
+    from eim.simulation_chain import SimulationChainData
+    from eim.simulator import simulate
+    gs = GeneralSettings()
+    ss = copy.copy(SimulationSettings(os.path.join(simulationDir, gs.simulationSettings)))
+    ss.showLearningProgress = False
+    ss.batchReplicas = None
+    ss.weightTrajectory = None
+    ss.membraneRecording = None
+    chain = [DictClass(dict(data=data, simTime=SIM_TIME, learning=True, result='validate', init=None, connectivity=None,
+                            spikeFile=spikeFile))]
+    scd = SimulationChainData(gs, chain)
+    simulate(gs, ss, NetworkModelSettings(gs, 'swta_numpy', MODEL_PARAMS), scd, save=False)
+    return scd.getResult('validate')
+
+
+def sameResults(a, b):
+    return (np.array_equal(a['finalW'], b['finalW']) and sorted(a['spikes']) == sorted(b['spikes']) and
+            all(np.array_equal(x, y) for pool in a['spikes'] for x, y in zip(a['spikes'][pool], b['spikes'][pool])))
+
+
+def main(args):
+    name = args[0] if args else 'bars'
+    root = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'simulations')
+    ds = DataSettings(os.path.join(root, name, 'data', 'data_settings.py'))
+    folder = tempfile.mkdtemp()
+    ok = True
+    try:
+        extended = ChunkedDataset.create(os.path.join(folder, 'extended'), ds, LENGTH, CHUNK, **SEEDS)
+        extended.extend(EXTENSION)
+        whole = ChunkedDataset.create(os.path.join(folder, 'whole'), ds, LENGTH + EXTENSION, CHUNK, **SEEDS)
+        a, b = ChunkedDataset(extended.path).toTrain(), whole.toTrain()
+        same = sameTrains(a, b)
+        ok &= same
+        print("extended %g s + %g s == created %g s: %s" % (LENGTH, EXTENSION, LENGTH + EXTENSION, same))
+
+        # tails: patterns of a chunk continue in the next one
+        chunks = list(whole.iterChunks())
+        continued = sum(len(ts) for c in chunks[1:] for ts in c['tails'].values())
+        ended = all(t < c['start'] and t + whole.manifest['patlen'][str(ID)] > c['start']
+                    for c in chunks[1:] for ID, ts in c['tails'].items() for t in ts)
+        ok &= ended
+        print("patterns continued in next chunk: %d %s" % (continued, 'ok' if ended else 'FAILED'))
+
+        train, pg = createSpikeTrainFromPatterns(ds, LENGTH + EXTENSION, **SEEDS)
+        rateChunked = numberOfSpikesInTrain(b.spikes) / (LENGTH + EXTENSION) / ds.nChannels
+        rate = numberOfSpikesInTrain(train.spikes) / (LENGTH + EXTENSION) / ds.nChannels
+        rateOk = abs(rateChunked - rate) <= RATE_TOLERANCE * rate
+        ok &= rateOk
+        print("input rate %.2f Hz, unchunked %.2f Hz %s" % (rateChunked, rate, 'ok' if rateOk else 'FAILED'))
+
+        whole.writeSpikeFile(os.path.join(folder, 'chunked.spk'))
+        writeSpikeFile(os.path.join(folder, 'train.spk'), b.spikes)
+        with open(os.path.join(folder, 'chunked.spk'), 'rb') as f, open(os.path.join(folder, 'train.spk'), 'rb') as g:
+            sameFile = f.read() == g.read()
+        ok &= sameFile
+        print("spike file written chunk by chunk == written from train: %s" % sameFile)
+
+        # chain entries of data set, data settings are next to it
+        os.makedirs(os.path.join(folder, 'data'))
+        shutil.copy(os.path.join(root, name, 'data', 'data_settings.py'), os.path.join(folder, 'data'))
+        shutil.move(whole.path, os.path.join(folder, 'data', 'whole.chunks'))
+        data = os.path.join(folder, 'data', 'whole')
+        spikeFile = os.path.join(folder, 'data', 'whole.spk')
+        withSpikes = simulateEntry(os.path.join(root, name), data, None)
+        withFile = simulateEntry(os.path.join(root, name), data, spikeFile)
+        sameResult = os.path.exists(spikeFile) and sameResults(withSpikes, withFile)
+        ok &= sameResult
+        print("simulation with spike file created from data set == with data spikes: %s" % sameResult)
+    finally:
+        shutil.rmtree(folder)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,106 @@
+"""
+Compares the data pipeline (spike_train, patterns, analysis, measures) run with the compact dtypes of eim.dtypes
+(float32 rates and traces, int32 indices, bit-packed masks) and with float64 / int64: data of each simulation
+(simulations/<name>/data/data_settings.py) is created with the same seeds under both policies. Pattern schedules
+and masks have to be equal, rates and traces equal within float32 tolerance, spikes may only differ where a
+random number falls between the float32 and float64 rate (very rare), measures of the input spikes have to agree.
+
+usage: python3 validate_dtypes.py [train length in sec]
+"""
+import os
+import sys
+import numpy as np
+from eim import dtypes
+from eim.settings_loader import DataSettings
+from eim.spike_train import createSpikeTrainFromPatterns, train_sec2ms
+from eim.analysis import convolveEventLists, countSpikesForNonoverlappingPatterns
+from eim.measures import spikePrecisionMeasure
+from eim.psp import createPSPShape
+
+SIMULATIONS = ['bars', 'oriented_bars', 'stp']
+SEEDS = dict(patternSeed=1, pdSeed=2, spikeTrainSeed=3)
+RTOL = 1e-5             # relative tolerance of rates and traces
+MAX_SPIKE_DIFF = 1e-4   # max fraction of spikes which may differ
+PSP = dict(shape='doubleexp', duration=0.1, type='additive', maxvalue=1., trise=1e-3, tfall=10e-3)
+
+
+def createData(ds, length, compact):
+    """
+    Returns rates (with noise), spikes in ms, pattern distribution, masks, traces, measures and bytes of rates and
+    masks of data created with given policy.
+    """
+    dtypes.setPolicy(compact)
+    train, pg = createSpikeTrainFromPatterns(ds, length, createSpikes=False, **SEEDS)
+    sc = train.schedule
+    np.random.seed(sc['seed'])
+    train.combinePatterns(sc['combineRules'])
+    train.addFillNoise(sc['maxPatterns'], sc['fillNoiseRate'], False, False)
+    train.addInbetweenNoise(sc['inbetweenNoiseRate'])
+    rates = np.array(train.rates + train.noise if train.noiseset else train.rates, dtype=float)
+    nbytes = pg.patterns.nbytes + pg.masks.nbytes + train.rates.nbytes + (train.noise.nbytes if train.noiseset else 0)
+    train.createSpikes()
+
+    spikes_ms = train_sec2ms(train.spikes)
+    duration = train.duration
+    pd = train.pd
+    patlen = train.patlen
+    psp = createPSPShape(PSP, ds.dt)
+    result = dict(
+        rates=rates,
+        spikes=spikes_ms,
+        pd=pd,
+        masks=np.asarray(pg.masks),
+        traces=np.array(convolveEventLists(spikes_ms[:10], duration, psp), dtype=float),
+        precision=spikePrecisionMeasure(pd, patlen, spikes_ms, duration, 10),
+        response=countSpikesForNonoverlappingPatterns(spikes_ms, pd, patlen),
+    )
+    return result, nbytes
+
+
+def compare(name, a, b):
+    ok = True
+    messages = []
+    if a['pd'] != b['pd']:
+        ok = False
+        messages.append("schedules differ")
+    if not np.array_equal(a['masks'], b['masks']):
+        ok = False
+        messages.append("masks differ")
+    rateErr = np.abs(a['rates'] - b['rates']).max() / max(np.abs(a['rates']).max(), 1.)
+    ok &= rateErr <= RTOL
+
+    total = sum(len(ch) for ch in a['spikes'])
+    diff = sum(len(set(x) ^ set(y)) for x, y in zip(a['spikes'], b['spikes']))
+    ok &= diff <= MAX_SPIKE_DIFF * total
+
+    traceErr = np.abs(a['traces'] - b['traces']).max() / max(np.abs(a['traces']).max(), 1.)
+    if diff == 0:
+        ok &= traceErr <= RTOL
+        ok &= np.allclose(a['precision'], b['precision'], equal_nan=True)
+        ok &= np.array_equal(a['response'], b['response'])
+        messages.append("measures %s" % ('equal' if np.allclose(a['precision'], b['precision'], equal_nan=True) else 'differ'))
+
+    print("%-14s rate error %.1e  spikes differing %d / %d  trace error %.1e  %s  %s"
+          % (name, rateErr, diff, total, traceErr, ' '.join(messages), 'ok' if ok else 'FAILED'))
+    return ok
+
+
+def main(args):
+    length = float(args[0]) if args else 20.
+    root = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'simulations')
+    policy = dtypes.getPolicy()
+    ok = True
+    try:
+        for name in SIMULATIONS:
+            ds = DataSettings(os.path.join(root, name, 'data', 'data_settings.py'))
+            wide, wideBytes = createData(ds, length, False)
+            compact, compactBytes = createData(ds, length, True)
+            ok &= compare(name, wide, compact)
+            print("%-14s rates and masks %.1f MB -> %.1f MB" % ('', wideBytes / 1e6, compactBytes / 1e6))
+    finally:
+        dtypes.setPolicy(policy['PACK_MASKS'])
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
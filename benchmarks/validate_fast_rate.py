@@ -0,0 +1,88 @@
+"""
+Compares spikes of swta_neuron_dbl_exp and swta_neuron_dbl_exp_pop with the exact and the fast rate path (neuron
+parameter fast_rate): neurons of the excitatory and inhibitory pools of the swta model get the same random input
+and seed with both paths. Both paths draw the same random numbers, so spikes can only differ if a random number
+falls within the error of the approximated spike probability (relative error < 1e-10); the share of differing
+spikes has to stay below MAX_DIFFERING, firing rates and inter-spike intervals have to agree (two-sample tests,
+same pools as validate_thinning.py). Simulation times are the best of REPEATS runs taken in turns, single runs vary
+by more than the difference of both paths. Needs NEST with the swtamodule installed, the NumPy model has no fast path.
+
+usage: python3 validate_fast_rate.py [simTime in sec]
+"""
+import sys
+import time
+from eim import benchmark
+from validate_thinning import DT, NEURONS, INPUT_RATE, POOLS, compare
+
+MODELS = ('swta_neuron_dbl_exp', 'swta_neuron_dbl_exp_pop')
+MAX_DIFFERING = 1e-6    # share of spikes that may differ between exact and fast path
+REPEATS = 5             # simulations of each path, the fastest one is reported
+
+
+def simulateNest(model, params, weight, steps, fastRate, seed):
+    """
+    Returns list of spike steps of each neuron and wall time of simulation in sec.
+    """
+    import nest
+    nest.ResetKernel()
+    nest.set_verbosity('M_ERROR')
+    nest.SetKernelStatus({'resolution': DT, 'rng_seeds': [seed], 'grng_seed': seed + 1})
+    try:
+        nest.Install('swtamodule')
+    except nest.NESTError:
+        pass  # loaded already
+    neurons = nest.Create(model, NEURONS, dict(params, fast_rate=fastRate))
+    inputs = nest.Create('poisson_generator', NEURONS, {'rate': INPUT_RATE})
+    detector = nest.Create('spike_detector')
+    nest.Connect(inputs, neurons, 'one_to_one', {'weight': weight, 'delay': DT})
+    nest.Connect(neurons, detector)
+    start = time.perf_counter()
+    nest.Simulate(steps * DT)
+    wall = time.perf_counter() - start
+    events = nest.GetStatus(detector, 'events')[0]
+    spikes = [[] for _ in range(NEURONS)]
+    for sender, t in zip(events['senders'], events['times']):
+        spikes[sender - neurons[0]].append(int(round(t / DT)))
+    return spikes, wall
+
+
+def simulateRepeated(model, params, weight, steps, seed):
+    """
+    Returns spikes and shortest wall time in sec of exact and fast path. Both paths are simulated REPEATS times in
+    turns, so changing load of the machine affects them alike (spikes of repeated simulations are equal).
+    """
+    runs = [[simulateNest(model, params, weight, steps, fastRate, seed) for fastRate in (False, True)]
+            for _ in range(REPEATS)]
+    return [(runs[0][k][0], min(run[k][1] for run in runs)) for k in range(2)]
+
+
+def countDiffering(exact, fast):
+    """
+    Returns number of spikes of exact and fast path without a spike of the same neuron at the same step.
+    """
+    return sum(len(set(a) ^ set(b)) for a, b in zip(exact, fast))
+
+
+def main(args):
+    steps = int(float(args[0]) * 1000. / DT) if args else 20000
+    if not benchmark.isNestAvailable():
+        print("NEST not installed, nothing to validate")
+        return 0
+
+    ok = True
+    for model in MODELS:
+        for pool, (params, weight) in sorted(POOLS.items()):
+            (exact, wallExact), (fast, wallFast) = simulateRepeated(model, params, weight, steps, 11)
+            name = ('pop ' if model.endswith('_pop') else '') + pool
+            ok &= compare(name, exact, fast)
+            differing = countDiffering(exact, fast)
+            total = max(sum(len(s) for s in exact) + sum(len(s) for s in fast), 1)
+            same = differing <= MAX_DIFFERING * total
+            ok &= same
+            print("%-10s differing spikes %d of %d  simulation time %.3f / %.3f s (speedup %.2f)  %s"
+                  % ('', differing, total, wallExact, wallFast, wallExact / wallFast, 'ok' if same else 'FAILED'))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,121 @@
+"""
+Checks distributed simulation with MPI: spikes and weights gathered on rank 0 (eim.network.gatherArrays) have to
+equal those of a single process run. NEST gives the same results for the same number of virtual processes, so
+every run uses VIRTUAL_PROCESSES threads in total, shared between the ranks. The swta model of simulations/bars is
+scaled down. Also checks isRootRank, gatherArrays and getRankCpuAffinity on each rank. Needs NEST (built with MPI
+support for several ranks) with the swtamodule and mpi4py.
+
+usage: python3 validate_mpi.py [simTime in sec]              (single process, saves reference results)
+       mpirun -n 2 python3 validate_mpi.py [simTime in sec]  (compares with reference results)
+"""
+import os
+import sys
+import copy
+import pickle
+import numpy as np
+from eim import benchmark
+
+NCHANNELS = 64
+INPUT_RATE = 20.        # Hz
+MODEL_PARAMS = dict(NUMEXC=40, NUMINH=10)
+VIRTUAL_PROCESSES = 2   # threads of all ranks
+REFERENCE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'work', 'mpi_reference.pkl')
+
+
+def checkHelpers(nest):
+    """
+    Checks MPI helpers of eim.network on this rank, returns True if all agree.
+    """
+    from eim.network import isRootRank, gatherArrays, getRankCpuAffinity, getMPIComm
+    rank, ranks = nest.Rank(), nest.NumProcesses()
+    comm = getMPIComm()
+    roots = comm.allgather(isRootRank()) if comm is not None else [isRootRank()]
+    piece = np.arange(rank * 3, rank * 3 + 3)
+    gathered, = gatherArrays([piece])
+    everywhere, = gatherArrays([piece], allRanks=True)
+    return (roots == [True] + [False] * (ranks - 1) and
+            np.array_equal(gathered, np.arange(3 * ranks) if rank == 0 else piece[:0]) and
+            np.array_equal(everywhere, np.arange(3 * ranks)) and
+            getRankCpuAffinity([[r] for r in range(ranks)]) == [rank] and
+            getRankCpuAffinity([0, 1]) == [0, 1])
+
+
+def simulate(ss, ms, spikes, simTime):
+    """
+    Returns spikes of each pool (neuron indices and times in sec, sorted) and input weights, on rank 0.
+    """
+    from eim.network import Network
+    net = Network(ss, ms)
+    net.simulate(0., spikes)
+    net.setLearning(True, 'in', 'e')
+    net.simulate(simTime, None, reset=False)
+    result = {}
+    for pool, trains in net.getAllSpikes().items():
+        ids = np.concatenate([np.full(len(s), i) for i, s in enumerate(trains)])
+        times = np.concatenate([np.asarray(s, dtype=float) for s in trains])
+        order = np.lexsort((times, ids))
+        result[pool] = (ids[order], times[order])
+    return result, net.getShapedWeights('in', 'e')
+
+
+def main(args):
+    simTime = float(args[0]) if args else 2.
+    if not benchmark.isNestAvailable():
+        print("NEST not installed, nothing to validate")
+        return 0
+
+    import nest
+    from eim.settings_loader import GeneralSettings, SimulationSettings, NetworkModelSettings
+    from eim.network import findPool
+    os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'simulations', 'bars'))
+    rank, ranks = nest.Rank(), nest.NumProcesses()
+    gs = GeneralSettings()
+    ss = copy.copy(SimulationSettings(gs.simulationSettings))
+    ss.localNumThreads = VIRTUAL_PROCESSES // ranks
+    ss.cpuAffinity = None
+    ms = NetworkModelSettings(gs, 'swta', MODEL_PARAMS)
+    findPool(ms.pools, 'in')['N'] = NCHANNELS
+    findPool(ms.pools, 'in_')['N'] = NCHANNELS
+    rng = np.random.default_rng(3)
+    spikes = [np.unique(rng.integers(1, int(simTime * 1000), int(simTime * INPUT_RATE))) * 1e-3
+              for _ in range(NCHANNELS)]
+
+    helpersOk = checkHelpers(nest)
+    spikesByPool, weights = simulate(ss, ms, spikes, simTime)
+    print("rank %d of %d: helpers %s" % (rank, ranks, 'ok' if helpersOk else 'FAILED'))
+    if rank != 0:
+        return 0 if helpersOk else 1
+
+    if ranks == 1:
+        os.makedirs(os.path.dirname(REFERENCE), exist_ok=True)
+        with open(REFERENCE, 'wb') as f:
+            pickle.dump((simTime, VIRTUAL_PROCESSES, spikesByPool, weights), f)
+        print("reference results saved, now run the same with mpirun -n 2")
+        return 0 if helpersOk else 1
+
+    if not os.path.exists(REFERENCE):
+        print("Missing reference results, run: python3 validate_mpi.py first")
+        return 1
+    with open(REFERENCE, 'rb') as f:
+        refTime, refProcesses, refSpikes, refWeights = pickle.load(f)
+    if refTime != simTime:
+        print("Reference results were simulated for %s sec" % refTime)
+        return 1
+    if refProcesses != VIRTUAL_PROCESSES:
+        # NEST gives the same results only for the same number of virtual processes
+        print("Reference results were simulated with %d virtual processes" % refProcesses)
+        return 1
+
+    ok = helpersOk
+    for pool in sorted(refSpikes):
+        same = all(np.array_equal(a, b) for a, b in zip(refSpikes[pool], spikesByPool[pool]))
+        ok &= same
+        print("pool %-4s %6d spikes  %s" % (pool, len(refSpikes[pool][0]), 'ok' if same else 'FAILED'))
+    same = np.array_equal(refWeights, weights)
+    ok &= same
+    print("weights in->e %s  %s" % (weights.shape, 'ok' if same else 'FAILED'))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
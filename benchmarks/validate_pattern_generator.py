@@ -0,0 +1,89 @@
+"""
+Compares pattern_poisson_generator with spikes drawn by TTrain.createSpikes: one bars training train (data settings
+of simulations/bars) is created once with spikes and once as schedule only (createSpikes=False, same patterns and
+schedule), the generators emit the schedule during a NEST simulation. Spike counts of each channel and counts of
+all channels in each pattern length interval have to agree (chi-square tests of count differences, counts are
+Poisson). Prints simulation time. Needs NEST with the swtamodule installed.
+
+usage: python3 validate_pattern_generator.py [train length in sec]
+"""
+import os
+import sys
+import time
+import numpy as np
+from scipy import stats
+from eim import benchmark
+from eim.settings_loader import DataSettings
+from eim.spike_train import createSpikeTrainFromPatterns
+
+ALPHA = 0.001           # significance of tests
+
+
+def simulateNest(train, length):
+    """
+    Returns spike times in ms of each channel and wall time of simulation in sec.
+    """
+    import nest
+    nest.ResetKernel()
+    nest.set_verbosity('M_ERROR')
+    nest.SetKernelStatus({'resolution': train.dt * 1000.})
+    try:
+        nest.Install('swtamodule')
+    except nest.NESTError:
+        pass  # loaded already
+    status = train.getGeneratorStatus()
+    generators = nest.Create('pattern_poisson_generator', len(status))
+    nest.SetStatus(generators, status)
+    detector = nest.Create('spike_detector')
+    nest.Connect(generators, detector)
+    start = time.perf_counter()
+    nest.Simulate(length * 1000.)
+    wall = time.perf_counter() - start
+    events = nest.GetStatus(detector, 'events')[0]
+    spikes = [[] for _ in generators]
+    for sender, t in zip(events['senders'], events['times']):
+        spikes[sender - generators[0]].append(t)
+    return spikes, wall
+
+
+def compareCounts(name, countsA, countsB):
+    """
+    Chi-square test of differences of Poisson counts, bins without spikes are left out.
+    """
+    countsA, countsB = np.asarray(countsA, dtype=float), np.asarray(countsB, dtype=float)
+    used = countsA + countsB > 0
+    chi2 = np.sum((countsA[used] - countsB[used]) ** 2 / (countsA[used] + countsB[used]))
+    p = stats.chi2.sf(chi2, used.sum())
+    ok = p > ALPHA
+    print("%-9s %6d / %6d spikes in %5d bins  chi2 %8.1f (p=%.3f)  %s"
+          % (name, countsA.sum(), countsB.sum(), used.sum(), chi2, p, 'ok' if ok else 'FAILED'))
+    return ok
+
+
+def main(args):
+    length = float(args[0]) if args else 100.
+    if not benchmark.isNestAvailable():
+        print("NEST not installed, nothing to validate")
+        return 0
+
+    root = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'simulations')
+    ds = DataSettings(os.path.join(root, 'bars', 'data', 'data_settings.py'))
+    drawn, _ = createSpikeTrainFromPatterns(ds, length, patternSeed=1, pdSeed=2, spikeTrainSeed=3)
+    scheduled, _ = createSpikeTrainFromPatterns(ds, length, patternSeed=1, pdSeed=2, spikeTrainSeed=3,
+                                                createSpikes=False)
+    generated, wall = simulateNest(scheduled, length)
+
+    # spikes of the last step reach the detector after the simulation
+    last = (length - drawn.dt) * 1000.
+    drawnMs = [np.asarray(s, dtype=float) * 1000. for s in drawn.spikes]
+    drawnMs = [s[s < last - 1e-6] for s in drawnMs]
+    ok = compareCounts('channels', [len(s) for s in drawnMs], [len(s) for s in generated])
+    edges = np.arange(0., length * 1000. + 1e-6, ds.patternLength * 1000.)
+    ok &= compareCounts('intervals', np.histogram(np.concatenate(drawnMs), edges)[0],
+                        np.histogram(np.concatenate([np.asarray(s) for s in generated]), edges)[0])
+    print("simulation time %.3f s" % wall)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,71 @@
+"""
+Compares spikes and simulation times of swta_neuron_dbl_exp and its population version swta_neuron_dbl_exp_pop:
+neurons of the excitatory and inhibitory pools of the swta model get the same random input with both models,
+firing rates and inter-spike intervals have to agree (two-sample tests, same pools as validate_thinning.py). With
+delays of one step (min_delay of one step, as in the swta model with DT = 1 ms) both models draw the random numbers
+of a thread in the same order, so spikes have to be identical for the same seed. With delays of SLICE_DELAY the
+population is updated for several steps per slice and draws in a different order, only the statistics are compared.
+Needs NEST with the swtamodule installed.
+
+usage: python3 validate_pop.py [simTime in sec]
+"""
+import sys
+import time
+from eim import benchmark
+from validate_thinning import DT, NEURONS, INPUT_RATE, POOLS, compare
+
+MODELS = ('swta_neuron_dbl_exp', 'swta_neuron_dbl_exp_pop')
+SLICE_DELAY = 5 * DT    # ms, delay of input and detector connections giving slices of several steps
+
+
+def simulateNest(model, params, weight, steps, seed, delay=DT):
+    """
+    Returns list of spike steps of each neuron and wall time of simulation in sec.
+    """
+    import nest
+    nest.ResetKernel()
+    nest.set_verbosity('M_ERROR')
+    nest.SetKernelStatus({'resolution': DT, 'rng_seeds': [seed], 'grng_seed': seed + 1})
+    try:
+        nest.Install('swtamodule')
+    except nest.NESTError:
+        pass  # loaded already
+    neurons = nest.Create(model, NEURONS, params)
+    inputs = nest.Create('poisson_generator', NEURONS, {'rate': INPUT_RATE})
+    detector = nest.Create('spike_detector')
+    nest.Connect(inputs, neurons, 'one_to_one', {'weight': weight, 'delay': delay})
+    nest.Connect(neurons, detector, syn_spec={'delay': delay})
+    start = time.perf_counter()
+    nest.Simulate(steps * DT)
+    wall = time.perf_counter() - start
+    events = nest.GetStatus(detector, 'events')[0]
+    spikes = [[] for _ in range(NEURONS)]
+    for sender, t in zip(events['senders'], events['times']):
+        spikes[sender - neurons[0]].append(int(round(t / DT)))
+    return spikes, wall
+
+
+def main(args):
+    steps = int(float(args[0]) * 1000. / DT) if args else 20000
+    if not benchmark.isNestAvailable():
+        print("NEST not installed, nothing to validate")
+        return 0
+
+    ok = True
+    for pool, (params, weight) in sorted(POOLS.items()):
+        single, wallSingle = simulateNest(MODELS[0], params, weight, steps, 11)
+        pop, wallPop = simulateNest(MODELS[1], params, weight, steps, 11)
+        ok &= compare('nest ' + pool, single, pop)
+        identical = single == pop
+        ok &= identical
+        print("%-10s spikes %s, simulation time %.3f / %.3f s (speedup %.2f)"
+              % ('', 'identical' if identical else 'DIFFER', wallSingle, wallPop, wallSingle / wallPop))
+        single, wallSingle = simulateNest(MODELS[0], params, weight, steps, 11, SLICE_DELAY)
+        pop, wallPop = simulateNest(MODELS[1], params, weight, steps, 11, SLICE_DELAY)
+        ok &= compare('slices ' + pool, single, pop)
+        print("%-10s simulation time %.3f / %.3f s (speedup %.2f)" % ('', wallSingle, wallPop, wallSingle / wallPop))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,82 @@
+"""
+Checks network reuse between chain entries (REUSE_NETWORK): a network which simulated a learning entry and is then
+reused for the next entry has to give the same spikes and weights as a freshly built network initialized with the
+weights of the first entry (same steps as eim.simulator.simulate). The second entry learns as well, so STDP traces
+and random streams left from the first entry would show up. The swta model of simulations/bars is scaled down,
+the NEST backend is checked only if NEST with the swtamodule is installed.
+
+usage: python3 validate_reuse.py [simTime in sec]
+"""
+import os
+import sys
+import numpy as np
+from eim import benchmark
+
+NCHANNELS = 64
+INPUT_RATE = 20.        # Hz
+MODEL_PARAMS = dict(NUMEXC=40, NUMINH=10)
+MODELS = ('swta_numpy', 'swta')
+
+
+def createInput(simTime, seed):
+    rng = np.random.default_rng(seed)
+    return [np.unique(rng.integers(1, int(simTime * 1000), int(simTime * INPUT_RATE))) * 1e-3 for _ in range(NCHANNELS)]
+
+
+def collect(net):
+    """
+    Returns spikes of each pool and input weights.
+    """
+    return {pool: [np.asarray(s, dtype=float) for s in trains] for pool, trains in net.getAllSpikes().items()}, \
+        net.getShapedWeights('in', 'e')
+
+
+def simulateEntry(net, spikes, simTime, W=None):
+    net.simulate(0., spikes)
+    if W is not None:
+        net.setWeights('in', 'e', W)
+    net.setLearning(True, 'in', 'e')
+    net.simulate(simTime, None, reset=False)
+    return collect(net)
+
+
+def same(a, b):
+    spikesA, weightsA = a
+    spikesB, weightsB = b
+    return (sorted(spikesA) == sorted(spikesB) and np.array_equal(weightsA, weightsB) and
+            all(len(x) == len(y) and np.array_equal(x, y) for pool in spikesA for x, y in zip(spikesA[pool], spikesB[pool])))
+
+
+def main(args):
+    simTime = float(args[0]) if args else 2.
+    from eim.settings_loader import GeneralSettings, SimulationSettings, NetworkModelSettings
+    from eim.network import findPool
+    from eim.simulator import createNetwork
+    os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'simulations', 'bars'))
+    gs = GeneralSettings()
+    ss = SimulationSettings(gs.simulationSettings)
+    first, second = createInput(simTime, 3), createInput(simTime, 4)
+
+    ok = True
+    for model in MODELS:
+        if model == 'swta' and not benchmark.isNestAvailable():
+            print("%-10s NEST not installed, nothing to validate" % model)
+            continue
+        ms = NetworkModelSettings(gs, model, MODEL_PARAMS)
+        findPool(ms.pools, 'in')['N'] = NCHANNELS
+        findPool(ms.pools, 'in_')['N'] = NCHANNELS
+
+        net = createNetwork(ss, ms)
+        trained = simulateEntry(net, first, simTime)
+        reused = simulateEntry(net, second, simTime)
+        fresh = simulateEntry(createNetwork(ss, ms), second, simTime, trained[1])
+        result = same(reused, fresh)
+        ok &= result
+        print("%-10s %6d spikes, weights changed %.4f (mean abs)  %s"
+              % (model, sum(len(s) for trains in fresh[0].values() for s in trains),
+                 np.abs(fresh[1] - trained[1]).mean(), 'ok' if result else 'FAILED'))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
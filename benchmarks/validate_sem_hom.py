@@ -0,0 +1,114 @@
+"""
+Compares weight trajectories of sem_synapse and sem_synapse_hom: the plastic input projection of the swta model
+(STDP parameters of eim/models/swta) gets the same pre- and post-synaptic spike trains with both synapse models,
+weights are read at fixed intervals and have to agree up to MAX_WEIGHT_DIFF. Pre- and post-synaptic neurons are
+parrot neurons repeating fixed spike trains, plastic synapses connect to their receptor 1 (ignored by parrots), so
+spikes do not depend on weights. Learning is switched off in between, which has to freeze weights with both
+models. Prints simulation times of both models. Needs NEST with the swtamodule installed.
+
+usage: python3 validate_sem_hom.py [simTime in sec]
+"""
+import sys
+import time
+import numpy as np
+from eim import benchmark
+
+DT = 1.                 # ms
+SOURCES = 200           # input neurons
+TARGETS = 100           # excitatory neurons
+SOURCE_RATE = 20.       # Hz
+TARGET_RATE = 30.       # Hz
+CHUNK = 1000.           # ms between weight readouts
+FROZEN = (0.6, 0.7)     # part of simulation with learning switched off
+MAX_WEIGHT_DIFF = 1e-10
+
+# STDP parameters of the swta model (ETA = 0.01, STDP_WINDOW_PLUS/MINUS, SYN_IN_WEIGHT_MIN/MAX/DELAY_MIN/MAX)
+STDP_PARAMS = {'lambda': 0.01 * np.e, 'alpha': 1. / np.e, 'nu_plus': -1., 'nu_minus': 0., 'A': 0., 'tau_plus': 10.,
+               'Wmax': 1.}
+TAU_MINUS = 25.
+WEIGHTS = (0.01, 1.)
+DELAYS = (1., 10.)
+
+
+def createTrains(count, rate, simTime, rng):
+    """
+    Returns spike times in ms on the simulation grid (Poisson process sampled per step).
+    """
+    steps = int(simTime / DT)
+    return [(np.flatnonzero(rng.random(steps) < rate * DT * 1e-3) + 1) * DT for _ in range(count)]
+
+
+def isFrozen(chunk, simTime):
+    return FROZEN[0] <= chunk * CHUNK / simTime < FROZEN[1]
+
+
+def simulateNest(model, sourceTrains, targetTrains, weights, delays, simTime):
+    """
+    Returns weights (connections ordered by source and target) at every readout and wall time of simulation in sec.
+    """
+    import nest
+    nest.ResetKernel()
+    nest.set_verbosity('M_ERROR')
+    nest.SetKernelStatus({'resolution': DT})
+    try:
+        nest.Install('swtamodule')
+    except nest.NESTError:
+        pass  # loaded already
+
+    if model == 'sem_synapse_hom':
+        # homogeneous synapses take STDP params only as model defaults
+        nest.CopyModel(model, 'stdp_synapse_under_test', STDP_PARAMS)
+        synapse = {'model': 'stdp_synapse_under_test'}
+    else:
+        synapse = dict(STDP_PARAMS, model=model)
+
+    sources = nest.Create('parrot_neuron', SOURCES)
+    targets = nest.Create('parrot_neuron', TARGETS, {'tau_minus': TAU_MINUS})
+    for neurons, trains in ((sources, sourceTrains), (targets, targetTrains)):
+        generators = nest.Create('spike_generator', len(neurons), [{'spike_times': t.tolist()} for t in trains])
+        nest.Connect(generators, neurons, 'one_to_one')
+    nest.Connect(np.repeat(sources, TARGETS).tolist(), list(targets) * SOURCES, 'one_to_one',
+                 dict(synapse, receptor_type=1, weight=weights.ravel(), delay=delays.ravel()))
+    conns = nest.GetConnections(sources, targets)
+    order = np.lexsort((nest.GetStatus(conns, 'target'), nest.GetStatus(conns, 'source')))
+    conns = [conns[i] for i in order]
+
+    trajectory = []
+    wall = 0.
+    for n in range(int(simTime / CHUNK)):
+        nest.SetStatus(conns, 'learning_is_active', 0. if isFrozen(n, simTime) else 1.)
+        start = time.perf_counter()
+        nest.Simulate(CHUNK)
+        wall += time.perf_counter() - start
+        trajectory.append(np.array(nest.GetStatus(conns, 'weight')))
+    return np.array(trajectory), wall
+
+
+def main(args):
+    simTime = float(args[0]) * 1000. if args else 20000.
+    if not benchmark.isNestAvailable():
+        print("NEST not installed, nothing to validate")
+        return 0
+
+    rng = np.random.default_rng(1)
+    sourceTrains = createTrains(SOURCES, SOURCE_RATE, simTime, rng)
+    targetTrains = createTrains(TARGETS, TARGET_RATE, simTime, rng)
+    weights = rng.uniform(WEIGHTS[0], WEIGHTS[1], (SOURCES, TARGETS))
+    delays = np.round(rng.uniform(DELAYS[0], DELAYS[1], (SOURCES, TARGETS)) / DT) * DT
+
+    sem, wallSem = simulateNest('sem_synapse', sourceTrains, targetTrains, weights, delays, simTime)
+    hom, wallHom = simulateNest('sem_synapse_hom', sourceTrains, targetTrains, weights, delays, simTime)
+    diff = np.abs(sem - hom).max()
+    frozen = [n for n in range(1, len(sem)) if isFrozen(n, simTime)]
+    unchanged = all(np.array_equal(w[n], w[n - 1]) for w in (sem, hom) for n in frozen)
+    ok = diff <= MAX_WEIGHT_DIFF and unchanged
+    print("weights changed %.3f (mean abs), max difference %.3g, frozen weights %s  %s"
+          % (np.abs(sem[-1] - weights.ravel()).mean(), diff, 'unchanged' if unchanged else 'CHANGED',
+             'ok' if ok else 'FAILED'))
+    print("simulation time sem_synapse %.3f s, sem_synapse_hom %.3f s (speedup %.2f)"
+          % (wallSem, wallHom, wallSem / wallHom))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
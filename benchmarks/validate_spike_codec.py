@@ -0,0 +1,79 @@
+"""
+Checks compressed spike storage (eim.spike_codec): a training data set of bars (TTrain spikes, step * dt) and
+result-like spikes (ms / 1000.) are saved to shelves with and without compression, loaded back and compared.
+Decoded spikes have to be identical to the original ones. Sizes of shelves, load times (shelf read, spikes
+decoded lazily) and times of decoding all channels and one channel are printed. From the page cache, decoding
+all channels is slower than unpickling float64 arrays; shelves are 6-7x smaller.
+
+usage: python3 validate_spike_codec.py [train length in sec]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+from eim.settings_loader import DataSettings
+from eim.spike_train import createSpikeTrainFromPatterns
+from eim.spike_codec import EncodedTrain, decodeSpikes
+from eim.data import saveData, loadData
+
+
+def shelfSize(path):
+    folder = os.path.dirname(path)
+    name = os.path.basename(path)
+    return sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder) if f.startswith(name))
+
+
+def roundTrip(folder, name, spikes):
+    """
+    Returns (size in bytes, load time, time of decoding all channels, time of decoding one channel (in sec),
+    loaded spikes as list) of spikes saved to shelf.
+    """
+    path = os.path.join(folder, name)
+    saveData(path, spikes=spikes)
+    start = time.time()
+    stored = loadData(path)['spikes']
+    loadTime = time.time() - start
+    start = time.time()
+    np.asarray(stored[len(stored) // 2])
+    channelTime = time.time() - start
+    start = time.time()
+    loaded = [np.asarray(s) for s in decodeSpikes(stored)]
+    return shelfSize(path), loadTime, time.time() - start, channelTime, loaded
+
+
+def compare(name, folder, spikes):
+    rawSize, rawLoad, rawDecode, rawChannel, raw = roundTrip(folder, name + '_raw', spikes)
+    encSize, encLoad, encDecode, encChannel, enc = roundTrip(folder, name + '_enc', EncodedTrain(spikes))
+    ok = len(enc) == len(spikes) and all(np.array_equal(a, np.asarray(b)) for a, b in zip(enc, spikes))
+    print("%-8s %8d spikes  %5.2f MB -> %4.2f MB (%3.1fx)  load %5.1f ms -> %5.1f ms  all channels +%5.1f ms -> +%5.1f ms"
+          "  one channel +%4.2f ms -> +%4.2f ms  %s"
+          % (name, sum(len(s) for s in spikes), rawSize / 1e6, encSize / 1e6, rawSize / float(encSize), rawLoad * 1e3,
+             encLoad * 1e3, rawDecode * 1e3, encDecode * 1e3, rawChannel * 1e3, encChannel * 1e3,
+             'ok' if ok else 'FAILED'))
+    return ok
+
+
+def main(args):
+    length = float(args[0]) if args else 100.
+    root = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'simulations')
+    ds = DataSettings(os.path.join(root, 'bars', 'data', 'data_settings.py'))
+    train, pg = createSpikeTrainFromPatterns(ds, length, patternSeed=1, pdSeed=2, spikeTrainSeed=3)
+
+    # result spikes: NEST spike times in ms converted to sec
+    rng = np.random.default_rng(4)
+    result = [np.sort(rng.choice(int(length * 1000), rng.integers(0, int(length * 20)), replace=False)) / 1000.
+              for _ in range(400)]
+
+    folder = tempfile.mkdtemp()
+    try:
+        ok = compare('train', folder, train.spikes)
+        ok &= compare('result', folder, result)
+    finally:
+        shutil.rmtree(folder)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,107 @@
+"""
+Compares spike_file_generator with spike_generator: both emit the same input (spike times in sec as given to
+NeuronsPool.setSpikes, several spikes of a channel in one step included) to parrot neurons, spikes recorded from
+the parrots have to be identical. The spike file is read in blocks of BLOCK_SIZE spikes, so reading crosses many
+block boundaries, and the simulation is run in CHUNKS calls of Simulate. Afterwards both generators get a second
+input starting at the end of the first one (origin, as for consecutive chain entries), which restarts the spike
+file. Prints simulation times of both generators. Needs NEST with the swtamodule installed.
+
+usage: python3 validate_spike_file_generator.py [simTime in sec]
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from eim import benchmark
+from eim.spike_file import writeSpikeFile
+
+DT = 1.                 # ms
+NCHANNELS = 100
+INPUT_RATE = 50.        # Hz
+BLOCK_SIZE = 7          # spikes read at once by spike_file_generator
+CHUNKS = 10             # Simulate calls per input
+
+
+def createInput(simTime, seed):
+    """
+    Returns spike times in sec of each channel, on the simulation grid, with some spikes sharing a step.
+    """
+    rng = np.random.default_rng(seed)
+    steps = int(simTime * 1000. / DT)
+    return [np.sort(rng.integers(0, steps, rng.poisson(simTime * INPUT_RATE))) * DT * 1e-3
+            for _ in range(NCHANNELS)]
+
+
+def simulateNest(model, inputs, simTime, folder):
+    """
+    Returns spikes (parrot index and time in ms, sorted) of each input and wall time of simulation in sec.
+    """
+    import nest
+    nest.ResetKernel()
+    nest.set_verbosity('M_ERROR')
+    nest.SetKernelStatus({'resolution': DT})
+    try:
+        nest.Install('swtamodule')
+    except nest.NESTError:
+        pass  # loaded already
+    generators = nest.Create(model, NCHANNELS)
+    parrots = nest.Create('parrot_neuron', NCHANNELS)
+    detector = nest.Create('spike_detector')
+    nest.Connect(generators, parrots, 'one_to_one', {'delay': DT})
+    nest.Connect(parrots, detector)
+
+    results = []
+    wall = 0.
+    for n, spikes in enumerate(inputs):
+        origin = n * simTime * 1000.
+        if model == 'spike_file_generator':
+            path = os.path.join(folder, 'input%d.spk' % n)
+            writeSpikeFile(path, spikes)
+            status = [{'filename': path, 'channel': i, 'origin': origin, 'block_size': BLOCK_SIZE}
+                      for i in range(NCHANNELS)]
+        else:
+            # as NeuronsPool.setSpikes
+            status = []
+            for s in spikes:
+                times = np.array(s, dtype=float)
+                times[times == 0] = 0.001
+                status.append({'spike_times': times * 1000., 'origin': origin})
+        nest.SetStatus(generators, status)
+        nest.SetStatus(detector, {'n_events': 0})
+        start = time.perf_counter()
+        for _ in range(CHUNKS):
+            nest.Simulate(simTime * 1000. / CHUNKS)
+        wall += time.perf_counter() - start
+        events = nest.GetStatus(detector, 'events')[0]
+        ids = np.asarray(events['senders']) - parrots[0]
+        times = np.asarray(events['times']) - origin
+        order = np.lexsort((times, ids))
+        results.append((ids[order], times[order]))
+    return results, wall
+
+
+def main(args):
+    simTime = float(args[0]) if args else 10.
+    if not benchmark.isNestAvailable():
+        print("NEST not installed, nothing to validate")
+        return 0
+
+    inputs = [createInput(simTime, 1), createInput(simTime, 2)]
+    with tempfile.TemporaryDirectory() as folder:
+        fromFile, wallFile = simulateNest('spike_file_generator', inputs, simTime, folder)
+    fromTimes, wallTimes = simulateNest('spike_generator', inputs, simTime, None)
+
+    ok = True
+    for n, ((idsA, timesA), (idsB, timesB), spikes) in enumerate(zip(fromTimes, fromFile, inputs)):
+        sameSteps = sum(len(s) - len(np.unique(s)) for s in spikes)
+        same = np.array_equal(idsA, idsB) and np.array_equal(timesA, timesB)
+        ok &= same
+        print("input %d  %6d spikes (%d sharing a step with another), %6d / %6d recorded  %s"
+              % (n, sum(len(s) for s in spikes), sameSteps, len(idsA), len(idsB), 'ok' if same else 'FAILED'))
+    print("simulation time spike_generator %.3f s, spike_file_generator %.3f s" % (wallTimes, wallFile))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
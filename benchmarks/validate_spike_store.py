@@ -0,0 +1,100 @@
+"""
+Checks spike stores (eim.spike_store): spikes of input data (simulations/<name>/data/data_settings.py) written to a
+spike store and read back have to be identical to the originals, spikes of time windows and channel subsets read
+with SpikeStore.window have to be the ones of the fully loaded train. A result saved with its spike stores has to
+load from another directory, and without its stores (spikes failing on access only). Times of a window read and
+a full load are reported.
+
+usage: python3 validate_spike_store.py [train length in sec]
+"""
+import os
+import sys
+import time
+import shutil
+import pickle
+import tempfile
+import numpy as np
+from eim.settings_loader import DataSettings
+from eim.spike_train import createSpikeTrainFromPatterns
+from eim.spike_store import writeSpikeStore, readWindow
+from eim.simulation_chain import storeResultSpikes
+from eim.data import saveData, loadData
+
+SIMULATIONS = ['bars', 'oriented_bars', 'stp']
+SEEDS = dict(patternSeed=1, pdSeed=2, spikeTrainSeed=3)
+WINDOWS = [(0., 2.5), (1.2345, 1.2345), (7.5, 9.001), (-1., 0.5)]   # windows in sec, last end is train length
+
+
+def sameSpikes(a, b):
+    return len(a) == len(b) and all(np.array_equal(x, y) for x, y in zip(a, b))
+
+
+def check(name, spikes, length, folder):
+    path = os.path.join(folder, name + '.spikes')
+    store = writeSpikeStore(path, spikes)
+    ok = sameSpikes(store.decode(), spikes)
+    ok &= sameSpikes(pickle.loads(pickle.dumps(store)).decode(), spikes)
+    windows = WINDOWS + [(length - 1., length)]
+    channels = [None, range(0, len(spikes), 2), [len(spikes) - 1, 0]]
+    for start, end in windows:
+        for chs in channels:
+            ok &= sameSpikes(store.window(start, end, chs), readWindow(spikes, start, end, chs))
+
+    t = time.time()
+    store.window(length / 2., length / 2. + 1.)
+    window = time.time() - t
+    t = time.time()
+    store.decode()
+    full = time.time() - t
+    print("%-14s %d spikes, %.1f MB  1 s window %.1f ms  full load %.1f ms  %s"
+          % (name, store.nspikes, os.path.getsize(path) / 1e6, window * 1e3, full * 1e3, 'ok' if ok else 'FAILED'))
+    return ok
+
+
+def checkResult(spikes, folder):
+    """
+    Saves result with spike store in folder/results, loads it from another directory and without the store.
+    """
+    os.makedirs(os.path.join(folder, 'results'))
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        saveData('results/result.shelf', **storeResultSpikes(dict(spikes=dict(e=spikes), finalW=np.ones(3)),
+                                                             'results/result', '.spikes'))
+    finally:
+        os.chdir(cwd)
+    path = os.path.join(folder, 'results', 'result.shelf')
+    ok = sameSpikes(loadData(path)['spikes']['e'].decode(), spikes)
+    os.remove(os.path.join(folder, 'results', 'result_e.spikes'))
+    r = loadData(path)
+    try:
+        r['spikes']['e'].decode()
+        ok = False
+    except IOError:
+        ok &= np.array_equal(r['finalW'], np.ones(3))
+    print("result loaded from other directory and without spike store: %s" % ('ok' if ok else 'FAILED'))
+    return ok
+
+
+def main(args):
+    length = float(args[0]) if args else 60.
+    root = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'simulations')
+    folder = tempfile.mkdtemp()
+    ok = True
+    try:
+        for name in SIMULATIONS:
+            ds = DataSettings(os.path.join(root, name, 'data', 'data_settings.py'))
+            train, pg = createSpikeTrainFromPatterns(ds, length, **SEEDS)
+            ok &= check(name, train.spikes, length, folder)
+        ok &= checkResult(train.spikes, folder)
+        empty = writeSpikeStore(os.path.join(folder, 'empty.spikes'), [[], []])
+        ok &= sameSpikes(empty.decode(), [np.zeros(0), np.zeros(0)])
+        ok &= sameSpikes(empty.window(0., 1., [1]), [np.zeros(0)])
+        ok &= writeSpikeStore(os.path.join(folder, 'none.spikes'), []).decode() == []
+    finally:
+        shutil.rmtree(folder)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
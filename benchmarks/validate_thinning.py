@@ -0,0 +1,100 @@
+"""
+Compares spikes of swta_neuron_dbl_exp sampled per step and by thinning (neuron parameter thinning): neurons of
+the excitatory and inhibitory pools of the swta model get the same random input with both samplers, firing rates
+and inter-spike intervals have to agree (two-sample tests). Runs the NumPy model, and the NEST model if NEST is
+installed.
+
+usage: python3 validate_thinning.py [simTime in sec]
+"""
+import sys
+import numpy as np
+from scipy import stats
+from eim.network_numpy import NumpyPool, ReplicaRandom
+from eim import benchmark
+
+DT = 1.                 # ms
+NEURONS = 200           # per pool and sampler
+INPUT_RATE = 400.       # total rate of input spikes of each neuron in Hz
+ALPHA = 0.001           # significance of tests
+
+# (neuron parameters, weight of input spikes) of the swta model (eim/models/swta), with SFA for the excitatory
+# neurons, weights give rates of a few 10 Hz
+POOLS = dict(
+    e=(dict(tau_r=1., tau_f=10., V_reset=-5.57, with_reset=True, dead_time=10., c_1=0., c_2=100., c_3=2., c_4=0.,
+            I_e=-5.57, z_scale=1.435, tau_sfa=[100.], q_sfa=[0.5]), 1.),
+    i=(dict(tau_r=1., tau_f=10., V_reset=0., with_reset=False, dead_time=3., c_1=1., c_2=0., c_3=0., c_4=0.,
+            I_e=0., z_scale=1.435), 4.),
+)
+
+
+def simulateNumpy(params, weight, steps, thinning, seed):
+    """
+    Returns list of spike steps of each neuron.
+    """
+    pool = NumpyPool([{'name': 'n', 'N': NEURONS, 'neuronparams': dict(params, thinning=thinning)}], DT)
+    inputRNG = np.random.default_rng(1)  # same input for both samplers
+    rng = ReplicaRandom([seed])
+    spikes = [[] for _ in range(NEURONS)]
+    for n in range(steps):
+        pool.buf[0] = weight * inputRNG.poisson(INPUT_RATE * DT * 1e-3, NEURONS)
+        idx, mult = pool.update(n, 0, rng)
+        for i in idx:
+            spikes[i].append(n)
+    return spikes
+
+
+def simulateNest(params, weight, steps, thinning, seed):
+    import nest
+    nest.ResetKernel()
+    nest.set_verbosity('M_ERROR')
+    nest.SetKernelStatus({'resolution': DT, 'rng_seeds': [seed], 'grng_seed': seed + 1})
+    try:
+        nest.Install('swtamodule')
+    except nest.NESTError:
+        pass  # loaded already
+    neurons = nest.Create('swta_neuron_dbl_exp', NEURONS, dict(params, thinning=thinning))
+    inputs = nest.Create('poisson_generator', NEURONS, {'rate': INPUT_RATE})
+    detector = nest.Create('spike_detector')
+    nest.Connect(inputs, neurons, 'one_to_one', {'weight': weight, 'delay': DT})
+    nest.Connect(neurons, detector)
+    nest.Simulate(steps * DT)
+    events = nest.GetStatus(detector, 'events')[0]
+    spikes = [[] for _ in range(NEURONS)]
+    for sender, time in zip(events['senders'], events['times']):
+        spikes[sender - neurons[0]].append(int(round(time / DT)))
+    return spikes
+
+
+def compare(name, perStep, thinned):
+    countsA = np.array([len(s) for s in perStep])
+    countsB = np.array([len(s) for s in thinned])
+    isiA = np.concatenate([np.diff(s) for s in perStep])
+    isiB = np.concatenate([np.diff(s) for s in thinned])
+    pCounts = stats.mannwhitneyu(countsA, countsB).pvalue
+    pISI = stats.ks_2samp(isiA, isiB).pvalue
+    ok = pCounts > ALPHA and pISI > ALPHA
+    print("%-10s spikes per neuron %7.2f / %7.2f (p=%.3f)  mean ISI %6.2f / %6.2f ms (KS p=%.3f)  %s"
+          % (name, countsA.mean(), countsB.mean(), pCounts, isiA.mean() * DT, isiB.mean() * DT, pISI,
+             'ok' if ok else 'FAILED'))
+    return ok
+
+
+def main(args):
+    steps = int(float(args[0]) * 1000. / DT) if args else 20000
+    backends = [('numpy', simulateNumpy)]
+    if benchmark.isNestAvailable():
+        backends.append(('nest', simulateNest))
+    else:
+        print("NEST not installed, validating NumPy model only")
+
+    ok = True
+    for backend, simulate in backends:
+        for pool, (params, weight) in sorted(POOLS.items()):
+            perStep = simulate(params, weight, steps, False, 11)
+            thinned = simulate(params, weight, steps, True, 12)
+            ok &= compare(backend + ' ' + pool, perStep, thinned)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
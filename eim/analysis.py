@@ -1,8 +1,10 @@
 import numpy as np
-import scipy.signal as ss
+from . import dtypes
 
 
 def numberOfSpikesInTrain(spikeTrain):
+    if hasattr(spikeTrain, 'nspikes'):  # EncodedTrain or SpikeStore, counted without decoding
+        return spikeTrain.nspikes
     s=0
     for i in range(len(spikeTrain)):
         s += len(spikeTrain[i])
@@ -60,7 +62,7 @@ def groupNeuronsBySpecialization(prn, specializedNeurons, precisionTable):
 def convolveEventLists(eventLists, simtime_ms, psp):
     # lists = [[list of events], ]
     nLists = len(eventLists)
-    traces = np.zeros([nLists, simtime_ms + psp.shape[0] - 1])
+    traces = np.zeros([nLists, simtime_ms + psp.shape[0] - 1], dtype=dtypes.TRACE)
     for i in range(nLists):
         traces[i, eventLists[i]] = 1.  # pd is 1-indexed
         traces[i, :] = np.convolve(traces[i, :-psp.shape[0] + 1], psp, 'full')
@@ -87,7 +89,7 @@ def sortTracesByPeakInTime(nrntraces):
 
 
 def meanTrace(eventList, simtime_ms, trace, patLen):
-    traces = np.zeros((len(eventList), patLen))
+    traces = np.zeros((len(eventList), patLen), dtype=dtypes.TRACE)
     for j, t in enumerate(eventList):
         traces[j, 0: min(patLen, simtime_ms - t)] = trace[t: t + min(patLen, simtime_ms - t)]
 
@@ -96,8 +98,8 @@ def meanTrace(eventList, simtime_ms, trace, patLen):
 
 
 def calculateMeanNormalizedTraces(nrns, traces, pd, simtime_ms, patLen):
-    nrntraces_P1 = np.zeros((len(nrns), patLen))
-    nrntraces_P2 = np.zeros((len(nrns), patLen))
+    nrntraces_P1 = np.zeros((len(nrns), patLen), dtype=dtypes.TRACE)
+    nrntraces_P2 = np.zeros((len(nrns), patLen), dtype=dtypes.TRACE)
 		
     for i, nid in enumerate(nrns):
         avtrace1 = meanTrace(pd[1], simtime_ms, traces[nid], patLen)
@@ -117,9 +119,9 @@ def calculateMeanNormalizedTraces(nrns, traces, pd, simtime_ms, patLen):
 
 def calcRate(spikes,stime,dt,win):
     stime_steps=int(np.ceil(stime/dt))
-    r=np.zeros(stime_steps)
-
     allsp=[s for ch in spikes for s in ch]
+    r=np.zeros(stime_steps, dtype=dtypes.indexType(len(allsp)))
+
     allsp.sort()
 
     window_steps=int(np.ceil(win/dt))
@@ -138,6 +140,7 @@ def calculateCorrelation(r1, r2, start, npts):
     a = (a - np.mean(a)) / (np.std(a) * len(a))         # remove mean and normalize
     b = (b - np.mean(b)) / (np.std(b) * len(b))
 
+    import scipy.signal as ss
     c = ss.correlate(a, b)                              # calc correlation
     n = len(c)
     c_norm = c / max(c)                                 # normalize correlation
@@ -158,7 +161,7 @@ def countSpikesForNonoverlappingPatterns(spikes_ms, pd, patlen):
     npatterns = len(pd.keys())
     nneurons = len(spikes_ms)
 
-    response = np.zeros((nneurons, npatterns))
+    response = np.zeros((nneurons, npatterns), dtype=dtypes.indexType(sum(len(ch) for ch in spikes_ms)))
 
     maxcp = len(sallp)
     if maxcp == 0:
@@ -0,0 +1,163 @@
+"""
+Benchmark helpers: run stages of a scenario in separate processes and record wall time,
+peak resident memory and processed events per second, keep history of runs in a JSON lines
+file and compare runs against a stored baseline.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import multiprocessing
+import importlib.util
+
+
+def isNestAvailable():
+    return importlib.util.find_spec('nest') is not None
+
+
+def getPeakRSS():
+    """
+    Returns peak resident memory of this process in MB.
+    """
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak / (1024. * 1024.) if sys.platform == 'darwin' else peak / 1024.
+
+
+def createRecord(scenario, stage, status, wall=None, peakRSS=None, events=None, note=None):
+    if events is not None:
+        events = int(events)
+    record = dict(scenario=scenario, stage=stage, status=status, wall=wall, peakRSS=peakRSS,
+                  events=events, eventsPerSec=None, note=note)
+    if events is not None and wall:
+        record['eventsPerSec'] = events / wall
+    return record
+
+
+def _runStageProcess(queue, workDir, stageFunction, args):
+    try:
+        os.chdir(workDir)
+        start = time.perf_counter()
+        events = stageFunction(*args)
+        wall = time.perf_counter() - start
+        queue.put(('ok', wall, getPeakRSS(), events, None))
+    except Exception as ex:
+        queue.put(('failed', None, getPeakRSS(), None, '%s: %s' % (type(ex).__name__, ex)))
+
+
+def runStage(scenario, stage, workDir, stageFunction, *args):
+    """
+    Runs stageFunction(*args) in a new process (so peak memory is measured per stage) in workDir.
+    stageFunction returns number of processed events (e.g. spikes) or None.
+    Wall time includes only the function, not the process start.
+        -> stageFunction : module level function (it is pickled to the new process)
+    """
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_runStageProcess, args=(queue, workDir, stageFunction, args))
+    process.start()
+    try:
+        status, wall, peakRSS, events, note = queue.get()
+    finally:
+        process.join()
+    return createRecord(scenario, stage, status, wall, peakRSS, events, note)
+
+
+def measureImportTime(modules, lazyModules=()):
+    """
+    Imports modules in a fresh interpreter, returns import time in sec and those of lazyModules
+    (e.g. nest, matplotlib) which got imported although they should be loaded only on first use.
+    """
+    code = ("import sys, time; t = time.perf_counter(); import %s; t = time.perf_counter() - t; "
+            "print('IMPORT', t, *[m for m in %r if m in sys.modules])" % (", ".join(modules), tuple(lazyModules)))
+    out = subprocess.check_output([sys.executable, '-c', code], env=dict(os.environ, PYTHONWARNINGS='ignore'))
+    result = [line for line in out.decode().splitlines() if line.startswith('IMPORT ')][-1].split()
+    return float(result[1]), result[2:]
+
+
+def getGitRevision(path):
+    try:
+        out = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=path, stderr=subprocess.DEVNULL)
+        return out.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def createRun(records, repoPath):
+    import numpy
+    return dict(
+        time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        revision=getGitRevision(repoPath),
+        host=platform.node(),
+        python=platform.python_version(),
+        numpy=numpy.__version__,
+        nest=isNestAvailable(),
+        records=records
+    )
+
+
+def appendHistory(path, run):
+    with open(path, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+
+def loadHistory(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def saveBaseline(path, run):
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=1)
+
+
+def loadBaseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compareWithBaseline(run, baseline, threshold, minWall=0.05):
+    """
+    Returns list of regressions: stages where wall time or peak memory grew by more than threshold
+    (e.g. 1.2 means 20%) compared to baseline. Stages shorter than minWall sec in baseline are
+    compared only by memory, their timing is too noisy.
+    """
+    baseRecords = {(r['scenario'], r['stage']): r for r in baseline['records'] if r['status'] == 'ok'}
+    regressions = []
+    for r in run['records']:
+        base = baseRecords.get((r['scenario'], r['stage']))
+        if r['status'] != 'ok' or base is None:
+            continue
+        for key in ('wall', 'peakRSS'):
+            if r[key] is None or not base[key] or (key == 'wall' and base['wall'] < minWall):
+                continue
+            ratio = r[key] / base[key]
+            if ratio > threshold:
+                regressions.append(dict(scenario=r['scenario'], stage=r['stage'], measure=key,
+                                        value=r[key], baseline=base[key], ratio=ratio))
+    return regressions
+
+
+def printRecords(records):
+    print("%-14s %-14s %-8s %10s %10s %12s %14s" % ('scenario', 'stage', 'status', 'wall(s)', 'RSS(MB)', 'events', 'events/s'))
+    for r in records:
+        fmt = lambda v, f: (f % v) if v is not None else '-'
+        print("%-14s %-14s %-8s %10s %10s %12s %14s" % (r['scenario'], r['stage'], r['status'], fmt(r['wall'], '%.3f'),
+              fmt(r['peakRSS'], '%.1f'), fmt(r['events'], '%d'), fmt(r['eventsPerSec'], '%.0f')))
+        if r['note']:
+            print("    ", r['note'])
+
+
+def printRegressions(regressions, threshold):
+    if not regressions:
+        print("No regressions (threshold %.2f)" % threshold)
+    for r in regressions:
+        print("REGRESSION %s %s %s: %.3f vs baseline %.3f (x%.2f)" % (r['scenario'], r['stage'], r['measure'],
+              r['value'], r['baseline'], r['ratio']))
@@ -9,7 +9,44 @@ class DictClass(object):
     def update(self, dict):
         self.__dict__.update(dict)
 
-	
+
+
+class LazyModule(object):
+    """
+    Module proxy which imports module on first attribute access.
+    Used for heavy dependencies (nest, matplotlib), so they are only loaded when needed.
+        -> name : module name, e.g. 'matplotlib.pyplot'
+        -> onLoad : function called with module after it is imported
+    """
+    def __init__(self, name, onLoad=None):
+        self.__dict__['_name'] = name
+        self.__dict__['_onLoad'] = onLoad
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            import importlib
+            module = importlib.import_module(self._name)
+            self.__dict__['_module'] = module
+            if self._onLoad:
+                self._onLoad(module)
+        return module
+
+    def _isLoaded(self):
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_module'] is not None else "not loaded"
+        return "<lazy module '%s' (%s)>" % (self._name, state)
+
+
 def getDirAndFileName(filePath):
     fileDir = os.path.dirname(os.path.realpath(filePath))
     fileName = os.path.basename(filePath)
@@ -67,11 +104,11 @@ class OUProcess:
         sigma = self.sigma
         theta = self.theta
         ur = self.mean
-        u0 = ur+np.random.randn(1)
+        u0 = ur+np.random.randn()
 
         ut = np.zeros(length+delay)
         ut[0]=u0
         for t in range(1,length+delay):
-            ut[t]=ut[t-1] + theta*(ur-ut[t-1])*dt + np.random.randn(1)*sigma
+            ut[t]=ut[t-1] + theta*(ur-ut[t-1])*dt + np.random.randn()*sigma
             ut[t] = min(np.log(50),ut[t])
         return self.f(ut[delay:])
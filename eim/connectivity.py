@@ -0,0 +1,38 @@
+"""
+Connectivity snapshots: all connections of each projection (pair of pools) in COO form.
+Projection is a dict with
+    sourcePool, targetPool : pool names
+    model : synapse model
+    shape : (number of target neurons, number of source neurons), as weight matrices W
+    targets, sources : int32 arrays of local neuron indices (row and column of each connection)
+    weights : float array
+    delays : float array, in ms
+Snapshot is a dict of projections by projectionName(sourcePool, targetPool).
+"""
+import numpy as np
+
+
+def projectionName(sourcePoolName, targetPoolName):
+    return "%s->%s" % (sourcePoolName, targetPoolName)
+
+
+def createProjection(sourcePoolName, targetPoolName, model, shape, sources, targets, weights, delays):
+    """
+    Creates projection, connections are sorted by target and source.
+    """
+    sources = np.asarray(sources, dtype=np.int32)
+    targets = np.asarray(targets, dtype=np.int32)
+    order = np.lexsort((sources, targets))
+    return dict(sourcePool=sourcePoolName, targetPool=targetPoolName, model=model, shape=tuple(shape),
+                targets=targets[order], sources=sources[order],
+                weights=np.asarray(weights, dtype=float)[order], delays=np.asarray(delays, dtype=float)[order])
+
+
+def toSparse(projection, values='weights', format='csr'):
+    """
+    Returns scipy sparse matrix (targets x sources) of projection values ('weights' or 'delays').
+    Values of multiple connections between the same pair of neurons are summed.
+    """
+    from scipy import sparse
+    m = sparse.coo_matrix((projection[values], (projection['targets'], projection['sources'])), shape=projection['shape'])
+    return m.asformat(format)
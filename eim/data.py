@@ -1,4 +1,5 @@
 import os
+import dbm
 import shelve
 import copy
 
@@ -23,7 +24,8 @@ def saveData(fname, **kwargs):
 
 
 def loadData(fname):
-    fileExists = os.path.exists(fname)
+    # depending on dbm backend shelf is stored in files with added extensions
+    fileExists = os.path.exists(fname) or dbm.whichdb(fname) is not None
     assert fileExists, "Missing data: " + fname
 
     shelf = shelve.open(fname, 'r')
@@ -31,5 +33,17 @@ def loadData(fname):
     for k, v in shelf.items():
         r[k] = copy.copy(v)
     shelf.close()
+    resolvePaths(r, os.path.dirname(fname))
     return r
 
+
+def resolvePaths(data, directory):
+    """
+    Files referred to by loaded objects (e.g. spike stores of results) are relative to directory of the shelf.
+    """
+    if hasattr(data, 'resolvePath'):
+        data.resolvePath(directory)
+    elif isinstance(data, dict):
+        for v in data.values():
+            resolvePaths(v, directory)
+
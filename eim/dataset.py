@@ -0,0 +1,258 @@
+"""
+Chunked data sets. A data set is a folder with a manifest (manifest.json), the generator (pattern templates,
+data settings and random states, generator.shelf) and chunks of fixed duration (chunk_<k>.shelf), each holding
+the pattern onsets and the input spikes of its time span. A data set can be extended by any number of seconds:
+chunks are appended with the generator state at the end of the data set, so extending a data set gives the
+same data as creating the longer data set at once. Readers stream chunks in order (iterChunks) or get the
+whole data set as one train (toTrain).
+
+Pattern schedule and spikes use separate random streams (as pdSeed and spikeTrainSeed of
+createSpikeTrainFromPatterns). Patterns active at the end of a chunk continue in the next one (tails), and so
+does the on/off period of patterns.
+"""
+import os
+import json
+import copy
+import numpy as np
+from .common import DictClass
+from .data import saveData, loadData
+from .spike_codec import encodeSpikes, decodeSpikes
+
+CHUNK_DURATION = 10.        # default duration of chunks in sec
+MANIFEST = 'manifest.json'
+GENERATOR = 'generator'
+CHUNK_NAME = 'chunk_%05d'
+DATA_EXT = '.shelf'
+
+
+def _secondsOf(steps, dt):
+    """
+    Returns duration in sec which is ceiled to steps by np.ceil(duration / dt) (as TTrain and PatternManager do).
+    """
+    duration = steps * dt
+    while np.ceil(duration / dt) > steps:
+        duration = np.nextafter(duration, 0.)
+    while np.ceil(duration / dt) < steps:
+        duration = np.nextafter(duration, np.inf)
+    return float(duration)
+
+
+def isChunkedDataset(path):
+    return os.path.exists(os.path.join(path, MANIFEST))
+
+
+class ChunkedDataset:
+    """
+    Data set stored in chunks of fixed duration, see module description.
+    """
+    def __init__(self, path):
+        """
+        Opens existing data set.
+            -> path : folder of data set
+        """
+        if not isChunkedDataset(path):
+            raise ValueError("Missing data set manifest: " + path)
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+
+    @classmethod
+    def create(cls, path, dataSettings, length, chunkDuration=CHUNK_DURATION, patternSeed=None, pdSeed=None,
+               spikeTrainSeed=None):
+        """
+        Creates data set of given length (in sec) in folder path.
+            -> dataSettings : data settings (DataSettings)
+            -> chunkDuration : duration of chunks in sec
+            -> patternSeed, pdSeed, spikeTrainSeed : seeds of patterns, pattern schedule and spikes,
+                                                     drawn if not given
+        """
+        from .spike_train import createPatterns
+        ds = dataSettings
+        assert ds.maxOverlappingPatterns == len(ds.mixingDistribution)
+        seeds = dict(patternSeed=patternSeed, pdSeed=pdSeed, spikeTrainSeed=spikeTrainSeed)
+        for k in sorted(seeds.keys()):
+            if not seeds[k]:
+                seeds[k] = int(np.random.randint(1, 2**31))
+        state = np.random.get_state()
+        pg = createPatterns(ds, seeds['patternSeed'])
+        np.random.seed(seeds['pdSeed'])
+        pdState = np.random.get_state()
+        np.random.seed(seeds['spikeTrainSeed'])
+        spikeState = np.random.get_state()
+        np.random.set_state(state)
+
+        os.makedirs(path, exist_ok=True)
+        templates = dict(zip(ds.patternIDs, pg.patterns))
+        saveData(os.path.join(path, GENERATOR + DATA_EXT), settings=dict(ds.__dict__), pg=pg, patterns=templates,
+                 state=dict(pdState=pdState, spikeState=spikeState, schedule={}))
+        manifest = dict(
+            dt=ds.dt,
+            chunkSteps=int(np.ceil(chunkDuration / ds.dt)),
+            nChannels=ds.nChannels,
+            patternShape=list(ds.patternShape),
+            nPatterns=ds.nPatterns,
+            patternIDs=[int(ID) for ID in ds.patternIDs],
+            patlen={str(ID): int(p.shape[1]) for ID, p in templates.items()},
+            seeds=seeds,
+            steps=0,
+            length=0.,
+            chunks=[],
+        )
+        with open(os.path.join(path, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=1)
+
+        dataset = cls(path)
+        dataset.extend(length)
+        return dataset
+
+    @property
+    def dt(self):
+        return self.manifest['dt']
+
+    @property
+    def length(self):
+        """
+        Length of data set in sec.
+        """
+        return self.manifest['length']
+
+    @property
+    def steps(self):
+        return self.manifest['steps']
+
+    @property
+    def nChannels(self):
+        return self.manifest['nChannels']
+
+    def getGenerator(self):
+        """
+        Returns dict with data settings (settings), pattern generator (pg), pattern templates (patterns)
+        and random states at the end of the data set (state).
+        """
+        return loadData(os.path.join(self.path, GENERATOR + DATA_EXT))
+
+    def _saveManifest(self):
+        tmp = os.path.join(self.path, MANIFEST + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))  # readers never see half written manifest
+
+    def extend(self, length):
+        """
+        Appends length (in sec) to data set. A last chunk shorter than the chunk duration is created again
+        from its start state, so chunks keep their fixed duration.
+        """
+        from .spike_train import TTrain
+        from .patterns import PatternManager
+        m = self.manifest
+        generator = self.getGenerator()
+        ds = DictClass(generator['settings'])
+        state = generator['state']
+        patlen = {int(ID): n for ID, n in m['patlen'].items()}
+
+        steps = int(np.ceil(length / self.dt))
+        chunks = m['chunks']
+        if chunks and chunks[-1]['steps'] < m['chunkSteps']:
+            last = chunks.pop()
+            state = loadData(os.path.join(self.path, last['name'] + DATA_EXT))['startState']
+            m['steps'] -= last['steps']
+            steps += last['steps']
+
+        pm = PatternManager(self.dt)
+        pm.addPatterns([generator['patterns'][ID] for ID in ds.patternIDs], list(ds.patternIDs))
+        saved = np.random.get_state()
+        try:
+            while steps > 0:
+                n = min(steps, m['chunkSteps'])
+                duration = _secondsOf(n, self.dt)
+                startState = copy.deepcopy(state)
+
+                # pattern schedule, with tails of patterns of previous chunk (negative onsets)
+                tails = {}
+                for p, ID, rest in state['schedule'].get('active', []):
+                    tails.setdefault(ID, []).append(rest - patlen[ID])
+                np.random.set_state(state['pdState'])
+                pd = pm.createUnsyncPatterns(duration, ds.patternIDs, ds.mixingDistribution, onoff=ds.dataOnOffPeriods,
+                                             state=state['schedule'])
+                state['pdState'] = np.random.get_state()
+
+                # spikes
+                np.random.set_state(state['spikeState'])
+                train = TTrain(pm.patterns, ds.nChannels, self.dt)
+                train.add(0., duration, {ID: pd[ID] + tails.get(ID, []) for ID in pd.keys()})
+                train.combinePatterns(ds.combineRules)
+                train.addFillNoise(ds.maxOverlappingPatterns, ds.dataFillNoiseRate, False, False)
+                train.addInbetweenNoise(ds.dataInbetweenNoiseRate)
+                train.createSpikes()
+                state['spikeState'] = np.random.get_state()
+
+                name = CHUNK_NAME % len(chunks)
+                saveData(os.path.join(self.path, name + DATA_EXT), start=m['steps'], steps=n, pd=pd, tails=tails,
+                         spikes=encodeSpikes(train.spikes), startState=startState)
+                chunks.append(dict(name=name, start=m['steps'], steps=n,
+                                   spikes=int(sum(len(s) for s in train.spikes))))
+                m['steps'] += n
+                steps -= n
+        finally:
+            np.random.set_state(saved)
+
+        m['length'] = m['steps'] * self.dt
+        # generator state first, a manifest never lists chunks the generator state is not past
+        generator['state'] = state
+        saveData(os.path.join(self.path, GENERATOR + DATA_EXT), **generator)
+        self._saveManifest()
+
+    def iterChunks(self):
+        """
+        Yields chunks in order, as dict:
+            start : start step of chunk in data set
+            steps : number of steps of chunk
+            pd : onsets of patterns starting in chunk (steps in data set)
+            tails : onsets of patterns started in previous chunk (steps in data set, before start)
+            spikes : list of spike times (in sec, in data set) of each channel
+        """
+        dt = self.dt
+        for info in self.manifest['chunks']:
+            chunk = loadData(os.path.join(self.path, info['name'] + DATA_EXT))
+            start = chunk['start']
+            spikes = []
+            for ch in decodeSpikes(chunk['spikes']):
+                # spikes are steps * dt (TTrain.createSpikes), in the data set as well
+                spikes.append((np.rint(np.asarray(ch) / dt).astype(np.int64) + start) * dt)
+            yield dict(start=start, steps=chunk['steps'],
+                       pd={ID: [t + start for t in ts] for ID, ts in chunk['pd'].items()},
+                       tails={ID: [t + start for t in ts] for ID, ts in chunk['tails'].items()},
+                       spikes=spikes)
+
+    def writeSpikeFile(self, path):
+        """
+        Writes spikes of data set to spike file (see eim.spike_file) chunk by chunk, in constant memory.
+        """
+        from .spike_file import writeChunkedSpikeFile
+        writeChunkedSpikeFile(path, lambda: (chunk['spikes'] for chunk in self.iterChunks()))
+
+    def toTrain(self):
+        """
+        Returns whole data set as train (TTrain with patterns, pattern distribution and spikes).
+        """
+        from .spike_train import TTrain
+        generator = self.getGenerator()
+        train = TTrain(generator['patterns'], self.nChannels, self.dt)
+        spikes = [[] for _ in range(self.nChannels)]
+        for chunk in self.iterChunks():
+            for ID, ts in chunk['pd'].items():
+                train.pd[ID] += ts
+            for ch, s in enumerate(chunk['spikes']):
+                spikes[ch].append(s)
+        train.duration = self.steps
+        train.spikes = [np.concatenate(s) if s else np.zeros(0) for s in spikes]
+        return train
+
+    def toData(self):
+        """
+        Returns data set as the content of a data shelf (as create_data.py saves it).
+        """
+        generator = self.getGenerator()
+        ds = DictClass(generator['settings'])
+        return dict(patternShape=ds.patternShape, nPatterns=ds.nPatterns, nChannels=ds.nChannels,
+                    pg=generator['pg'], train=self.toTrain(), length=self.length)
@@ -0,0 +1,93 @@
+"""
+Dtypes of arrays of the data pipeline (spike_train, patterns, analysis, measures).
+By default rates and traces are float32, time step indices and counts int32 (int64 if their range needs it)
+and binary pattern masks are bit-packed. setPolicy(compact=False) restores float64 / int64 / unpacked masks.
+"""
+import numpy as np
+
+RATE = np.float32       # rates of patterns, trains and noise in Hz
+TRACE = np.float32      # PSP and analysis traces
+INDEX = np.int32        # time step indices, pattern numbers and spike counts
+PACK_MASKS = True       # keep binary pattern masks bit-packed (PackedMask)
+
+
+def setPolicy(compact=True):
+    """
+    Sets dtypes of the pipeline, affects arrays created afterwards.
+        -> compact : if True float32 / int32 / packed masks, otherwise float64 / int64 / unpacked masks
+    """
+    global RATE, TRACE, INDEX, PACK_MASKS
+    if compact:
+        RATE, TRACE, INDEX, PACK_MASKS = np.float32, np.float32, np.int32, True
+    else:
+        RATE, TRACE, INDEX, PACK_MASKS = np.float64, np.float64, np.int64, False
+
+
+def getPolicy():
+    """
+    Returns current dtypes as dict.
+    """
+    return dict(RATE=RATE, TRACE=TRACE, INDEX=INDEX, PACK_MASKS=PACK_MASKS)
+
+
+def indexType(maxValue):
+    """
+    Returns INDEX if it can hold values up to maxValue, int64 otherwise.
+        -> maxValue : largest (absolute) value stored
+    """
+    if abs(int(maxValue)) <= np.iinfo(INDEX).max:
+        return INDEX
+    return np.int64
+
+
+class PackedMask:
+    """
+    Binary mask stored with 8 values per byte (packed along the last axis).
+    Indexing and np.asarray return unpacked bool arrays.
+    """
+    def __init__(self, mask):
+        """
+            -> mask : array of 0/1 or bool values
+        """
+        mask = np.asarray(mask)
+        self.shape = mask.shape
+        self.bits = np.packbits(mask != 0, axis=-1)
+
+    @property
+    def dtype(self):
+        return np.dtype(bool)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def __len__(self):
+        return self.shape[0]
+
+    def unpack(self):
+        """
+        Returns the mask as bool array.
+        """
+        return np.unpackbits(self.bits, axis=-1, count=self.shape[-1]).astype(bool)
+
+    def __array__(self, dtype=None, copy=None):
+        mask = self.unpack()
+        return mask if dtype is None else mask.astype(dtype)
+
+    def __getitem__(self, index):
+        if len(self.shape) > 1 and (isinstance(index, (int, np.integer)) or
+                                    (isinstance(index, tuple) and len(index) == 1)):
+            # rows can be unpacked alone
+            row = index[0] if isinstance(index, tuple) else index
+            return np.unpackbits(self.bits[row], axis=-1, count=self.shape[-1]).astype(bool)
+        return self.unpack()[index]
+
+
+def packMask(mask):
+    """
+    Returns mask as PackedMask if PACK_MASKS is set, as bool array otherwise.
+        -> mask : array of 0/1 or bool values
+    """
+    if PACK_MASKS:
+        return PackedMask(mask)
+    return np.asarray(mask) != 0
@@ -0,0 +1,163 @@
+"""
+Instrumentation of the simulation chain: named timed spans (data load, network build, simulate, ...),
+counters (spikes, synapses), optional cProfile and tracemalloc capture per span.
+Records are written as JSON lines. Instrumentation is disabled unless configured
+(INSTRUMENTATION in simulation settings), then spans cost only a function call.
+
+Example:
+    with instrument.span('simulate', Tsim=10.):
+        net.simulate(10.)
+    instrument.count('spikes', nspikes)
+    instrument.event('weights_init', source='results/training')
+"""
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+
+_state = dict(configured=False, enabled=False, output=None, profile=False, memory=False, profileTop=20)
+_stack = []
+_counters = {}
+
+
+def configure(settings):
+    """
+    Configures instrumentation.
+        -> settings : None (disabled) or dict with keys
+            output : file to append JSON lines to (default stderr)
+            profile : cProfile spans, True for all or list of span names (default False)
+            profileTop : number of functions (by cumulative time) recorded per profiled span (default 20)
+            memory : record peak of memory traced by tracemalloc during each span (default False)
+    """
+    settings = settings or {}
+    _state.update(configured=True, enabled=bool(settings), output=settings.get('output'),
+                  profile=settings.get('profile', False), memory=settings.get('memory', False),
+                  profileTop=settings.get('profileTop', 20))
+    _counters.clear()
+    if _state['memory']:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+def isConfigured():
+    return _state['configured']
+
+
+def isEnabled():
+    return _state['enabled']
+
+
+def _toJSON(value):
+    # numpy scalars
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def _write(record):
+    line = json.dumps(record, default=_toJSON)
+    if _state['output']:
+        with open(_state['output'], 'a') as f:
+            f.write(line + '\n')
+    else:
+        sys.stderr.write(line + '\n')
+
+
+def _profileSpan(name):
+    profile = _state['profile']
+    if not profile:
+        return False
+    # only one profiler can be active, nested spans are included in the outer profile
+    if any(frame['profiler'] is not None for frame in _stack):
+        return False
+    return profile is True or name in profile
+
+
+def _profileSummary(profiler):
+    import pstats
+    stats = pstats.Stats(profiler)
+    stats.sort_stats('cumulative')
+    summary = []
+    for func in stats.fcn_list[:_state['profileTop']]:
+        cc, nc, tt, ct, callers = stats.stats[func]
+        summary.append(dict(function="%s:%d(%s)" % (os.path.basename(func[0]), func[1], func[2]),
+                            calls=nc, tottime=tt, cumtime=ct))
+    return summary
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Timed span, record is written when span ends. Nested spans reference their parent.
+    Yields dict of attributes which can be extended inside the span.
+    """
+    if not _state['enabled']:
+        yield attributes
+        return
+
+    frame = dict(name=name, profiler=None, memoryPeak=0)
+    if _profileSpan(name):
+        import cProfile
+        frame['profiler'] = cProfile.Profile()
+    if _state['memory']:
+        import tracemalloc
+        if _stack:
+            parent = _stack[-1]
+            parent['memoryPeak'] = max(parent['memoryPeak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    parentName = _stack[-1]['name'] if _stack else None
+    _stack.append(frame)
+
+    startTime = time.time()
+    start = time.perf_counter()
+    cpuStart = time.process_time()
+    if frame['profiler']:
+        frame['profiler'].enable()
+    try:
+        yield attributes
+    finally:
+        if frame['profiler']:
+            frame['profiler'].disable()
+        record = dict(type='span', name=name, parent=parentName, start=startTime,
+                      wall=time.perf_counter() - start, cpu=time.process_time() - cpuStart)
+        record.update(attributes)
+        _stack.pop()
+        if _state['memory']:
+            import tracemalloc
+            peak = max(frame['memoryPeak'], tracemalloc.get_traced_memory()[1])
+            record['memoryPeakMB'] = peak / (1024. * 1024.)
+            if _stack:
+                _stack[-1]['memoryPeak'] = max(_stack[-1]['memoryPeak'], peak)
+        if frame['profiler']:
+            record['profile'] = _profileSummary(frame['profiler'])
+        _write(record)
+
+
+def count(name, value=1):
+    """
+    Adds value to counter, counters are written by flush.
+    """
+    if _state['enabled']:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def event(name, **attributes):
+    """
+    Writes record of an event of the chain (e.g. which result initializes the weights).
+    """
+    if _state['enabled']:
+        record = dict(type='event', name=name, time=time.time())
+        record.update(attributes)
+        _write(record)
+
+
+def flush(**attributes):
+    """
+    Writes counters (with given attributes) and resets them.
+    """
+    if _state['enabled'] and _counters:
+        record = dict(type='counters', time=time.time())
+        record.update(attributes)
+        record.update(_counters)
+        _write(record)
+        _counters.clear()
@@ -1,4 +1,5 @@
 import numpy as np
+from . import dtypes
 
 
 def spikeF1Measure(pd, patlen, output, duration, Nout, groups):
@@ -40,8 +41,8 @@ def spikeF1Measure(pd, patlen, output, duration, Nout, groups):
                     groupstate[ID - 1, sp] = True
 
     #calc FP and FN
-    TP = np.zeros((npatterns))
-    FN = np.zeros((npatterns))
+    TP = np.zeros((npatterns), dtype=dtypes.indexType(duration))
+    FN = np.zeros((npatterns), dtype=dtypes.indexType(duration))
 
     for ind, ID in enumerate(pd.keys()):
         for t in pd[ID]:
@@ -59,7 +60,7 @@ def spikeF1Measure(pd, patlen, output, duration, Nout, groups):
             re[i] = TP[i] / (TP[i] + FN[i])
 
     #calc FP
-    FP = np.zeros((npatterns))
+    FP = np.zeros((npatterns), dtype=dtypes.indexType(duration))
 
     end = 0
     for ind, ID in enumerate(pd.keys()):
@@ -109,8 +110,8 @@ def spikePrecisionMeasure(pd, patlen, output, duration, Nout):
                 patternstate[ind, start: t + length] = True
 
     numhid = len(output)
-    TP = np.zeros((numhid, npatterns))
-    FP = np.zeros((numhid, npatterns))
+    TP = np.zeros((numhid, npatterns), dtype=dtypes.indexType(duration))
+    FP = np.zeros((numhid, npatterns), dtype=dtypes.indexType(duration))
 
     # count TPs and FNs
     for i, ch in enumerate(output):
@@ -16,6 +16,11 @@ SYN_II_CONN_PROB = 0.55
 
 GENERAL_SEED = 42                         # seed for constructing network
 
+INPUT_GENERATOR = 'spike_generator'       # 'spike_generator', 'spike_file_generator' (input is streamed from spike file during simulation) or
+                                          # 'pattern_poisson_generator' (spikes are drawn during simulation from train created with createSpikes=False)
+INPUT_SPIKE_FILE = '{result}_input.spk'   # spike file written for spike_file_generator when input is given as spike times,
+                                          # {result} is replaced by the result name (a temporary file without result)
+
 #########################################
 ##    NETWORK PHYSIOLOGY PARAMETERS    ##
 #########################################
@@ -30,6 +35,11 @@ PSP_TRISE = 1.                            # rise const of double exp PSP in ms
 PSP_TFALL = 10.                           # rise const of double exp PSP in ms
 PSP_SCALING = 1.435                       # psp scaling const (peak of PSP is rescaled to 1.)
 
+NEURON_MODEL = 'swta_neuron_dbl_exp'      # neuron model of e and i pools, 'swta_neuron_dbl_exp_pop' updates each pool as one population (arrays of state)
+FAST_RATE = False                         # if True neurons use precomputed constants and approximated exp (rel. error < 1e-10) for firing rate
+THINNING = False                          # if True neurons sample spikes by thinning (random numbers per candidate spike instead of per step),
+                                          # only swta_neuron_dbl_exp, settings fail with other models
+
 
 # SYNAPTIC WEIGHTS
 SYN_IN_WEIGHT_MIN = 0.01
@@ -48,6 +58,7 @@ SYN_II_DELAY = 1.
 # STDP properties, in ms
 STDP_WINDOW_PLUS = 10.
 STDP_WINDOW_MINUS = 25.
+STDP_SYNAPSE_MODEL = 'sem_synapse'        # 'sem_synapse' or 'sem_synapse_hom' (common STDP params, precomputed decay factors)
 
 
 #########################################
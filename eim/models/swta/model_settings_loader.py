@@ -17,8 +17,9 @@ def createSettings(module, additionalSettings):
 
     pool_in = {
         'name': 'in_',
-        'neuronType': 'spike_generator',
+        'neuronType': nms.INPUT_GENERATOR,
         'isInput': True,
+        'spikeFile': nms.INPUT_SPIKE_FILE,
         'N': nms.NUMINP,
         'rec': True
     }
@@ -33,7 +34,7 @@ def createSettings(module, additionalSettings):
     pool_e = {
         'name': 'e',
         'N': nms.NUMEXC,
-        'neuronType': 'swta_neuron_dbl_exp',
+        'neuronType': nms.NEURON_MODEL,
         'neuronparams': {
             'V_m': nms.BIAS_E,
             'tau_r': nms.PSP_TRISE,
@@ -49,13 +50,14 @@ def createSettings(module, additionalSettings):
             'z_scale': nms.PSP_SCALING,
             'I_scale': 1.,
             'tau_minus': nms.STDP_WINDOW_MINUS,
+            'fast_rate': nms.FAST_RATE,
         },
         'rec': True
     }
 
     pool_i = {'name': 'i',
         'N': nms.NUMINH,
-        'neuronType': 'swta_neuron_dbl_exp',
+        'neuronType': nms.NEURON_MODEL,
         'neuronparams': {
             'V_m': nms.BIAS_I,
             'tau_r': nms.PSP_TRISE,
@@ -71,15 +73,20 @@ def createSettings(module, additionalSettings):
             'z_scale': nms.PSP_SCALING,
             'I_scale': 1.,
             'tau_minus': nms.STDP_WINDOW_MINUS,
+            'fast_rate': nms.FAST_RATE,
         },
         'rec': True
     }
 
+    if nms.NEURON_MODEL == 'swta_neuron_dbl_exp':
+        for pool in (pool_e, pool_i):
+            pool['neuronparams']['thinning'] = nms.THINNING
+    elif nms.THINNING:
+        raise ValueError("THINNING is not supported by neuron model: " + nms.NEURON_MODEL)
+
     pools = [pool_in, pool_in_parrot, pool_e, pool_i]
 
-    stdp_params = {
-        'model': 'sem_synapse',
-        'learning_is_active': 0.,
+    stdp_common = {
         'lambda': nms.ETA * np.e,
         'alpha': 1. / np.e,
         'nu_plus': -1.,
@@ -87,10 +94,22 @@ def createSettings(module, additionalSettings):
         'A': 0.,
         'tau_plus': nms.STDP_WINDOW_PLUS,
         'Wmax': nms.SYN_IN_WEIGHT_MAX,
+    }
+
+    stdp_params = {
+        'model': nms.STDP_SYNAPSE_MODEL,
+        'learning_is_active': 0.,
         'weight': {'distribution': 'uniform', 'low': nms.SYN_IN_WEIGHT_MIN, 'high': nms.SYN_IN_WEIGHT_MAX},
         'delay': {'distribution': 'uniform', 'low': nms.SYN_IN_DELAY_MIN, 'high': nms.SYN_IN_DELAY_MAX},
     }
 
+    conn_in_e = {'source': 'in', 'target': 'e', 'rule': {'rule': 'pairwise_bernoulli', 'p': nms.SYN_IN_CONN_PROB}, 'syntype': stdp_params}
+    if nms.STDP_SYNAPSE_MODEL == 'sem_synapse_hom':
+        # homogeneous synapses take STDP params only as model defaults
+        conn_in_e['commonparams'] = stdp_common
+    else:
+        stdp_params.update(stdp_common)
+
     syntype_ei = {'model': 'static_synapse', 'delay': nms.SYN_EI_DELAY, 'weight': nms.SYN_EI_WEIGHT}
     syntype_ie = {'model': 'static_synapse', 'delay': nms.SYN_IE_DELAY, 'weight': nms.SYN_IE_WEIGHT}
     syntype_ii = {'model': 'static_synapse', 'delay': nms.SYN_II_DELAY, 'weight': nms.SYN_II_WEIGHT}
@@ -98,10 +117,10 @@ def createSettings(module, additionalSettings):
 
     poolsconns = [
         {'source': 'in_', 'target': 'in', 'rule': {'rule': 'one_to_one'}, 'syntype': {}},
-        {'source': 'in', 'target': 'e', 'rule': {'rule': 'pairwise_bernoulli', 'p': nms.SYN_IN_CONN_PROB}, 'syntype': stdp_params},
+        conn_in_e,
         {'source': 'e',  'target': 'i', 'rule': {'rule': 'pairwise_bernoulli', 'p': nms.SYN_EI_CONN_PROB}, 'syntype': syntype_ei},
         {'source': 'i',  'target': 'e', 'rule': {'rule': 'pairwise_bernoulli', 'p': nms.SYN_IE_CONN_PROB}, 'syntype': syntype_ie},
         {'source': 'i',  'target': 'i', 'rule': {'rule': 'pairwise_bernoulli', 'p': nms.SYN_II_CONN_PROB}, 'syntype': syntype_ii}
     ]
 
-    return dict(settings=nms, generalRNGSeed=nms.GENERAL_SEED, pools=pools, poolsconns=poolsconns)
+    return dict(settings=nms, generalRNGSeed=nms.GENERAL_SEED, pools=pools, poolsconns=poolsconns, backend='nest')
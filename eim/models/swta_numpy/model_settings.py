@@ -0,0 +1,4 @@
+# swta model simulated with the NumPy backend (eim.network_numpy), NEST is not needed
+# all settings are the same as in swta model (see models/swta/model_settings.py)
+
+from eim.models.swta.model_settings import *
@@ -0,0 +1,7 @@
+from eim.models.swta import model_settings_loader as swta_loader
+
+
+def createSettings(module, additionalSettings):
+    settings = swta_loader.createSettings(module, additionalSettings)
+    settings['backend'] = 'numpy'
+    return settings
@@ -1,10 +1,101 @@
-import nest
+import os
 import numpy as np
 import multiprocessing
+from .common import LazyModule
+from . import instrument
 from .spike_train import train_sec2ms
+from .connectivity import projectionName, createProjection
 
+# NEST is imported on first use (it is slow to import and prints its banner)
+nest = LazyModule('nest')
 
-def setup_nest(grng_seed, rng_seed, resolution):
+
+def isRootRank():
+    """
+    Returns True in the process which collects results (always True if MPI is not used).
+    """
+    # without NEST (NumPy backend) there is a single process
+    if not nest._isLoaded():
+        return True
+    return nest.Rank() == 0
+
+
+def getMPIComm():
+    """
+    Returns MPI communicator if NEST runs distributed over several processes, otherwise None.
+    Requires mpi4py in distributed mode (NEST initializes MPI itself).
+    """
+    if nest.NumProcesses() == 1:
+        return None
+    from mpi4py import MPI
+    return MPI.COMM_WORLD
+
+
+def gatherArrays(arrays, allRanks=False):
+    """
+    Concatenates rank local pieces of each array in arrays.
+    Result is available on rank 0, or on all ranks if allRanks is True.
+    On other ranks empty arrays are returned.
+    """
+    comm = getMPIComm()
+    if comm is None:
+        return arrays
+    pieces = comm.allgather(arrays) if allRanks else comm.gather(arrays, root=0)
+    if pieces is None:
+        return [np.array(a)[:0] for a in arrays]
+    return [np.concatenate([np.asarray(p[i]) for p in pieces]) for i in range(len(arrays))]
+
+
+def _removeFile(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def getRankCpuAffinity(cpuAffinity):
+    """
+    Returns cores of this process: cpuAffinity is a list of cores or,
+    when running under MPI, it can be a list with a list of cores for each rank.
+    """
+    if cpuAffinity and isinstance(cpuAffinity[0], (list, tuple)):
+        return cpuAffinity[nest.Rank()]
+    return cpuAffinity
+
+
+def getNumThreads(localNumThreads=None, cpuAffinity=None):
+    """
+    Returns number of threads NEST should use in this process.
+    If not given, all available cores are used (cores in cpuAffinity if pinning is requested),
+    shared evenly between MPI processes running on the same machine.
+    """
+    if localNumThreads:
+        return localNumThreads
+    cpuAffinity = getRankCpuAffinity(cpuAffinity)
+    if cpuAffinity:
+        return len(cpuAffinity)
+    return max(1, multiprocessing.cpu_count() // nest.NumProcesses())
+
+
+def createThreadSeeds(rng_seed, n_vp):
+    """
+    Creates one seed per virtual process derived from rng_seed.
+    First seed equals rng_seed, so single threaded runs are unchanged and
+    results are reproducible for a fixed number of threads.
+    """
+    return [rng_seed + vp for vp in range(n_vp)]
+
+
+def setCpuAffinity(cpuAffinity):
+    """
+    Pins this process (and all NEST threads started from it) to the given list of cores.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        raise ValueError("CPU pinning is not supported on this platform")
+    os.sched_setaffinity(0, cpuAffinity)
+
+
+def setup_nest(grng_seed, rng_seed, resolution, local_num_threads=1, cpu_affinity=None):
     """
     Setup NEST multithreading and seeds, and load swtamodule.
     """
@@ -17,13 +108,25 @@ def setup_nest(grng_seed, rng_seed, resolution):
         else:
             raise ex
 
-    print("seeeeeeeds", grng_seed, rng_seed)
- 
+    cpu_affinity = getRankCpuAffinity(cpu_affinity)
+    if cpu_affinity:
+        setCpuAffinity(cpu_affinity)
+
     nest.ResetKernel()
-    nest.SetKernelStatus({'grng_seed': grng_seed, 'rng_seeds':[rng_seed], 'resolution': resolution * 1000.})
+    # number of threads has to be set before seeds, seeds are given per virtual process
+    nest.SetKernelStatus({'local_num_threads': local_num_threads, 'resolution': resolution * 1000.})
+    seed_nest(grng_seed, rng_seed)
     nest.set_verbosity('M_FATAL')
 
 
+def seed_nest(grng_seed, rng_seed):
+    """
+    Seeds global and per virtual process random generators of NEST, random streams start anew.
+    """
+    n_vp = nest.GetKernelStatus('total_num_virtual_procs')
+    nest.SetKernelStatus({'grng_seed': grng_seed, 'rng_seeds': createThreadSeeds(rng_seed, n_vp)})
+
+
 def findPool(pools, poolName):
     for pool in pools:
         if pool["name"] == poolName:
@@ -40,39 +143,115 @@ class NeuronsPool:
         neuronparams = poolparams.get('neuronparams',{})
         self.neurontype = poolparams.get('neuronType', 'swta_neuron_dbl_exp')
         self.isInput = poolparams.get('isInput', False)
+        self.spikeFile = poolparams.get('spikeFile', '{result}_input.spk')  # input of spike_file_generator
+        self.tempSpikeFile = None  # spike file written for input without result name
 
         self.pop = nest.Create(self.neurontype, self.N, neuronparams)
         self.globalToLocalID = {globalID: localID for localID, globalID in enumerate(self.pop)}
         self.recording = False
+        self.origin = 0.  # ms, time of current input, spikes are given relative to it
 
         if poolparams.get('rec', False):
             self.rec_pop = nest.Create('spike_detector')
             nest.Connect(self.pop, self.rec_pop, {'rule': 'all_to_all'})
             self.recording = True
 
-    # set spikes: spikes in sec
-    def setSpikes(self, spikes):
+        self.membraneMeter = None
+        self.membraneRecordables = []
+
+    # set spikes: spikes in sec, relative to origin (in ms), spike file (see eim.spike_file) or pattern schedule (TTrain)
+    # previous spikes of generators are replaced, so network can be reused with new input
+    # result: name of result the input is simulated for, names spike file written for spike_file_generator
+    def setSpikes(self, spikes, origin=0., result=None):
+        if hasattr(spikes, 'getGeneratorStatus'):
+            # pattern schedule (train created without spikes)
+            if self.isInput and self.neurontype == 'pattern_poisson_generator':
+                status = spikes.getGeneratorStatus()
+                for st in status:
+                    st['origin'] = origin
+                nest.SetStatus(self.pop, status)
+                self.origin = origin
+                return
+            spikes = spikes.createScheduledSpikes()
+        elif self.isInput and self.neurontype == 'pattern_poisson_generator':
+            raise ValueError("pattern_poisson_generator needs train created without spikes (createSpikes=False)")
+        if self.isInput and self.neurontype == 'spike_file_generator':
+            self._setSpikeFile(spikes, origin, result)
+            return
+        if isinstance(spikes, str):
+            from .spike_file import readSpikeFile
+            spikes = readSpikeFile(spikes)
         assert len(spikes) == self.N 
         if self.isInput:
-            
-            for i in range(len(self.pop)):
-                for k, spike in enumerate(spikes[i]):
-                    if spike == 0:
-                        spikes[i][k] = 0.001
+            status = []
+            for s in spikes:
+                times = np.array(s, dtype=float)  # copy, spikes of the train are not changed
+                times[times == 0] = 0.001  # spike generator can not spike at 0
+                status.append({'spike_times': times * 1000., 'origin': origin})  # converting sec to ms
+            nest.SetStatus(self.pop, status)
+            self.origin = origin
+
+    def _getSpikeFilePath(self, result):
+        """
+        Returns path of spike file written for input of result ({result} in pool spike file), a temporary file of
+        the pool if there is no result, so concurrent simulations do not share the file. The temporary file is
+        reused for later input of the pool and removed at exit.
+        """
+        if '{result}' not in self.spikeFile:
+            return self.spikeFile
+        if result is not None:
+            return self.spikeFile.replace('{result}', result)
+        if self.tempSpikeFile is None:
+            path = None
+            if isRootRank():
+                import atexit
+                import tempfile
+                fd, path = tempfile.mkstemp(suffix='.spk', prefix='input_', dir='.')
+                os.close(fd)
+                atexit.register(_removeFile, path)
+            comm = getMPIComm()
+            self.tempSpikeFile = comm.bcast(path, root=0) if comm is not None else path
+        return self.tempSpikeFile
+
+    def _setSpikeFile(self, spikes, origin, result=None):
+        """
+        Generators stream their channel from a spike file (see eim.spike_file) during the simulation.
+            -> spikes : spike file, or spikes (in sec) which are written to pool spike file first
+            -> result : name of result, spike file of pool is named after it
+        """
+        from .spike_file import writeSpikeFile, getSpikeFileChannels
+        if isinstance(spikes, str):
+            path = spikes
+        else:
+            assert len(spikes) == self.N
+            path = self._getSpikeFilePath(result)
+            if isRootRank():
+                writeSpikeFile(path, spikes)
+            comm = getMPIComm()
+            if comm is not None:
+                comm.Barrier()
+        assert getSpikeFileChannels(path) == self.N, "Spike file does not match pool: " + path
+        status = [{'filename': os.path.abspath(path), 'channel': i, 'origin': origin} for i in range(self.N)]
+        nest.SetStatus(self.pop, status)
+        self.origin = origin
 
-                neuronSpikes = np.array(spikes[i]) * 1000. # converting sec to ms
-                if len(neuronSpikes) > 0:
-                    nest.SetStatus([self.pop[i]], {'spike_times': neuronSpikes})
+    # removes recorded spikes, later spikes are returned relative to origin (in ms)
+    def clearSpikes(self, origin=0.):
+        if self.recording:
+            nest.SetStatus(self.rec_pop, {'n_events': 0})
+        if self.membraneMeter is not None:
+            nest.SetStatus(self.membraneMeter, {'n_events': 0})
+        self.origin = origin
 
    # returns sikes: spikes in sec
+    # in distributed mode each rank records only its local neurons, spikes are collected on rank 0
     def getSpikes(self):
         events = nest.GetStatus(self.rec_pop)[0]['events']  # there is 1 recorder per population
-        times = events['times']
-        senders = events['senders']
+        times, senders = gatherArrays([events['times'] - self.origin, events['senders']])
 
         spikes = [[] for i in range(self.N)]
         for i in range(len(times)):
-            spikes[self.globalToLocalID[senders[i]]].append(times[i])
+            spikes[self.globalToLocalID[int(senders[i])]].append(times[i])
 
         spikes = [np.array(s)/1000. for s in spikes]  # convert ms to sec
 
@@ -81,19 +260,55 @@ class NeuronsPool:
     def hasRecorder(self):
         return self.recording
 
+    def enableMembraneRecording(self, neurons, recordables, interval):
+        """
+        Attaches multimeter to chosen neurons, samples are read (and removed) by getMembraneSamples.
+            -> neurons : local indices of recorded neurons
+            -> recordables : e.g. ['V_m', 'E_sfa']
+            -> interval : sampling interval in ms, multiple of resolution
+        """
+        if self.membraneMeter is not None:
+            # network is reused, multimeter is already attached
+            return
+        self.membraneRecordables = list(recordables)
+        self.membraneMeter = nest.Create('multimeter', 1, {'record_from': self.membraneRecordables,
+                                                           'interval': interval, 'withtime': True})
+        nest.Connect(self.membraneMeter, [self.pop[i] for i in neurons])
+
+    def getMembraneSamples(self):
+        """
+        Returns samples recorded since last call: times (ms, relative to origin), local indices of neurons and
+        values (samples x recordables). Samples are removed from multimeter, so its memory stays bounded.
+        In distributed mode samples are collected on rank 0.
+        """
+        events = nest.GetStatus(self.membraneMeter)[0]['events']
+        nest.SetStatus(self.membraneMeter, {'n_events': 0})
+        arrays = gatherArrays([events['times'] - self.origin, events['senders']] +
+                              [events[name] for name in self.membraneRecordables])
+        return arrays[0], self.toLocalIDs(arrays[1]), np.array(arrays[2:]).reshape(len(self.membraneRecordables), -1).T
+
+    def toLocalIDs(self, globalIDs):
+        # nest.Create returns consecutive ids
+        return np.asarray(globalIDs, dtype=np.int64) - self.pop[0]
+
 
 class Network:
-    def __init__(self, simulationSettings, modelSettings):
+    def __init__(self, simulationSettings, modelSettings, connectivity=None):
+        """
+            -> connectivity : snapshot (see getConnectivity), projections in it are connected
+                              exactly as in snapshot instead of by connection rules
+        """
         ss, ms = simulationSettings, modelSettings
         self.dt = ss.dt
         self.simulationRNGSeed = ss.simulationRNGSeed
         self.generalRNGSeed = ms.generalRNGSeed
+        self.localNumThreads = getNumThreads(ss.localNumThreads, ss.cpuAffinity)
 
         pools = ms.pools
         poolsconns = ms.poolsconns
 		
         # setup nest
-        setup_nest(self.generalRNGSeed, self.simulationRNGSeed, self.dt)
+        setup_nest(self.generalRNGSeed, self.simulationRNGSeed, self.dt, self.localNumThreads, ss.cpuAffinity)
 
         # pools holder
         self.pools = {}
@@ -107,10 +322,35 @@ class Network:
         # connect pools
         self.conns = {}
         self.connslearning = []
-        for conn in poolsconns:
-            sourcePop = self.pools[conn['source']].pop
-            targetPop = self.pools[conn['target']].pop
-            nest.Connect(sourcePop, targetPop, conn['rule'], conn['syntype'])
+        self.poolsconns = poolsconns
+        self._connectionsCache = {}
+        connected = set()
+        with instrument.span('connect'):
+            for conn in poolsconns:
+                sourcePop = self.pools[conn['source']].pop
+                targetPop = self.pools[conn['target']].pop
+                if 'commonparams' in conn:
+                    nest.SetDefaults(conn['syntype']['model'], conn['commonparams'])
+                name = projectionName(conn['source'], conn['target'])
+                if connectivity and name in connectivity:
+                    # snapshot holds all connections between the pools
+                    if name not in connected:
+                        self._connectProjection(sourcePop, targetPop, conn['syntype'], connectivity[name])
+                        connected.add(name)
+                else:
+                    nest.Connect(sourcePop, targetPop, conn['rule'], conn['syntype'])
+
+    def _connectProjection(self, sourcePop, targetPop, syntype, projection):
+        """
+        Creates all connections of projection in one bulk connect.
+        """
+        assert projection['shape'] == (len(targetPop), len(sourcePop)), "Snapshot does not match pools"
+        syntype = dict(syntype)
+        syntype['weight'] = projection['weights']
+        syntype['delay'] = projection['delays']
+        pre = np.asarray(sourcePop)[projection['sources']].tolist()
+        post = np.asarray(targetPop)[projection['targets']].tolist()
+        nest.Connect(pre, post, {'rule': 'one_to_one'}, syntype)
 
     def setWeights(self, sourcePoolName, targetPoolName, W):
         sourcePool = self.pools[sourcePoolName]
@@ -120,28 +360,88 @@ class Network:
         flattenWeights = [{'weight': W[targetPool.globalToLocalID[c[1]]][sourcePool.globalToLocalID[c[0]]]} for c in conn]
         nest.SetStatus(conn, flattenWeights)
 
+    def _getConnections(self, sourcePoolName, targetPoolName):
+        """
+        Returns connections between pools and local indices of their targets and sources (gathered from all ranks).
+        Connections do not change after network is built, so they are looked up once.
+        """
+        key = (sourcePoolName, targetPoolName)
+        if key not in self._connectionsCache:
+            sourcePool = self.pools[sourcePoolName]
+            targetPool = self.pools[targetPoolName]
+            conn = nest.GetConnections(sourcePool.pop, targetPool.pop)
+            ids = np.array(conn, dtype=np.int64).reshape(-1, 5)
+            sources, targets = gatherArrays([ids[:, 0], ids[:, 1]], allRanks=True)
+            self._connectionsCache[key] = (conn, targetPool.toLocalIDs(targets), sourcePool.toLocalIDs(sources))
+        return self._connectionsCache[key]
+
+    # in distributed mode each rank sees only connections to its local neurons,
+    # pieces are shared with all ranks as later simulations are initialized from these weights
     def getShapedWeights(self, sourcePoolName, targetPoolName):
-        sourcePop = self.pools[sourcePoolName].pop
-        targetPop = self.pools[targetPoolName].pop
-        conn = nest.GetConnections(sourcePop, targetPop)
-        stats = nest.GetStatus(conn)
-        return np.array([s['weight'] for s in stats]).reshape((len(sourcePop), len(targetPop))).T
+        sourcePool = self.pools[sourcePoolName]
+        targetPool = self.pools[targetPoolName]
+        conn, targets, sources = self._getConnections(sourcePoolName, targetPoolName)
+        weights, = gatherArrays([nest.GetStatus(conn, 'weight')], allRanks=True)
 
-    def simulate(self, Tsim, stimulus=None, reset=True):
+        # with several threads connections are not ordered by source, so map each one to its place
+        W = np.zeros((len(targetPool.pop), len(sourcePool.pop)))
+        W[targets, sources] = weights
+        return W
+
+    # result: name of result the stimulus is simulated for (names spike file written for spike_file_generator)
+    def simulate(self, Tsim, stimulus=None, reset=True, result=None):
         if not stimulus is None:
-            self.pools['in_'].setSpikes(stimulus)
+            # new input starts now, spikes recorded before are dropped
+            origin = nest.GetKernelStatus('time')
+            self.pools['in_'].setSpikes(stimulus, origin, result)
+            for pool in self.pools.values():
+                pool.clearSpikes(origin)
 
         if reset:
             nest.ResetNetwork();
-
-        print("Tsim(ms) = ", Tsim * 1000., " dt(ms) = ", self.dt * 1000.)
+            # ResetNetwork keeps synapse traces and random streams, a reused network has to continue
+            # as a freshly built one: traces of earlier input are dropped and streams start anew
+            conn = nest.GetConnections(self.pools['in'].pop, self.pools['e'].pop)
+            nest.SetStatus(conn, 'Kplus', 0.)
+            seed_nest(self.generalRNGSeed, self.simulationRNGSeed)
 
         nest.Simulate(Tsim * 1000.)
-        print("Simulation complete")
 
     def getAllSpikes(self):
         return {poolName: pool.getSpikes() for poolName, pool in self.pools.items() if pool.hasRecorder()}
 
+    def enableMembraneRecording(self, poolName, neurons, recordables, interval):
+        self.pools[poolName].enableMembraneRecording(neurons, recordables, interval)
+
+    def getMembraneSamples(self, poolName):
+        return self.pools[poolName].getMembraneSamples()
+
+    def getConnectivity(self):
+        """
+        Returns snapshot of all projections (see eim.connectivity), in distributed mode on all ranks
+        (a network connected from it needs the same Connect calls on every rank).
+        """
+        connectivity = {}
+        for conn in self.poolsconns:
+            name = projectionName(conn['source'], conn['target'])
+            if name in connectivity:
+                continue
+            sourcePool = self.pools[conn['source']]
+            targetPool = self.pools[conn['target']]
+            conns = nest.GetConnections(sourcePool.pop, targetPool.pop)
+            ids = np.array(conns, dtype=np.int64).reshape(-1, 5)
+            status = np.array(nest.GetStatus(conns, ['weight', 'delay']), dtype=float).reshape(-1, 2)
+            sources, targets, weights, delays = gatherArrays([ids[:, 0], ids[:, 1], status[:, 0], status[:, 1]],
+                                                          allRanks=True)
+            connectivity[name] = createProjection(conn['source'], conn['target'], conn['syntype'].get('model', 'static_synapse'),
+                                                  (targetPool.N, sourcePool.N), sourcePool.toLocalIDs(sources),
+                                                  targetPool.toLocalIDs(targets), weights, delays)
+        return connectivity
+
+    def getNumConnections(self):
+        # includes connections to spike detectors
+        return nest.GetKernelStatus('num_connections')
+
     def setLearning(self, onOff, sourcePoolName, targetPoolName):
         sourcePool = self.pools[sourcePoolName]
         targetPool = self.pools[targetPoolName]
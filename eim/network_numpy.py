@@ -0,0 +1,915 @@
+"""
+NEST-free simulation backend for the swta model.
+
+NumpyNetwork implements the Network interface (simulate, setWeights, getShapedWeights,
+setLearning, getAllSpikes) with vectorized NumPy code, following the update scheme of NEST:
+    - time is discretized in steps of dt, a spike emitted in step n has time stamp n + 1
+    - a spike with stamp S and delay D (in steps) is added to the input of its target in step S - 1 + D
+    - swta_neuron_dbl_exp, parrot_neuron and spike_generator (and spike_file_generator) behave as the NEST models,
+      pattern_poisson_generator input is drawn before the simulation
+    - sem_synapse (and sem_synapse_hom) weights are updated event-driven at presynaptic spikes
+      exactly as in the NEST synapse (facilitation by postsynaptic spikes since the last
+      presynaptic spike, then depression), postsynaptic spikes older than 50 tau_plus are
+      dropped as their contribution is below double precision
+Random numbers are drawn with NumPy, so spike trains are statistically (not spike by spike)
+equal to the NEST simulation. Connections are stored as dense matrices, which suits small networks.
+
+BatchedNumpyNetwork simulates K replicas of a network (different seeds and/or scalar parameters)
+in one run: pools hold the neurons of all replicas (neuron i of replica k has index k * N + i),
+connections are stored per replica as (K x Ns x Nt) matrices. Each replica draws random numbers from its own
+generator (ReplicaRandom), so it is reproduced by a single run with its seed.
+"""
+import numpy as np
+from . import instrument
+from .connectivity import projectionName, createProjection
+
+SWTA_NEURON_TYPES = ('swta_neuron_dbl_exp', 'swta_neuron_dbl_exp_pop')
+GENERATOR_TYPES = ('spike_generator', 'spike_file_generator', 'pattern_poisson_generator')
+NEURON_TYPES = SWTA_NEURON_TYPES + ('parrot_neuron',) + GENERATOR_TYPES
+STDP_SYNAPSE_MODELS = ('sem_synapse', 'sem_synapse_hom')
+
+# defaults of NEST models
+SWTA_NEURON_DEFAULTS = {
+    'tau_r': 1.,
+    'tau_f': 10.,
+    'dead_time': 1.,
+    'dead_time_random': False,
+    'dead_time_shape': 1,
+    'with_reset': True,
+    'tau_sfa': [],
+    'q_sfa': [],
+    'c_1': 0.,
+    'c_2': 1.238,
+    'c_3': 0.25,
+    'c_4': 1.,
+    'I_e': 0.,
+    'V_m': 0.,
+    'V_reset': 0.,
+    'z_scale': 1.,
+    'I_scale': 1.,
+    't_ref_remaining': 0.,
+    'E_sfa_clip': False,
+    'E_sfa_max': 0.,
+    'fast_rate': False,
+    'thinning': False,
+    'thinning_margin': 0.,
+    'tau_minus': 20.,
+}
+
+SEM_SYNAPSE_DEFAULTS = {
+    'Wmax': 100.,
+    'lambda': 0.01,
+    'alpha': 1.,
+    'nu_plus': 0.,
+    'nu_minus': 0.,
+    'A': 0.,
+    'tau_plus': 20.,
+    'scale_with_Wmax': False,
+}
+
+# postsynaptic spikes older than STDP_HORIZON * tau_plus do not change weights any more
+STDP_HORIZON = 50.
+
+# parameters that have to be the same in all replicas of a batch
+UNIFORM_PARAMS = ('tau_sfa', 'q_sfa', 'dead_time_random', 'dead_time_shape', 'E_sfa_clip', 'E_sfa_max',
+                  'thinning', 'scale_with_Wmax')
+
+_NO_SPIKE = np.iinfo(np.int64).max // 4  # stamp of empty history entries
+_NO_CANDIDATE = np.iinfo(np.int64).max // 4  # thinning candidate of neurons which can not spike
+
+
+def combineReplicaValues(key, values, n):
+    """
+    Combine parameter values of replicas: the value if all are equal, otherwise array with
+    the value of each replica repeated n times (e.g. once per neuron of a pool).
+    """
+    first = values[0]
+    if all(np.array_equal(v, first) for v in values[1:]):
+        return first
+    if key in UNIFORM_PARAMS or not all(np.isscalar(v) for v in values):
+        raise ValueError("Parameter %s must be the same in all replicas" % key)
+    return np.repeat(np.asarray(values, dtype=float), n)
+
+
+class ReplicaRandom:
+    """
+    Random numbers for neurons of K replicas (neuron i of replica k has index k * N + i). Each replica draws
+    from its own generator, in the order a network simulated alone draws, so replica k of a batch gives the
+    spikes of a single run with its seed.
+    """
+    def __init__(self, seeds):
+        self.generators = [np.random.default_rng(seed) for seed in seeds]
+
+    def _counts(self, N, idx):
+        if idx is None:
+            return [N] * len(self.generators)
+        if len(self.generators) == 1:
+            return [len(idx)]
+        return np.bincount(idx // N, minlength=len(self.generators))
+
+    def random(self, N, idx=None):
+        """
+        Returns uniform numbers for neurons idx (sorted, all neurons if None) of replicas with N neurons.
+        """
+        return np.concatenate([g.random(c) for g, c in zip(self.generators, self._counts(N, idx))])
+
+    def gamma(self, shape, N, idx):
+        return np.concatenate([g.gamma(shape, 1., c) for g, c in zip(self.generators, self._counts(N, idx))])
+
+    def poisson(self, lam, N):
+        """
+        Returns Poisson numbers with means lam of all neurons.
+        """
+        return np.concatenate([g.poisson(lam[k * N: (k + 1) * N]) for k, g in enumerate(self.generators)])
+
+
+def valuesAt(value, idx):
+    """
+    Returns value for indices idx, for parameters which are single value or array.
+    """
+    return value[idx] if isinstance(value, np.ndarray) and value.ndim else value
+
+
+def drawValues(spec, n, rng):
+    """
+    Draw n values of connection parameter (weight or delay).
+        -> spec : number or NEST distribution dict, e.g. {'distribution': 'uniform', 'low': 0., 'high': 1.}
+        -> n : number of values
+        -> rng : numpy random generator
+    """
+    if not isinstance(spec, dict):
+        return np.full(n, float(spec))
+    distribution = spec['distribution']
+    if distribution == 'uniform':
+        return rng.uniform(spec.get('low', 0.), spec.get('high', 1.), n)
+    elif distribution == 'normal':
+        return rng.normal(spec.get('mu', 0.), spec.get('sigma', 1.), n)
+    elif distribution == 'normal_clipped':
+        values = rng.normal(spec.get('mu', 0.), spec.get('sigma', 1.), n)
+        return np.clip(values, spec.get('low', -np.inf), spec.get('high', np.inf))
+    raise ValueError("Unsupported distribution for NumPy backend: " + distribution)
+
+
+def createConnectionMask(rule, Ns, Nt, samePool, rng):
+    """
+    Returns bool array(Ns, Nt), True where source is connected to target.
+        -> rule : NEST connection rule dict ('one_to_one', 'all_to_all' or 'pairwise_bernoulli')
+    """
+    name = rule['rule']
+    if name == 'one_to_one':
+        assert Ns == Nt, "one_to_one rule requires pools of same size"
+        mask = np.eye(Ns, dtype=bool)
+    elif name == 'all_to_all':
+        mask = np.ones((Ns, Nt), dtype=bool)
+    elif name == 'pairwise_bernoulli':
+        mask = rng.random((Ns, Nt)) < rule['p']
+    else:
+        raise ValueError("Unsupported connection rule for NumPy backend: " + name)
+
+    if samePool and not rule.get('autapses', True):
+        np.fill_diagonal(mask, False)
+    return mask
+
+
+class NumpyPool:
+    """
+        Represents a pool of same neurons: input, excitatory, inhibitory
+    """
+
+    def __init__(self, poolparamsList, h):
+        """
+            -> poolparamsList : pool params of each replica (K)
+            -> h : time step in ms
+        """
+        poolparams = poolparamsList[0]
+        self.name = poolparams['name']
+        self.N = poolparams.get('N', 1)  # at least 1 neuron
+        self.neurontype = poolparams.get('neuronType', 'swta_neuron_dbl_exp')
+        self.isInput = poolparams.get('isInput', False)
+        self.recording = poolparams.get('rec', False)
+        self.h = h  # ms
+        self.K = len(poolparamsList)
+        self.size = self.K * self.N
+        for pp in poolparamsList[1:]:
+            assert pp.get('N', 1) == self.N and pp.get('neuronType', 'swta_neuron_dbl_exp') == self.neurontype, \
+                "Replicas must have same pools: " + self.name
+
+        if self.neurontype not in NEURON_TYPES:
+            raise ValueError("Unsupported neuron type for NumPy backend: " + self.neurontype)
+
+        neuronparams = [pp.get('neuronparams', {}) for pp in poolparamsList]
+        if self.neurontype in SWTA_NEURON_TYPES:
+            for params in neuronparams:
+                for key in params:
+                    if key not in SWTA_NEURON_DEFAULTS:
+                        raise ValueError("Unsupported %s parameter for NumPy backend: %s" % (self.neurontype, key))
+            self.params = {key: combineReplicaValues(key, [params.get(key, default) for params in neuronparams], self.N)
+                           for key, default in SWTA_NEURON_DEFAULTS.items()}
+            self._calibrate()
+        else:
+            self.params = dict(neuronparams[0])
+
+        # multiplicity of incoming spikes is relayed by parrots, others sum weights
+        self.countsSpikes = self.neurontype == 'parrot_neuron'
+
+        self.stimulusStamps = np.zeros(0, dtype=np.int64)
+        self.stimulusIDs = np.zeros(0, dtype=np.int64)
+        self.stimulusPos = 0
+
+        self.historyEnabled = False
+        self.membraneNeurons = None
+        self.buf = np.zeros((1, self.size))
+        self.reset()
+        self.clearSpikes()
+
+    def _calibrate(self):
+        p, h = self.params, self.h
+        self.riseDecay = np.exp(-h / p['tau_r'])
+        self.fallDecay = np.exp(-h / p['tau_f'])
+
+        deadTime = np.asarray(p['dead_time'], dtype=float)
+        self.deadTime = np.where((deadTime != 0) & (deadTime < h), h, deadTime)
+        self.deadTimeCounts = np.rint(self.deadTime / h).astype(np.int64)
+        if np.all(self.deadTime > 0.):
+            self.poissonSpiking = False
+        elif np.all(self.deadTime == 0.):
+            self.poissonSpiking = True
+        else:
+            raise ValueError("dead_time must be either 0 or positive in all replicas")
+        if p['dead_time_random']:
+            self.deadTimeRate = p['dead_time_shape'] / self.deadTime
+
+        self.thinning = p['thinning'] and not self.poissonSpiking
+        if p['thinning'] and (np.any(np.asarray(p['c_1']) < 0) or np.any(np.asarray(p['c_2']) < 0)):
+            raise ValueError("Thinning needs a rate increasing with the membrane potential (c_1, c_2 >= 0)")
+
+        self.sfaDecay = np.exp(-h / np.asarray(p['tau_sfa'], dtype=float))
+        self.qSfa = np.asarray(p['q_sfa'], dtype=float)
+        assert self.sfaDecay.shape == self.qSfa.shape, "tau_sfa and q_sfa must have same length"
+
+    def allocateBuffer(self, length):
+        self.buf = np.zeros((length, self.size))
+
+    def reset(self):
+        self.buf[:] = 0.
+        if self.neurontype in SWTA_NEURON_TYPES:
+            self.uRise = np.zeros(self.size)
+            self.uFall = np.zeros(self.size)
+            self.y0 = np.zeros(self.size)
+            self.qElems = np.zeros((self.size, len(self.qSfa)))
+            self.r = np.zeros(self.size, dtype=np.int64)
+            self.r[:] = np.rint(self.params['t_ref_remaining'] / self.h)
+            # thinning: steps before next candidate (-1 none), bounds of V' and spike probability
+            self.candidate = np.full(self.size, -1, dtype=np.int64)
+            self.VMax = np.zeros(self.size)
+            self.pMax = np.zeros(self.size)
+        if self.historyEnabled:
+            # as NEST, spike history is cleared when network is reset
+            self.hist[:] = _NO_SPIKE
+            self.histLen[:] = 0
+            self.Kminus[:] = 0.
+
+    def enableHistory(self, horizonSteps):
+        """
+        Keep history of spikes and K_minus trace (as NEST Archiving_Node) for incoming STDP synapses.
+            -> horizonSteps : spikes older than horizon can be dropped
+        """
+        if self.historyEnabled:
+            self.horizonSteps = max(self.horizonSteps, horizonSteps)
+            return
+        self.historyEnabled = True
+        self.horizonSteps = horizonSteps
+        self.tauMinus = self.params.get('tau_minus', SWTA_NEURON_DEFAULTS['tau_minus'])
+        self.hist = np.full((self.size, 16), _NO_SPIKE, dtype=np.int64)
+        self.histK = np.zeros((self.size, 16))
+        self.histLen = np.zeros(self.size, dtype=np.int64)
+        self.Kminus = np.zeros(self.size)
+        self.lastSpike = np.zeros(self.size, dtype=np.int64)
+
+    def _pushHistory(self, idx, stamp):
+        full = idx[self.histLen[idx] == self.hist.shape[1]]
+        if len(full):
+            if np.any(self.hist[full, 0] > stamp - self.horizonSteps):
+                # oldest spikes are still needed, grow history
+                M = self.hist.shape[1]
+                self.hist = np.hstack((self.hist, np.full((self.size, M), _NO_SPIKE, dtype=np.int64)))
+                self.histK = np.hstack((self.histK, np.zeros((self.size, M))))
+            else:
+                self.hist[full, :-1] = self.hist[full, 1:]
+                self.histK[full, :-1] = self.histK[full, 1:]
+                self.histLen[full] -= 1
+
+        tauMinus = valuesAt(self.tauMinus, idx)
+        self.Kminus[idx] = self.Kminus[idx] * np.exp((self.lastSpike[idx] - stamp) * self.h / tauMinus) + 1.
+        self.lastSpike[idx] = stamp
+        self.hist[idx, self.histLen[idx]] = stamp
+        self.histK[idx, self.histLen[idx]] = self.Kminus[idx]
+        self.histLen[idx] += 1
+
+    def getHistory(self):
+        """
+        Returns spike history (stamps, K_minus) restricted to columns in use, unused entries have stamp _NO_SPIKE.
+        """
+        M = max(1, self.histLen.max())
+        return self.hist[:, :M], self.histK[:, :M]
+
+    # set spikes: spikes in sec relative to step (origin), spike file or pattern schedule, the same input is used in all replicas
+    def setSpikes(self, spikes, step):
+        if hasattr(spikes, 'getGeneratorStatus'):
+            # pattern schedule, spikes are drawn before the simulation
+            spikes = spikes.createScheduledSpikes()
+        elif isinstance(spikes, str):
+            from .spike_file import readSpikeFile
+            spikes = readSpikeFile(spikes)
+        assert len(spikes) == self.N
+        if self.isInput:
+            stamps = []
+            ids = []
+            for i, neuronSpikes in enumerate(spikes):
+                neuronSpikes = np.array(neuronSpikes, dtype=float)
+                neuronSpikes[neuronSpikes == 0] = 0.001  # spike generator can not spike at 0
+                stamps.append(np.rint(neuronSpikes * 1000. / self.h).astype(np.int64) + step)
+                ids.append(np.full(len(neuronSpikes), i, dtype=np.int64))
+            stamps = np.concatenate(stamps) if stamps else np.zeros(0, dtype=np.int64)
+            ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+            order = np.argsort(stamps, kind='stable')
+            self.stimulusStamps = stamps[order]
+            self.stimulusIDs = ids[order]
+            # spikes in the past are not emitted
+            self.stimulusPos = np.searchsorted(self.stimulusStamps, step + 1, side='left')
+
+    def update(self, n, slot, rng):
+        """
+        Advance pool by step n, returns (indices, multiplicities) of neurons spiking in this step.
+            -> rng : random numbers of replicas (ReplicaRandom)
+        """
+        if self.neurontype in GENERATOR_TYPES:
+            end = np.searchsorted(self.stimulusStamps, n + 1, side='right')
+            ids = self.stimulusIDs[self.stimulusPos:end]
+            self.stimulusPos = end
+            if len(ids) == 0:
+                return ids, ids
+            if self.K > 1:
+                ids = (np.arange(self.K)[:, np.newaxis] * self.N + ids[np.newaxis, :]).ravel()
+            return np.unique(ids, return_counts=True)
+
+        psc = self.buf[slot].copy()
+        self.buf[slot] = 0.
+
+        if self.neurontype == 'parrot_neuron':
+            idx = psc.nonzero()[0]
+            return idx, psc[idx].astype(np.int64)
+
+        spiking = self._updateSwta(psc, rng)
+        if self.membraneNeurons is not None and (n + 1) % self.membraneSteps == 0:
+            # as multimeter, state after the step is stamped with end of the step
+            self._sampleMembrane(n + 1)
+        return spiking
+
+    def _updateSwta(self, psc, rng):
+        p = self.params
+        self.uRise *= self.riseDecay
+        self.uRise += psc
+        self.uFall *= self.fallDecay
+        self.uFall += psc
+
+        y3 = p['z_scale'] * (self.uFall - self.uRise) + p['I_scale'] * (self.y0 + p['I_e'])
+        self.V_m = y3
+        self.E_sfa = 0.
+
+        if len(self.qSfa):
+            self.qElems *= self.sfaDecay
+            q = self.qElems.sum(axis=1)
+            if p['E_sfa_clip']:
+                if p['E_sfa_max'] < 0.:
+                    q = np.maximum(q, p['E_sfa_max'])
+                elif p['E_sfa_max'] > 0.:
+                    q = np.minimum(q, p['E_sfa_max'])
+            self.E_sfa = q
+            y3 = y3 - q
+
+        refractory = self.r > 0
+        self.r[refractory] -= 1
+
+        with np.errstate(over='ignore', invalid='ignore'):
+            rate = p['c_1'] * y3 + p['c_2'] * (np.exp(p['c_3'] * y3) - p['c_4'])
+            canSpike = ~refractory & (rate > 0.)
+            if self.thinning:
+                idx = self._thinningSpikes(~refractory, rate, rng)
+                mult = np.ones(len(idx), dtype=np.int64)
+            elif not self.poissonSpiking:
+                pSpike = -np.expm1(-rate * self.h * 1e-3)
+                spiking = canSpike & (rng.random(self.N) <= pSpike)
+                idx = spiking.nonzero()[0]
+                mult = np.ones(len(idx), dtype=np.int64)
+            else:
+                counts = rng.poisson(np.where(canSpike, rate * self.h * 1e-3, 0.), self.N)
+                idx = counts.nonzero()[0]
+                mult = counts[idx]
+
+        if len(idx):
+            if p['dead_time_random']:
+                deadTimes = rng.gamma(p['dead_time_shape'], self.N, idx) / valuesAt(self.deadTimeRate, idx)
+                self.r[idx] = np.rint(deadTimes / self.h).astype(np.int64)
+            else:
+                self.r[idx] = valuesAt(self.deadTimeCounts, idx) - 1
+            if len(self.qSfa):
+                self.qElems[idx] += self.qSfa[np.newaxis, :] * mult[:, np.newaxis]
+            # as NEST, recorded potential of spiking neurons is reset (it is computed anew next step)
+            reset = np.broadcast_to(np.asarray(p['with_reset'], dtype=bool), (self.size,))[idx]
+            self.V_m[idx[reset]] = valuesAt(p['V_reset'], idx[reset])
+        return idx, mult
+
+    def _boundMembrane(self):
+        """
+        Returns bound of effective membrane potential until the next input (see thinning of swta_neuron_dbl_exp).
+        """
+        p = self.params
+        V = (np.maximum(p['z_scale'] * self.uFall, 0.) + np.maximum(-p['z_scale'] * self.uRise, 0.)
+             + p['I_scale'] * (self.y0 + p['I_e']))
+        if len(self.qSfa):
+            negQ = -np.minimum(self.qElems, 0.).sum(axis=1)
+            if p['E_sfa_clip']:
+                if p['E_sfa_max'] < 0.:
+                    negQ = np.minimum(negQ, -p['E_sfa_max'])
+                elif p['E_sfa_max'] > 0.:
+                    negQ = np.maximum(negQ, -p['E_sfa_max'])
+            V = V + negQ
+        return V
+
+    def _drawCandidates(self, idx, VMax, rng):
+        p = self.params
+        rateMax = valuesAt(p['c_1'], idx) * VMax + valuesAt(p['c_2'], idx) * (np.exp(valuesAt(p['c_3'], idx) * VMax)
+                                                                             - valuesAt(p['c_4'], idx))
+        pMax = np.where(rateMax > 0., -np.expm1(-rateMax * self.h * 1e-3), 0.)
+        self.VMax[idx] = VMax
+        self.pMax[idx] = pMax
+        # steps before candidate are geometric with parameter pMax
+        with np.errstate(divide='ignore'):
+            gap = np.log(1. - rng.random(self.N, idx)) / np.log1p(-pMax)
+        self.candidate[idx] = np.where(gap < _NO_CANDIDATE, np.floor(gap), _NO_CANDIDATE).astype(np.int64)
+
+    def _thinningSpikes(self, active, rate, rng):
+        """
+        Thinning step of swta_neuron_dbl_exp, returns indices of spiking neurons.
+            -> active : mask of non-refractory neurons
+            -> rate : rates of all neurons, used at candidate steps only
+        """
+        VBound = self._boundMembrane()
+        redraw = (active & ((self.candidate < 0) | (VBound > self.VMax))).nonzero()[0]
+        if len(redraw):
+            self._drawCandidates(redraw, VBound[redraw] + valuesAt(self.params['thinning_margin'], redraw), rng)
+        hit = (active & (self.candidate == 0)).nonzero()[0]
+        self.candidate[active & (self.candidate > 0)] -= 1
+        self.candidate[hit] = -1
+        rate = rate[hit]
+        with np.errstate(invalid='ignore'):
+            accept = (rate > 0.) & (rng.random(self.N, hit) * self.pMax[hit] <= -np.expm1(-rate * self.h * 1e-3))
+        return hit[accept]
+
+    def spiked(self, stamp, idx, mult):
+        if self.recording:
+            ids = np.repeat(idx, mult)
+            self.recIDs.append(ids)
+            self.recStamps.append(np.full(len(ids), stamp, dtype=np.int64))
+        if self.historyEnabled:
+            # spike with multiplicity is archived as several spikes
+            for m in range(1, mult.max() + 1):
+                self._pushHistory(idx[mult >= m], stamp)
+
+    # removes recorded spikes, later spikes are returned relative to step (origin)
+    def clearSpikes(self, step=0):
+        self.recIDs = []
+        self.recStamps = []
+        if self.membraneNeurons is not None:
+            self.membraneStamps = []
+            self.membraneValues = []
+        self.origin = step
+
+    # returns sikes: spikes in sec
+    def getSpikes(self, replica=0):
+        if not self.recIDs:
+            return [np.zeros(0) for i in range(self.N)]
+        ids = np.concatenate(self.recIDs) - replica * self.N
+        times = (np.concatenate(self.recStamps) - self.origin) * self.h / 1000.  # convert to sec
+        inReplica = (ids >= 0) & (ids < self.N)
+        ids, times = ids[inReplica], times[inReplica]
+        order = np.argsort(ids, kind='stable')
+        counts = np.bincount(ids, minlength=self.N)
+        return np.split(times[order], np.cumsum(counts)[:-1])
+
+    def hasRecorder(self):
+        return self.recording
+
+    def enableMembraneRecording(self, neurons, recordables, interval):
+        """
+        Records state of chosen neurons (of first replica) as multimeter of NEST backend.
+            -> neurons : local indices of recorded neurons
+            -> recordables : subset of ['V_m', 'E_sfa']
+            -> interval : sampling interval in ms, multiple of time step
+        """
+        if self.neurontype not in SWTA_NEURON_TYPES:
+            raise ValueError("Membrane recording is not supported for " + self.neurontype)
+        for name in recordables:
+            if name not in ('V_m', 'E_sfa'):
+                raise ValueError("Unsupported recordable for NumPy backend: " + name)
+        self.membraneNeurons = np.asarray(neurons, dtype=np.int64)
+        self.membraneRecordables = list(recordables)
+        self.membraneSteps = max(1, int(np.rint(interval / self.h)))
+        self.membraneStamps = []
+        self.membraneValues = []
+
+    def _sampleMembrane(self, stamp):
+        values = [np.broadcast_to(getattr(self, name), (self.size,))[self.membraneNeurons] for name in self.membraneRecordables]
+        self.membraneStamps.append(stamp)
+        self.membraneValues.append(np.stack(values, axis=1))
+
+    def getMembraneSamples(self):
+        """
+        Returns samples recorded since last call: times (ms, relative to origin), local indices of neurons and
+        values (samples x recordables).
+        """
+        n = len(self.membraneNeurons)
+        times = (np.repeat(self.membraneStamps, n) - self.origin) * self.h
+        neurons = np.tile(self.membraneNeurons, len(self.membraneStamps))
+        values = np.concatenate(self.membraneValues) if self.membraneValues else np.zeros((0, len(self.membraneRecordables)))
+        self.membraneStamps = []
+        self.membraneValues = []
+        return times, neurons, values
+
+
+class NumpyConnections:
+    """
+        Connections between two pools, static or sem_synapse (STDP), stored as dense (K x Ns x Nt) matrices
+    """
+
+    def __init__(self, source, target, conns, rngs, h, projection=None):
+        """
+            -> conns : connection params of each replica (K)
+            -> rngs : random generators used to build connections of each replica
+            -> projection : connectivity snapshot of projection (see eim.connectivity) used instead
+                            of connection rule, weights and delays (same for all replicas)
+        """
+        self.source = source
+        self.target = target
+        self.h = h
+        self.K = len(conns)
+
+        syntypes = [dict(conn['syntype']) for conn in conns]
+        models = set(syntype.pop('model', 'static_synapse') for syntype in syntypes)
+        assert len(models) == 1, "Replicas must have same synapse model"
+        self.model = models.pop()
+
+        Ns, Nt = source.N, target.N
+        self.C = np.zeros((self.K, Ns, Nt), dtype=bool)
+        self.W = np.zeros((self.K, Ns, Nt))
+        self.D = np.ones((self.K, Ns, Nt), dtype=np.int64)
+        for k, (conn, syntype, rng) in enumerate(zip(conns, syntypes, rngs)):
+            weight = syntype.pop('weight', 1.)
+            delay = syntype.pop('delay', 1.)
+            if projection is not None:
+                self._setProjection(k, projection)
+                continue
+            C = self.C[k] = createConnectionMask(conn['rule'], Ns, Nt, source is target, rng)
+            nconns = np.count_nonzero(C)
+            self.W[k][C] = drawValues(weight, nconns, rng)
+            self.D[k][C] = np.maximum(1, np.rint(drawValues(delay, nconns, rng) / h)).astype(np.int64)
+        self.maxDelay = int(self.D[self.C].max()) if self.C.any() else 1
+        delays = np.unique(self.D[self.C])
+        self.uniformDelay = int(delays[0]) if len(delays) == 1 else None
+
+        self.isPlastic = self.model in STDP_SYNAPSE_MODELS
+        if self.isPlastic:
+            self.learning = np.array([syntype.pop('learning_is_active', 1.) != 0. for syntype in syntypes])
+            replicaParams = []
+            for conn, syntype in zip(conns, syntypes):
+                params = dict(SEM_SYNAPSE_DEFAULTS)
+                params.update(conn.get('commonparams', {}))
+                params.update(syntype)
+                for key in params:
+                    if key not in SEM_SYNAPSE_DEFAULTS:
+                        raise ValueError("Unsupported %s parameter for NumPy backend: %s" % (self.model, key))
+                replicaParams.append(params)
+            # parameters differing between replicas are arrays with value per replica
+            self.params = {key: combineReplicaValues(key, [params[key] for params in replicaParams], 1)
+                           for key in SEM_SYNAPSE_DEFAULTS}
+            # presynaptic trace and time of last presynaptic spike (stamp), per source as in NEST
+            self.Kplus = np.zeros(source.size)
+            self.tLast = np.zeros(source.size, dtype=np.int64)
+            tauPlus = np.max(self.params['tau_plus'])
+            target.enableHistory(int(np.ceil(STDP_HORIZON * tauPlus / h)) + self.maxDelay)
+        elif self.model != 'static_synapse':
+            raise ValueError("Unsupported synapse model for NumPy backend: " + self.model)
+        elif any(syntypes):
+            raise ValueError("Unsupported static_synapse parameters for NumPy backend: %s" % list(syntypes[0].keys()))
+
+    def reset(self, step):
+        """
+        Drops presynaptic traces, STDP continues as in connections built at step.
+        """
+        if self.isPlastic:
+            self.Kplus[:] = 0.
+            self.tLast[:] = step
+
+    def _setProjection(self, k, projection):
+        assert projection['shape'] == (self.target.N, self.source.N), "Snapshot does not match pools"
+        s, t = projection['sources'], projection['targets']
+        # dense matrices hold one connection per pair of neurons
+        pairs = t.astype(np.int64) * self.source.N + s
+        assert len(np.unique(pairs)) == len(pairs), "Multiple connections between neurons are not supported"
+        self.C[k][s, t] = True
+        self.W[k][s, t] = projection['weights']
+        self.D[k][s, t] = np.maximum(1, np.rint(projection['delays'] / self.h)).astype(np.int64)
+
+    def getProjection(self, replica=0):
+        C = self.C[replica]
+        s, t = C.nonzero()
+        return createProjection(self.source.name, self.target.name, self.model, (self.target.N, self.source.N),
+                                s, t, self.W[replica][C], self.D[replica][C] * self.h)
+
+    def deliver(self, idx, mult, n, bufLength):
+        """
+        Deliver spikes of source neurons idx (with multiplicities mult) emitted in step n.
+        """
+        rep, j = np.divmod(idx, self.source.N)
+        if self.isPlastic:
+            stamp = n + 1
+            learning = self.learning[rep]
+            if learning.any():
+                sel = learning.nonzero()[0]
+                self.W[rep[sel], j[sel]] = self._updateWeights(rep[sel], j[sel], idx[sel], stamp)
+            tauPlus = valuesAt(self.params['tau_plus'], rep)
+            self.Kplus[idx] = self.Kplus[idx] * np.exp((self.tLast[idx] - stamp) * self.h / tauPlus) + 1.
+            self.tLast[idx] = stamp
+
+        if self.target.countsSpikes:
+            values = self.C[rep, j] * mult[:, np.newaxis]
+        else:
+            values = self.W[rep, j] * mult[:, np.newaxis]
+
+        # view of ring buffer per replica: (length, K, Nt)
+        buf = self.target.buf.reshape(bufLength, self.K, self.target.N)
+        if self.uniformDelay is not None:
+            slot = (n + self.uniformDelay) % bufLength
+            if self.K == 1:
+                buf[slot, 0] += values.sum(axis=0)
+            else:
+                np.add.at(buf[slot], rep, values)
+        else:
+            s, t = self.C[rep, j].nonzero()
+            np.add.at(buf, ((n + self.D[rep[s], j[s], t]) % bufLength, rep[s], t), values[s, t])
+
+    def _paramsFor(self, rep):
+        """
+        Returns STDP params for spikes of replicas rep, values differing between replicas as column arrays.
+        """
+        return {key: value[rep][:, np.newaxis] if isinstance(value, np.ndarray) else value
+                for key, value in self.params.items()}
+
+    @staticmethod
+    def _facilitate(w, kplus, p):
+        if p['scale_with_Wmax']:
+            w = w / p['Wmax']
+        Kw = 1. if np.isscalar(p['nu_plus']) and p['nu_plus'] == 0. else np.exp(p['nu_plus'] * w)
+        new_w = w + p['lambda'] * (Kw * kplus - p['A'])
+        if p['scale_with_Wmax']:
+            return np.where(new_w < 1., new_w * p['Wmax'], p['Wmax'])
+        return np.where(new_w < p['Wmax'], new_w, p['Wmax'])
+
+    @staticmethod
+    def _depress(w, kminus, p):
+        if p['scale_with_Wmax']:
+            w = w / p['Wmax']
+        Kw = 1. if np.isscalar(p['nu_minus']) and p['nu_minus'] == 0. else np.exp(p['nu_minus'] * w)
+        new_w = w + p['lambda'] * (-p['alpha'] * Kw * kminus - p['A'])
+        if p['scale_with_Wmax']:
+            return np.where(new_w > 0., new_w * p['Wmax'], 0.)
+        return np.where(new_w > 0., new_w, 0.)
+
+    def _updateWeights(self, rep, j, idx, stamp):
+        """
+        sem_synapse update for presynaptic spikes of sources j in replicas rep (global indices idx) with time stamp:
+        facilitation for each postsynaptic spike t_p with t_last - d < t_p <= t_spike - d, then depression with
+        K_minus(t_spike - d).
+        """
+        h = self.h
+        p = self._paramsFor(rep)
+        hist, histK = self.target.getHistory()
+        Nt = self.target.N
+        # history rows of targets in the replica of each spike
+        rows = rep[:, np.newaxis] * Nt + np.arange(Nt)[np.newaxis, :]
+
+        w = self.W[rep, j]
+        c = self.C[rep, j]
+        d = self.D[rep, j]
+        tLast = self.tLast[idx][:, np.newaxis]
+        kplus = self.Kplus[idx][:, np.newaxis]
+        upper = stamp - d
+        H = hist[rows]
+
+        lo = (H <= (tLast - d)[:, :, np.newaxis]).sum(axis=2)
+        hi = (H <= upper[:, :, np.newaxis]).sum(axis=2)
+        npost = (hi - lo)[c]
+        for m in range(npost.max() if len(npost) else 0):
+            k = lo + m
+            active = c & (k < hi)
+            tp = hist[rows, np.minimum(k, hist.shape[1] - 1)]
+            w = np.where(active, self._facilitate(w, kplus * np.exp((tLast - (tp + d)) * h / p['tau_plus']), p), w)
+
+        # K_minus just before t_spike - d
+        before = (H < upper[:, :, np.newaxis]).sum(axis=2)
+        last = np.maximum(before - 1, 0)
+        tp = np.where(before > 0, hist[rows, last], upper)
+        tauMinus = valuesAt(self.target.tauMinus, rows)
+        kminus = np.where(before > 0, histK[rows, last] * np.exp((tp - upper) * h / tauMinus), 0.)
+        return np.where(c, self._depress(w, kminus, p), w)
+
+
+class NumpyNetwork:
+    def __init__(self, simulationSettings, modelSettings, connectivity=None):
+        """
+            -> connectivity : snapshot (see getConnectivity), projections in it are connected
+                              exactly as in snapshot instead of by connection rules
+        """
+        self._build(simulationSettings, [modelSettings], [simulationSettings.simulationRNGSeed], connectivity)
+
+    def _build(self, simulationSettings, modelSettingsList, simulationRNGSeeds, connectivity=None):
+        """
+        Create pools and connections of all replicas.
+            -> modelSettingsList : model settings of each replica
+            -> simulationRNGSeeds : simulation seed of each replica
+        """
+        ss, ms = simulationSettings, modelSettingsList[0]
+        self.K = len(modelSettingsList)
+        self.dt = ss.dt
+        self.h = ss.dt * 1000.  # ms
+        self.simulationRNGSeed = simulationRNGSeeds[0]
+        self.simulationRNGSeeds = simulationRNGSeeds
+        self.generalRNGSeed = ms.generalRNGSeed
+        self.rng = ReplicaRandom(simulationRNGSeeds)
+        self.step = 0
+
+        # network construction uses general seed (of each replica)
+        buildRNGs = [np.random.default_rng(m.generalRNGSeed) for m in modelSettingsList]
+
+        # pools holder
+        self.pools = {}
+        self.poolnames = []
+        for p, pool in enumerate(ms.pools):
+            replicaPools = [m.pools[p] for m in modelSettingsList]
+            assert all(rp["name"] == pool["name"] for rp in replicaPools), "Replicas must have same pools"
+            self.pools[pool["name"]] = NumpyPool(replicaPools, self.h)
+            self.poolnames.append(pool["name"])
+
+        # connect pools
+        self.conns = []
+        self.outgoing = {name: [] for name in self.poolnames}
+        connected = set()
+        with instrument.span('connect'):
+            for c, conn in enumerate(ms.poolsconns):
+                replicaConns = [m.poolsconns[c] for m in modelSettingsList]
+                name = projectionName(conn['source'], conn['target'])
+                projection = (connectivity or {}).get(name)
+                if projection is not None and name in connected:
+                    # snapshot holds all connections between the pools, they are created by first entry
+                    projection = createProjection(conn['source'], conn['target'], projection['model'], projection['shape'],
+                                                  [], [], [], [])
+                connected.add(name)
+                cs = NumpyConnections(self.pools[conn['source']], self.pools[conn['target']], replicaConns, buildRNGs, self.h,
+                                      projection)
+                self.conns.append(cs)
+                self.outgoing[conn['source']].append(cs)
+
+        # ring buffers have to hold inputs up to max delay ahead
+        self.bufLength = max([c.maxDelay for c in self.conns] + [1]) + 1
+        for pool in self.pools.values():
+            pool.allocateBuffer(self.bufLength)
+
+    def _findConnections(self, sourcePoolName, targetPoolName):
+        source, target = self.pools[sourcePoolName], self.pools[targetPoolName]
+        conns = [c for c in self.conns if c.source is source and c.target is target]
+        assert conns, "No connections from %s to %s" % (sourcePoolName, targetPoolName)
+        return conns
+
+    def setWeights(self, sourcePoolName, targetPoolName, W, replica=0):
+        for c in self._findConnections(sourcePoolName, targetPoolName):
+            assert c.source.N == W.shape[1] and c.target.N == W.shape[0]
+            C = c.C[replica]
+            c.W[replica][C] = W.T[C]
+
+    def getShapedWeights(self, sourcePoolName, targetPoolName, replica=0):
+        W = None
+        for c in self._findConnections(sourcePoolName, targetPoolName):
+            C = c.C[replica]
+            Wc = np.where(C, c.W[replica], 0.).T
+            W = Wc if W is None else np.where(C.T, Wc, W)
+        return W
+
+    def simulate(self, Tsim, stimulus=None, reset=True, result=None):
+        if not stimulus is None:
+            # new input starts now, spikes recorded before are dropped
+            self.pools['in_'].setSpikes(stimulus, self.step)
+            for pool in self.pools.values():
+                pool.clearSpikes(self.step)
+
+        if reset:
+            for pool in self.pools.values():
+                pool.reset()
+            # as in NEST, a reused network continues as a freshly built one
+            for c in self.conns:
+                c.reset(self.step)
+            self.rng = ReplicaRandom(self.simulationRNGSeeds)
+
+        nsteps = int(np.rint(Tsim * 1000. / self.h))
+        pools = [self.pools[name] for name in self.poolnames]
+        for n in range(self.step, self.step + nsteps):
+            self._update(n, pools)
+        self.step += nsteps
+
+    def _update(self, n, pools):
+        slot = n % self.bufLength
+        spiking = []
+        for pool in pools:
+            idx, mult = pool.update(n, slot, self.rng)
+            if len(idx):
+                spiking.append((pool, idx, mult))
+
+        # all delays are at least one step, so delivery order within a step does not matter
+        for pool, idx, mult in spiking:
+            pool.spiked(n + 1, idx, mult)
+            for c in self.outgoing[pool.name]:
+                c.deliver(idx, mult, n, self.bufLength)
+
+    def getAllSpikes(self, replica=0):
+        return {poolName: pool.getSpikes(replica) for poolName, pool in self.pools.items() if pool.hasRecorder()}
+
+    def enableMembraneRecording(self, poolName, neurons, recordables, interval):
+        self.pools[poolName].enableMembraneRecording(neurons, recordables, interval)
+
+    def getMembraneSamples(self, poolName):
+        return self.pools[poolName].getMembraneSamples()
+
+    def getConnectivity(self, replica=0):
+        """
+        Returns snapshot of all projections (see eim.connectivity).
+        """
+        connectivity = {}
+        for c in self.conns:
+            projection = c.getProjection(replica)
+            name = projectionName(c.source.name, c.target.name)
+            if name in connectivity:
+                # several connection entries between same pools
+                previous = connectivity[name]
+                projection = createProjection(c.source.name, c.target.name, previous['model'], projection['shape'],
+                                              *[np.concatenate((previous[key], projection[key]))
+                                                for key in ('sources', 'targets', 'weights', 'delays')])
+            connectivity[name] = projection
+        return connectivity
+
+    def getNumConnections(self):
+        return int(sum(np.count_nonzero(c.C) for c in self.conns))
+
+    def setLearning(self, onOff, sourcePoolName, targetPoolName, replica=None):
+        """
+        Enable/disable learning in given replica (all replicas if None).
+        """
+        for c in self._findConnections(sourcePoolName, targetPoolName):
+            if replica is None:
+                c.learning[:] = bool(onOff)
+            else:
+                c.learning[replica] = bool(onOff)
+
+
+class BatchedNumpyNetwork(NumpyNetwork):
+    """
+        K replicas of a network simulated together in one vectorized run. Replicas get the same
+        input, they can differ in seeds and in scalar neuron and synapse parameters.
+        Methods without replica argument return/take lists with value for each replica.
+    """
+
+    def __init__(self, simulationSettings, modelSettingsList, simulationRNGSeeds=None):
+        """
+            -> modelSettingsList : model settings of each replica
+            -> simulationRNGSeeds : simulation seed of each replica, default: simulation seed + replica index
+        """
+        if simulationRNGSeeds is None:
+            simulationRNGSeeds = [simulationSettings.simulationRNGSeed + k for k in range(len(modelSettingsList))]
+        assert len(simulationRNGSeeds) == len(modelSettingsList)
+        self._build(simulationSettings, modelSettingsList, simulationRNGSeeds)
+        self.simulationRNGSeeds = list(simulationRNGSeeds)
+
+    def setWeights(self, sourcePoolName, targetPoolName, W, replica=None):
+        if replica is not None:
+            return NumpyNetwork.setWeights(self, sourcePoolName, targetPoolName, W, replica)
+        for k in range(self.K):
+            NumpyNetwork.setWeights(self, sourcePoolName, targetPoolName, W[k], k)
+
+    def getShapedWeights(self, sourcePoolName, targetPoolName, replica=None):
+        if replica is not None:
+            return NumpyNetwork.getShapedWeights(self, sourcePoolName, targetPoolName, replica)
+        return [NumpyNetwork.getShapedWeights(self, sourcePoolName, targetPoolName, k) for k in range(self.K)]
+
+    def getAllSpikes(self, replica=None):
+        if replica is not None:
+            return NumpyNetwork.getAllSpikes(self, replica)
+        return [NumpyNetwork.getAllSpikes(self, k) for k in range(self.K)]
@@ -1,4 +1,5 @@
 import numpy as np
+from . import dtypes
 
 
 def topattern(pd, patlen, patternlength):
@@ -13,6 +14,46 @@ def topattern(pd, patlen, patternlength):
     return m
 
 
+class PatternIndex:
+    """
+    Interval index of pattern occurrences, answers which patterns are active at given times.
+    A pattern with start t is active at times t <= time <= t + patlen (as in plot.makeBars).
+    All occurrences of a pattern have the same length, so the occurrence with the latest start
+    before time decides whether the pattern is active.
+    """
+    def __init__(self, pd, patlen):
+        """
+            -> pd : pattern distribution, dict (ID: list of start times)
+            -> patlen : dict (ID: length of pattern), in the same units as start times
+        """
+        self.IDs = list(pd.keys())
+        self.starts = [np.sort(np.asarray(pd[ID], dtype=float)) for ID in self.IDs]
+        self.lengths = [patlen[ID] for ID in self.IDs]
+
+    def activeMatrix(self, times):
+        """
+        Returns bool array(len(times), len(IDs)), True if pattern IDs[i] is active at time.
+            -> times : array of query times
+        """
+        times = np.asarray(times, dtype=float)
+        active = np.zeros((len(times), len(self.IDs)), dtype=bool)
+        for i, starts in enumerate(self.starts):
+            if len(starts) == 0:
+                continue
+            last = np.searchsorted(starts, times, side='right') - 1
+            valid = last >= 0
+            active[valid, i] = times[valid] <= starts[last[valid]] + self.lengths[i]
+        return active
+
+    def activeAt(self, times):
+        """
+        Returns for each time in times the list of active pattern IDs.
+            -> times : array of query times
+        """
+        active = self.activeMatrix(times)
+        return [[self.IDs[i] for i in row.nonzero()[0]] for row in active]
+
+
 class PatternManager:
     """
     PatternManager is a container of different patterns, in charge of creating sequence of overlapping unsync patterns in time.
@@ -51,7 +92,9 @@ class PatternManager:
     # onoff: periods of patterns on and patterns off -> when they are shown and when they are not
     #		first param gives a range for patters on [0.5, 0.7] means patterns are on for random time between 0.5 and 0.7s
     #		second param gives a range for patters off [0.3, 0.5] means patterns are on for random time between 0.3 and 0.5s
-    def createUnsyncPatterns(self, simulationtime, IDs, mixingprob, onoff, offset=0):
+    # state: dict continuing distribution of previous call (on/off period and patterns still active at its end),
+    #		it is updated to the state at the end of this distribution; onsets of continued patterns are not returned
+    def createUnsyncPatterns(self, simulationtime, IDs, mixingprob, onoff, offset=0, state=None):
         onoff_isRange_on = isinstance(onoff[0], list)
         onoff_isRange_off = isinstance(onoff[1], list)
         assert not (onoff_isRange_on ^ onoff_isRange_off)
@@ -63,23 +106,32 @@ class PatternManager:
         onoffTS = np.array(np.ceil(np.array(onoff) / self.dt), dtype=int)  # sim time in timesteps
 
         #create onofftimes
-        onofftimes=np.zeros(simulationtimeTS)
+        onofftimes=np.zeros(simulationtimeTS, dtype='bool')
 		
         t = 0
         onoroff = 0  #0 is on, 1 is off
+        remaining = 0  # steps of on/off period continued from previous distribution
+        if state:
+            onoroff = state['onoroff']
+            remaining = state['remaining']
         while t < simulationtimeTS:
             #duration of on/off time
-            if onoff_isRange_on:
-                minOnOffTime = onoff[onoroff][0]
-                maxOnOffTime = onoff[onoroff][1]
-                onofftime = minOnOffTime + np.random.rand() * (maxOnOffTime - minOnOffTime)
+            if remaining > 0:
+                steps = remaining
             else:
-                onofftime = onoff[onoroff]
-            steps=np.array(np.ceil(np.array(onofftime) / self.dt), dtype=int)
+                if onoff_isRange_on:
+                    minOnOffTime = onoff[onoroff][0]
+                    maxOnOffTime = onoff[onoroff][1]
+                    onofftime = minOnOffTime + np.random.rand() * (maxOnOffTime - minOnOffTime)
+                else:
+                    onofftime = onoff[onoroff]
+                steps=np.array(np.ceil(np.array(onofftime) / self.dt), dtype=int)
+            remaining = max(int(steps) - (simulationtimeTS - t), 0)
             steps = min(steps, simulationtimeTS - t)
             onofftimes[t: t + steps] = 1 - onoroff
             t += steps
-            onoroff = 1 - onoroff
+            if remaining == 0:
+                onoroff = 1 - onoroff
 
         # check weather all IDs exists
         pIDs = []
@@ -91,7 +143,17 @@ class PatternManager:
 
         npatterns = len(pIDs)
         maxnpatterns = len(mixingprob) # max overlap of patterns
-        patact = np.zeros((maxnpatterns, simulationtimeTS), dtype = 'int')
+        patact = np.zeros((maxnpatterns, simulationtimeTS), dtype = dtypes.indexType(npatterns))
+
+        # patterns continued from previous distribution, tails: [slot, ID, remaining steps] of patterns active at the end
+        continued = np.zeros(maxnpatterns, dtype=int)
+        tails = []
+        if state:
+            for p, ID, rest in state['active']:
+                patact[p, :min(rest, simulationtimeTS)] = pIDs.index(ID) + 1
+                continued[p] = rest
+                if rest > simulationtimeTS:
+                    tails.append([p, ID, rest - simulationtimeTS])
 
         # probability of mixing channels (each can contain any pattern)
         pa = np.array(mixingprob) # active percentage, size is maxnpatterns
@@ -112,8 +174,10 @@ class PatternManager:
                             for pp in patact[:, t]:
                                 if pp > 0 and pp in s:
                                     s.remove(pp)
-                            rp = s[np.random.random_integers(0, len(s) - 1)] # random pattern, 1-based index
+                            rp = s[np.random.randint(0, len(s))] # random pattern, 1-based index
                             patact[p, t: t + min(patlen[rp - 1], simulationtimeTS - t)] = rp
+                            if t + patlen[rp - 1] > simulationtimeTS:
+                                tails.append([p, pIDs[rp - 1], t + patlen[rp - 1] - simulationtimeTS])
 
         # count how many time combination occured (number of overlapping patterns)
         sp = sum(patact > 0)
@@ -129,7 +193,7 @@ class PatternManager:
             pd[pIDs[i]] = []
 
         for p in range(maxnpatterns):
-            t = 0
+            t = continued[p]  # continued pattern started in previous distribution
             while t < simulationtimeTS:
                 if patact[p, t] > 0:  # if there is start of pattern
                     ID = pIDs[patact[p, t] - 1]
@@ -141,6 +205,9 @@ class PatternManager:
         for k in pd.keys():
             pd[k].sort()
 
+        if state is not None:
+            state.update(onoroff=int(onoroff), remaining=int(remaining), active=tails)
+
         return pd
 
 
@@ -217,7 +284,7 @@ class BarRatePatterns(TPattern):
             n = self.patternshape[0] + self.patternshape[1]
             bars = range(n)
         self.npatterns = len(bars)
-        self.masks = np.zeros((n, self.nchannels, self.lengthTS), dtype='byte')
+        masks = np.zeros((n, self.nchannels, self.lengthTS), dtype='bool')
         for ind, i in enumerate(bars):
             pattern = np.zeros(self.patternshape)
             # first vertical bars
@@ -226,12 +293,13 @@ class BarRatePatterns(TPattern):
             elif i >= self.patternshape[1] and i < self.patternshape[1] + self.patternshape[0]:
                 pattern[i - self.patternshape[1], :] = 1
             newpattern = pattern.ravel().reshape((self.nchannels, 1))
-            self.masks[ind, :, :] = newpattern.repeat(self.lengthTS, 1)
+            masks[ind, :, :] = newpattern.repeat(self.lengthTS, 1)
 
         # each mask  multiply with rates
         HR = rates['high']
         LR = rates['low']
-        self.patterns = np.array(self.masks * (HR - LR) + LR, dtype='float')
+        self.patterns = np.array(masks * (HR - LR) + LR, dtype=dtypes.RATE)
+        self.masks = dtypes.packMask(masks)
 
     def info(self):
         """
@@ -275,7 +343,7 @@ class OrientedBarRatePatterns(TPattern):
         self.nchannels = self.patternshape[0] * self.patternshape[1]
         n = len(angles)
         self.npatterns = n
-        self.masks = np.zeros((n, self.nchannels, self.lengthTS), dtype='byte')
+        masks = np.zeros((n, self.nchannels, self.lengthTS), dtype='bool')
 
         pattern0 = np.zeros(self.patternshape)
         pattern0[:, int(patternshape[1] / 2 - barwidth / 2) : int(patternshape[1] / 2 - barwidth / 2 + barwidth)] = 1
@@ -288,12 +356,13 @@ class OrientedBarRatePatterns(TPattern):
             pattern = (ndimage.rotate(pattern0, angle, reshape=False) > 0.1) * 1.
 
             newpattern = pattern.ravel().reshape((self.nchannels, 1))
-            self.masks[ind, :, :] = newpattern.repeat(self.lengthTS, 1)
+            masks[ind, :, :] = newpattern.repeat(self.lengthTS, 1)
 
         # each mask  multiply with rates
         HR = rates['high']
         LR = rates['low']
-        self.patterns = np.array(self.masks * (HR - LR) + LR, dtype='float')
+        self.patterns = np.array(masks * (HR - LR) + LR, dtype=dtypes.RATE)
+        self.masks = dtypes.packMask(masks)
 
     def info(self):
         """
@@ -332,17 +401,16 @@ class SpatioTemporalPatterns(TPattern):
 
         self.lengthTS = int(np.ceil(self.length / dt))  # length in timesteps
 
-        print(self.lengthTS)
         # create masks for compatiblity reasons
-        self.masks = np.zeros((self.npatterns, self.nchannels, self.lengthTS))
+        self.masks = dtypes.packMask(np.zeros((self.npatterns, self.nchannels, self.lengthTS), dtype='bool'))
 
-        self.patterns = np.zeros((self.npatterns, self.nchannels, self.lengthTS))
+        self.patterns = np.zeros((self.npatterns, self.nchannels, self.lengthTS), dtype=dtypes.RATE)
         if patternsrates == None:  # if external rates description not provided
             if process == None :  # if no external process is provided
                 # process = random
                 for n in range(self.npatterns):
                     for ch in range(self.nchannels):
-                        rrs = np.random.random_integers(rates['low'], rates['high'], self.lengthTS)
+                        rrs = np.random.randint(rates['low'], rates['high'] + 1, self.lengthTS)
                         self.patterns[n, ch, :] = rrs
             else: # process is defined so use it
                 for n in range(self.npatterns):
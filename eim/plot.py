@@ -1,13 +1,16 @@
-from pylab import *
+import os
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
-import matplotlib as mpl
-mpl.rcParams['interactive'] = True
-from matplotlib.colors import *
-from scipy import interpolate as inp
 
-from .common import setVariable
+from .common import LazyModule, setVariable
+
+
+def _setInteractive(module):
+    import matplotlib
+    matplotlib.rcParams['interactive'] = True
+
+# matplotlib is imported on first use
+mpl = LazyModule('matplotlib', onLoad=_setInteractive)
+plt = LazyModule('matplotlib.pyplot', onLoad=_setInteractive)
 
 
 def cmapDiscretize(cmap, N):
@@ -21,6 +24,8 @@ def cmapDiscretize(cmap, N):
         djet = cmapDiscretize(cm.jet, 5)
         imshow(x, cmap=djet)
     """
+    from scipy import interpolate as inp
+
     cdict = cmap._segmentdata.copy()
     colors_i = np.linspace(0, 1., N)
     indices = np.linspace(0, 1., N + 1)
@@ -41,12 +46,14 @@ def cmapDiscretize(cmap, N):
     # Return colormap object.
     return mpl.colors.LinearSegmentedColormap('colormap', cdict, 1024)
 
-def createLinearColors(ncolors, cmap=mpl.cm.jet):
+def createLinearColors(ncolors, cmap=None):
     """
     Create colors by lineary segmenting given colormap (cmap) in n segments
 	    -> ncolors : number of colors
-	    -> cmap : colormap
+	    -> cmap : colormap (default is jet)
     """
+    if cmap is None:
+        cmap = mpl.cm.jet
     m = cmapDiscretize(cmap, ncolors)
     clrs = []
     each = 1 + 1024 / ncolors
@@ -62,26 +69,21 @@ def rearangeData(picdim, data):
         -> data : weights matrix (it is reshaped in most plausible quadratic form),
                 array([numhid, picdim[0] * picdim[1]])
     """
-    data = data.transpose()
-    plotind = np.array(range(0, data.shape[1]))
-    numhid = plotind.size
+    data = np.asarray(data)
+    numhid = data.shape[0]
     ploth = int(np.floor(np.sqrt(numhid)))
     while numhid % ploth != 0:
         ploth -= 1
-    plotw = np.int(numhid / ploth)
+    plotw = int(numhid / ploth)
 
-    i = 0
     imh = picdim[0]
     imw = picdim[1]
+    # tiles[y, x] is weight of neuron y * plotw + x, each tile padded with 1 pixel on bottom and right
+    tiles = data.reshape((ploth, plotw, imh, imw)).transpose((0, 2, 1, 3))
+    padded = np.zeros((ploth, imh + 1, plotw, imw + 1))
+    padded[:, :imh, :, :imw] = tiles
     immat = np.zeros((ploth * (imh + 1) + 1, plotw * (imw + 1) + 1))
-
-    for y in range(1, ploth + 1):
-        for x in range(1, plotw + 1):
-            if i > plotind.size:
-                break
-            immat[(y-1)*(imh+1)+2-1 : (y-1)*(imh+1)+imh+1+1-1,
-                    (x-1)*(imw+1)+2-1 : (x-1)*(imw+1)+imw+1+1-1] = data[:,plotind[i]].reshape([imh, imw])
-            i += 1
+    immat[1:, 1:] = padded.reshape((ploth * (imh + 1), plotw * (imw + 1)))
     return immat
 
 def showWeights(sampleshape, W, my_cmap=None, cbar=True):
@@ -104,32 +106,111 @@ def showWeights(sampleshape, W, my_cmap=None, cbar=True):
     plt.show()
 
 
+class WeightsWriter(object):
+    """
+    Writes weight mosaics (as in showWeights) to image files or a video in a background thread,
+    so the simulation is not blocked by rendering. Uses Agg canvas only, works without display.
+        -> path : output file, video if it ends with .mp4, .avi or .gif (requires ffmpeg, or pillow for gif),
+                otherwise images; '%' in path is replaced by frame number (e.g. 'progress_%02d.png')
+        -> sampleshape : shape of sample, list [height, width]
+        -> my_cmap : colormap (if None use default colormap)
+        -> fps : frames per second of video
+    """
+    VIDEO_EXTENSIONS = ('.mp4', '.avi', '.gif')
+
+    def __init__(self, path, sampleshape, my_cmap=None, fps=2):
+        import threading
+        import queue
+
+        self.path = path
+        self.sampleshape = sampleshape
+        self.cmap = my_cmap if my_cmap else mpl.cm.gray_r
+        self.fps = fps
+        self.isVideo = os.path.splitext(path)[1].lower() in self.VIDEO_EXTENSIONS
+        self.nframes = 0
+        self.error = None
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add(self, W):
+        """
+        Queue weights for writing, returns immediately.
+            -> W : weight matrix, array([numhid, numvis])
+        """
+        self._queue.put(np.array(W, copy=True))
+
+    def close(self):
+        """
+        Wait until all queued weights are written.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            print("Writing weights to", self.path, "failed:", self.error)
+
+    def _run(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=(8, 8))
+        FigureCanvasAgg(fig)
+        ax = fig.add_axes([0.05, 0.05, 0.8, 0.9])
+        ax.axis('off')
+        cax = fig.add_axes([0.87, 0.05, 0.03, 0.9])
+        im = None
+        movie = None
+
+        while True:
+            W = self._queue.get()
+            if W is None:
+                break
+            if self.error is not None:
+                continue  # drain queue
+            try:
+                mat = rearangeData(self.sampleshape, 1 + W)
+                if im is None:
+                    im = ax.imshow(mat, interpolation='nearest', cmap=self.cmap)
+                    fig.colorbar(im, cax=cax)
+                else:
+                    im.set_data(mat)
+                    im.set_clim(mat.min(), mat.max())
+                ax.set_title("%d" % self.nframes)
+
+                if self.isVideo:
+                    if movie is None:
+                        movie = self._createMovieWriter()
+                        movie.setup(fig, self.path)
+                    movie.grab_frame()
+                else:
+                    path = self.path % self.nframes if '%' in self.path else self.path
+                    fig.savefig(path)
+                self.nframes += 1
+            except Exception as e:
+                self.error = e
+
+        if movie is not None:
+            movie.finish()
+
+    def _createMovieWriter(self):
+        from matplotlib import animation
+        if self.path.lower().endswith('.gif'):
+            return animation.PillowWriter(fps=self.fps)
+        return animation.FFMpegWriter(fps=self.fps)
+
+
 # returns for each time_ms in times_ms which bar patterns are active at that time
 def makeBars(times_ms, pd, patlen):
-    nbars = len(times_ms)
-    bars = []
-
-    for i, time_ms in enumerate(times_ms):
-        bars.append([])
-        for k in pd.keys():
-            for t in pd[k]:
-                if time_ms >= t and time_ms <= t + patlen[k]:
-                    bars[i].append(k)
-                    break
-    return bars
+    from .patterns import PatternIndex
+    return PatternIndex(pd, patlen).activeAt(times_ms)
 
 
 # returns for each time_ms in times_ms a epsp traces from all bar patterns that are active at that time
 def makeEpspBars(times_ms, train, pd, patlen, dx, dy, EPSP):
     nbars = len(times_ms)
-    bars = np.zeros((nbars, dx, dy))
-
-    EPSPduration_ms = int(EPSP['duration']*1000)
-    for i, tajm_ms in enumerate(times_ms):
-        epsptrain = train.convertToEPSP2(EPSP, tajm_ms - EPSPduration_ms, tajm_ms)
-        print(epsptrain.shape)
-        bars[i, :, :]=epsptrain[:, -1].reshape([dx, dy])
-    return bars
+    return train.epspAt(EPSP, times_ms).reshape((nbars, dx, dy))
 
 
 def markPatterns(ax, patterninds, colors, pd, patlen, start, end, linewidth, yoffset, ydist, xshorten):
@@ -142,48 +223,87 @@ def markPatterns(ax, patterninds, colors, pd, patlen, start, end, linewidth, yof
         -> start : start time of plot in timestep
         -> end : end time of plot in timesteps
         -> linewidth : width of colored bar
+    All bars are drawn as a single LineCollection.
     """
+    from matplotlib.collections import LineCollection
+
     # patterninds and colors have to have same dimensions
     colors = setVariable(colors, len(patterninds))
-    alpha = 1.
+    segments = []
+    segcolors = []
     for ind, ID in enumerate(patterninds):
-        st = pd[ID] # should be sorted
+        st = np.asarray(pd[ID], dtype=float) # should be sorted
         length = patlen[ID]
-        for t in st:
-            starttime = max(start, t)
-            endtime = min(end, t + length)
-            if starttime < endtime:
-                color = colors[ind]
-
-                # new
-                y = yoffset + ind * ydist
-                xmin = starttime + xshorten  # make it a bit smaller to separte close ones
-                xmax = endtime - 1 - xshorten 
-                # new
-
-                bkg = np.ones(3)  # white bkg
-                ncolor = np.array(color) * alpha + bkg * (1 - alpha)
-
-                #ax.bar(starttime, 0.9, endtime - starttime, ID - 1, color=ncolor, edgecolor=ncolor)
-                ax.plot([xmin, xmax], [y,y], linewidth = linewidth, color=ncolor)
-				
-    #ax.set_ylim(-0.5, max(patterninds))
-    ax.set_ylim(0, max(patterninds) * ydist + yoffset)
+        starttime = np.maximum(start, st)
+        endtime = np.minimum(end, st + length)
+        visible = starttime < endtime
+        n = np.count_nonzero(visible)
+        if n == 0:
+            continue
+        y = yoffset + ind * ydist
+        seg = np.empty((n, 2, 2))
+        seg[:, 0, 0] = starttime[visible] + xshorten  # make it a bit smaller to separte close ones
+        seg[:, 1, 0] = endtime[visible] - 1 - xshorten
+        seg[:, :, 1] = y
+        segments.append(seg)
+        segcolors.extend([mpl.colors.to_rgba(colors[ind])] * n)
 
+    if segments:
+        ax.add_collection(LineCollection(np.concatenate(segments), colors=segcolors, linewidths=linewidth))
+
+    ax.set_ylim(0, max(patterninds) * ydist + yoffset)
     ax.set_xlim(start, end)
     plt.draw()
 
 
-def showTrain(ax, spikes, start, end, colorchannel=['b'], marker='|', size=2, yaxlabel = 'Neuron #', resolution='s', bkgcolorchannel=False):
+def spikesInWindow(spikes, start, end, fac=1.):
+    """
+    Slice spikes of all channels in time window [start, end].
+        -> spikes : list of spikes per channel, sorted in time within each channel
+        -> start : start of window (in units of spikes * fac)
+        -> end : end of window (in units of spikes * fac)
+        -> fac : factor converting spike times to window units
+    Returns flat arrays (times, channels) of spikes in window, times in window units.
+    Spikes of a SpikeStore (eim.spike_store) are read from disk only for the window.
+    """
+    # widen by one ulp, borders are checked exactly in window units below
+    tmin = np.nextafter(start / fac, -np.inf)
+    tmax = np.nextafter(end / fac, np.inf)
+    if hasattr(spikes, 'window'):
+        spikes = spikes.window(tmin, tmax)
+    times = []
+    channels = []
+    for ch, chspikes in enumerate(spikes):
+        chspikes = np.asarray(chspikes, dtype=float)
+        lo = np.searchsorted(chspikes, tmin, side='left')
+        hi = np.searchsorted(chspikes, tmax, side='right')
+        if hi > lo:
+            times.append(chspikes[lo:hi] * fac)
+            channels.append(np.full(hi - lo, ch, dtype=np.int32))
+    if not times:
+        return np.zeros(0), np.zeros(0, dtype=np.int32)
+    times = np.concatenate(times)
+    channels = np.concatenate(channels)
+    inside = (times >= start) & (times <= end)
+    return times[inside], channels[inside]
+
+
+RASTERIZE_MIN_SPIKES = 20000  # windows with more spikes are rasterized by default
+
+
+def showTrain(ax, spikes, start, end, colorchannel=['b'], marker='|', size=2, yaxlabel = 'Neuron #', resolution='s', bkgcolorchannel=False, rasterized=None):
     """
     Show spike train with colored channels (corresponding to which pattern it has highest correlation).
         -> ax : ax of figure, where to plot
-        -> spikes : list of spikes per channel
+        -> spikes : list of spikes per channel (sorted in time within channel)
         -> start : start time of plot in timestep
         -> end : end time of plot in timestep
         -> colorchannel : color for each channel (default is black, modulo operation)
         -> marker : marker used to represent spike
         -> size : size of marker
+        -> rasterized : rasterize spikes in vector output, if None only windows with more than
+                RASTERIZE_MIN_SPIKES spikes are rasterized
+    Spikes are drawn with one artist per color.
     """
 
     if resolution == 's':
@@ -193,32 +313,36 @@ def showTrain(ax, spikes, start, end, colorchannel=['b'], marker='|', size=2, ya
 
     nchannels = len(spikes)
     colors = setVariable(colorchannel, nchannels)
-    # create train holder for specific range
-    tr = []
-    # filter spikes
-    for ch in range(nchannels):
-        tr.append([])
-        for sp in spikes[ch]:
-            if sp * fac >= start and sp * fac <= end:
-                tr[ch].append(sp * fac)
-    lenghts = np.zeros(nchannels)
-    for nch, ch in enumerate(tr):
-        x = []
-        y = []
-        for sp in ch:
-            # add jitter on top - PCSIM uses continuous time with discrete steps
-            x.append(sp - 0.5 + np.random.rand())  
-            y.append(nch)
-        if bkgcolorchannel:
-            ax.plot(x, y, marker=marker, linestyle='None', color='k', markeredgecolor='k', markeredgewidth = 1., markersize=size)
-            alpha = 0.2
-            color = np.array(colors[nch])
-            ncolor = color * alpha + np.ones(3) * (1. - alpha)
-            ax.bar(start, 1, end - start, nch, color=ncolor, edgecolor=ncolor)
-        else:
-            ax.plot(x, y, marker=marker, linestyle='None', color=colors[nch], markeredgecolor=colors[nch], markeredgewidth=1., markersize=size)
+    times, channels = spikesInWindow(spikes, start, end, fac)
+    if rasterized is None:
+        rasterized = len(times) > RASTERIZE_MIN_SPIKES
+
+    # add jitter on top - PCSIM uses continuous time with discrete steps
+    x = times - 0.5 + np.random.rand(len(times))
+
+    if bkgcolorchannel:
+        ax.plot(x, channels, marker=marker, linestyle='None', color='k', markeredgecolor='k', markeredgewidth = 1., markersize=size, rasterized=rasterized)
+        # channel colors as one image behind the spikes
+        alpha = 0.2
+        bkg = np.array([mpl.colors.to_rgb(c) for c in colors]) * alpha + (1. - alpha)
+        ax.imshow(bkg[:, np.newaxis, :], extent=(start, end, 0, nchannels), origin='lower', aspect='auto', interpolation='nearest', zorder=0)
+    else:
+        # group channels by color
+        rgba = [mpl.colors.to_rgba(c) for c in colors]
+        groups = {}
+        for ch, c in enumerate(rgba):
+            groups.setdefault(c, []).append(ch)
+        colorOfChannel = np.zeros(nchannels, dtype=np.int32)
+        groupcolors = list(groups.keys())
+        for g, c in enumerate(groupcolors):
+            colorOfChannel[groups[c]] = g
+        spikegroup = colorOfChannel[channels]
+        for g, c in enumerate(groupcolors):
+            sel = spikegroup == g
+            if np.any(sel):
+                ax.plot(x[sel], channels[sel], marker=marker, linestyle='None', color=c, markeredgecolor=c, markeredgewidth=1., markersize=size, rasterized=rasterized)
 
     ax.set_xlim(start, end)
     ax.set_ylim(0, nchannels)
     ax.set_ylabel(yaxlabel)
-    plt.draw()	
+    plt.draw()
@@ -0,0 +1,262 @@
+"""
+Disk backed recorders. Data is appended to a raw binary file, its dtype, item shape and
+length are kept in a JSON sidecar file (<path>.json), so recordings can be opened as
+memory-mapped arrays while (or after) they are written.
+"""
+import os
+import json
+import numpy as np
+
+
+class AppendableArray(object):
+    """
+    Array of items with given shape stored on disk, items are appended along first axis.
+        -> path : file with raw data, sidecar is path + '.json'
+        -> shape : shape of one item
+        -> dtype : dtype of stored data
+        -> attributes : additional values saved in sidecar
+    """
+    def __init__(self, path, shape, dtype='float32', attributes=None):
+        self.path = path
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.attributes = dict(attributes or {})
+        self.length = 0
+        self._file = open(path, 'wb')
+        self._writeSidecar()
+
+    def append(self, items):
+        """
+        Appends one item (array of item shape) or several items (array with additional first axis).
+        """
+        items = np.asarray(items, dtype=self.dtype)
+        if items.shape == self.shape:
+            items = items[np.newaxis]
+        assert items.shape[1:] == self.shape, "Wrong shape of appended items"
+        self._file.write(np.ascontiguousarray(items).tobytes())
+        self.length += items.shape[0]
+
+    def flush(self):
+        self._file.flush()
+        self._writeSidecar()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            self._writeSidecar()
+
+    def _writeSidecar(self):
+        sidecar = dict(dtype=self.dtype.str, shape=list(self.shape), length=self.length, attributes=self.attributes)
+        with open(self.path + '.json', 'w') as f:
+            json.dump(sidecar, f)
+
+
+def openArray(path, mode='r'):
+    """
+    Opens array written by AppendableArray as memory-mapped array (length x item shape).
+    Returns (array, attributes).
+    """
+    with open(path + '.json') as f:
+        sidecar = json.load(f)
+    shape = (sidecar['length'],) + tuple(sidecar['shape'])
+    if sidecar['length'] == 0:
+        return np.zeros(shape, dtype=sidecar['dtype']), sidecar['attributes']
+    return np.memmap(path, dtype=sidecar['dtype'], mode=mode, shape=shape), sidecar['attributes']
+
+
+def weightsEntropy(W):
+    """
+    Entropy of weights of each neuron (row of W), weights are normalized to a distribution.
+    """
+    W = np.maximum(np.asarray(W, dtype=float), 0.)
+    total = W.sum(axis=1, keepdims=True)
+    p = np.divide(W, total, out=np.zeros_like(W), where=total > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -np.where(p > 0, p * np.log(p), 0.).sum(axis=1)
+
+
+class WeightTrajectoryRecorder(object):
+    """
+    Records trajectory of weights (e.g. in -> e projection) to disk.
+    Snapshot is stored when interval passed since last snapshot or when some weight changed by at
+    least minChange, weights are offered to the recorder at times chosen by the simulation.
+    Files (path: prefix):
+        path.weights : (snapshots, e, in) array, weights or differences to previous snapshot (deltas)
+        path.stats : (snapshots, 2 + e) array: time, mean |dW| to previous snapshot, entropy of each neuron
+        -> shape : shape of weight matrix (e, in)
+        -> interval : time between snapshots in sec (None: only on change)
+        -> minChange : store snapshot when max |dW| reaches it (None: only by interval)
+        -> dtype : dtype of stored weights, e.g. 'float16' to quantise
+        -> deltas : store differences to previous snapshot instead of weights
+    """
+    def __init__(self, path, shape, interval=None, minChange=None, dtype='float32', deltas=False):
+        self.path = path
+        self.interval = interval
+        self.minChange = minChange
+        self.deltas = deltas
+        attributes = dict(interval=interval, minChange=minChange, deltas=deltas)
+        self.weights = AppendableArray(path + '.weights', shape, dtype, attributes)
+        self.stats = AppendableArray(path + '.stats', (2 + shape[0],), 'float64')
+        self.lastTime = None
+        self.lastW = None  # weights of last snapshot (as stored, after quantisation)
+
+    def record(self, t, W, force=False):
+        """
+        Offers weights W at time t (sec), returns True if snapshot was stored.
+        """
+        W = np.asarray(W)
+        if not force and self.lastW is not None:
+            due = self.interval is not None and t - self.lastTime >= self.interval - 1e-9
+            changed = self.minChange is not None and np.abs(W - self.lastW).max() >= self.minChange
+            if not (due or changed):
+                return False
+
+        previous = self.lastW if self.lastW is not None else np.zeros(W.shape)
+        if self.deltas:
+            # deltas are taken to stored (quantised) weights, so errors do not accumulate
+            delta = (W - previous).astype(self.weights.dtype)
+            self.weights.append(delta)
+            stored = previous + delta
+        else:
+            stored = W.astype(self.weights.dtype)
+            self.weights.append(stored)
+        meanAbsDW = np.abs(W - previous).mean() if self.lastW is not None else 0.
+        self.stats.append(np.concatenate(([t, meanAbsDW], weightsEntropy(W))))
+        self.lastTime = t
+        self.lastW = np.asarray(stored, dtype=float)
+        return True
+
+    def flush(self):
+        self.weights.flush()
+        self.stats.flush()
+
+    def close(self):
+        self.weights.close()
+        self.stats.close()
+
+
+def loadWeightTrajectory(path):
+    """
+    Loads trajectory written by WeightTrajectoryRecorder.
+    Returns dict with times, W (snapshots, e, in; memory-mapped unless deltas were stored),
+    meanAbsDW and entropy (snapshots, e).
+    """
+    W, attributes = openArray(path + '.weights')
+    stats, _ = openArray(path + '.stats')
+    if attributes['deltas']:
+        W = np.cumsum(W, axis=0, dtype=float)
+    return dict(times=np.array(stats[:, 0]), W=W, meanAbsDW=np.array(stats[:, 1]), entropy=np.array(stats[:, 2:]))
+
+
+class MembraneRecorder(object):
+    """
+    Records membrane state (e.g. V_m, E_sfa) of a subset of neurons to disk.
+    Samples are decimated (one sample each factor steps) or averaged over factor steps. Binned samples
+    are collected in a fixed size buffer which is flushed to disk when full, so memory does not grow with
+    simulation time.
+    Files (path: prefix):
+        path.values : (samples, neurons, recordables) float32 array
+        path.times : (samples,) end time of each sample (bin) in ms
+        -> neurons : indices of recorded neurons in pool
+        -> recordables : names of recorded quantities
+        -> dt : simulation step in ms
+        -> factor : number of steps per stored sample
+        -> mode : 'decimate' (samples are taken each factor steps) or 'mean' (samples taken each step are averaged)
+        -> capacity : number of samples kept in memory before flushing
+    """
+    def __init__(self, path, neurons, recordables, dt, factor=1, mode='decimate', capacity=1024):
+        assert mode in ('decimate', 'mean'), "Unknown membrane recording mode: " + mode
+        self.neurons = np.asarray(neurons, dtype=np.int64)
+        self.recordables = list(recordables)
+        self.dt = dt
+        self.factor = int(factor)
+        self.mode = mode
+        self.capacity = capacity
+        shape = (len(self.neurons), len(self.recordables))
+        attributes = dict(neurons=self.neurons.tolist(), recordables=self.recordables, dt=dt, factor=self.factor, mode=mode)
+        self.values = AppendableArray(path + '.values', shape, 'float32', attributes)
+        self.times = AppendableArray(path + '.times', (), 'float64')
+
+        # column of each pool neuron in stored array
+        self.columns = np.full(self.neurons.max() + 1 if len(self.neurons) else 0, -1, dtype=np.int64)
+        self.columns[self.neurons] = np.arange(len(self.neurons))
+
+        self._buffer = np.zeros((capacity,) + shape)
+        self._bufferTimes = np.zeros(capacity)
+        self._length = 0
+        # last bin may continue in next segment
+        self._pendingBin = None
+        self._pendingSum = np.zeros(shape)
+        self._pendingCount = np.zeros(shape[0])
+
+    def getSamplingInterval(self):
+        """
+        Returns interval (in ms) at which samples have to be taken (e.g. multimeter interval).
+        """
+        return self.dt * (self.factor if self.mode == 'decimate' else 1)
+
+    def add(self, times, neurons, values):
+        """
+        Adds samples of one segment.
+            -> times : time of each sample in ms
+            -> neurons : pool index of neuron of each sample
+            -> values : (samples, recordables) values
+        """
+        if len(times) == 0:
+            return
+        steps = np.rint(np.asarray(times) / self.dt).astype(np.int64)
+        bins = (steps - 1) // self.factor
+        columns = self.columns[np.asarray(neurons, dtype=np.int64)]
+        values = np.asarray(values, dtype=float).reshape(len(times), -1)
+
+        first = bins.min() if self._pendingBin is None else min(bins.min(), self._pendingBin)
+        nbins = bins.max() - first + 1
+        sums = np.zeros((nbins,) + self._pendingSum.shape)
+        counts = np.zeros((nbins, len(self.neurons)))
+        np.add.at(sums, (bins - first, columns), values)
+        np.add.at(counts, (bins - first, columns), 1.)
+        if self._pendingBin is not None:
+            sums[self._pendingBin - first] += self._pendingSum
+            counts[self._pendingBin - first] += self._pendingCount
+
+        # last bin is kept until next segment or close
+        self._pendingBin = first + nbins - 1
+        self._pendingSum = sums[-1]
+        self._pendingCount = counts[-1]
+        self._push(np.arange(first, first + nbins - 1), sums[:-1], counts[:-1])
+
+    def _push(self, bins, sums, counts):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts[:, :, np.newaxis]
+        times = (bins + 1) * self.factor * self.dt
+        for i in range(len(bins)):
+            if self._length == self.capacity:
+                self.flush()
+            self._buffer[self._length] = means[i]
+            self._bufferTimes[self._length] = times[i]
+            self._length += 1
+
+    def flush(self):
+        self.values.append(self._buffer[:self._length])
+        self.times.append(self._bufferTimes[:self._length])
+        self._length = 0
+        self.values.flush()
+        self.times.flush()
+
+    def close(self):
+        if self._pendingBin is not None:
+            self._push(np.array([self._pendingBin]), self._pendingSum[np.newaxis], self._pendingCount[np.newaxis])
+            self._pendingBin = None
+        self.flush()
+        self.values.close()
+        self.times.close()
+
+
+def loadMembraneRecording(path):
+    """
+    Loads recording written by MembraneRecorder.
+    Returns dict with times (ms), values (samples, neurons, recordables; memory-mapped), neurons and recordables.
+    """
+    values, attributes = openArray(path + '.values')
+    times, _ = openArray(path + '.times')
+    return dict(times=np.array(times), values=values, neurons=attributes['neurons'], recordables=attributes['recordables'])
@@ -5,6 +5,7 @@
 DATA_PATH = "data/"
 DATA_SETTINGS = "data_settings.py"
 DATA_EXT = ".shelf"
+DATASET_EXT = ".chunks"                        # chunked data sets (eim.dataset) are folders <data name>.chunks
 
 MODEL_PATH = "models/"
 MODEL_SETTINGS = "model_settings.py"
@@ -14,4 +15,5 @@ SIMULATION_SETTINGS = "simulation_settings.py"
 
 RESULTS_PATH = "results/"
 RESULTS_EXT = ".shelf"
+SPIKE_STORE_EXT = ".spikes"                    # spikes of pool of result are stored in <result>_<pool>.spikes
 
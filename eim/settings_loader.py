@@ -1,8 +1,140 @@
 import os
-import imp
+import copy
+import hashlib
+import importlib.util
+
+import numpy as np
 
 from .common import DictClass
 
+
+# settings files are executed once and cached on (path, mtime, size)
+_modulesCache = {}
+_settingsCache = {}
+
+
+def _fileKey(path):
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    return path, (st.st_mtime_ns, st.st_size)
+
+
+def loadSettingsModule(path, name=None):
+    """
+    Load python settings file as module, the file is executed only again if it changed.
+        -> path : path to settings file
+        -> name : module name (default is file name without extension)
+    """
+    path, stamp = _fileKey(path)
+    cached = _modulesCache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _modulesCache[path] = (stamp, module)
+    return module
+
+
+def loadCachedSettings(kind, path, createSettings, params=None):
+    """
+    Returns settings dictionary createSettings(module) of settings file, parsed and validated only
+    once per file version (and params). Each call returns a deep copy, so callers can modify it.
+        -> kind : name of settings type, part of cache key
+        -> path : path to settings file
+        -> createSettings : function creating settings dictionary from module
+        -> params : settings createSettings depends on besides the file (dict), part of cache key as FrozenSettings
+    """
+    realpath, stamp = _fileKey(path)
+    key = (kind, realpath, None if params is None else FrozenSettings(params))
+    cached = _settingsCache.get(key)
+    if not (cached and cached[0] == stamp):
+        cached = (stamp, createSettings(loadSettingsModule(path)))
+        _settingsCache[key] = cached
+    return copy.deepcopy(cached[1])
+
+
+def clearSettingsCache():
+    _modulesCache.clear()
+    _settingsCache.clear()
+
+
+def _freeze(value):
+    if isinstance(value, FrozenSettings):
+        return value
+    if isinstance(value, dict):
+        return FrozenSettings(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_freeze(v) for v in value), key=repr))
+    if isinstance(value, np.ndarray):
+        return ('ndarray', str(value.dtype), value.shape, hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest())
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return value
+    if callable(value):
+        return ('callable', getattr(value, '__module__', None), getattr(value, '__qualname__', repr(value)))
+    if hasattr(value, '__dict__'):
+        return FrozenSettings(value)
+    return repr(value)
+
+
+def _thaw(value):
+    if isinstance(value, FrozenSettings):
+        return value.asDict()
+    if isinstance(value, tuple):
+        return tuple(_thaw(v) for v in value)
+    return value
+
+
+class FrozenSettings(object):
+    """
+    Immutable, hashable record of resolved settings (e.g. to key caches and parameter sweeps on), values are
+    frozen recursively: dicts and settings objects become FrozenSettings, lists and sets tuples, arrays and
+    functions signatures.
+        -> items : sorted tuple of (key, frozen value) pairs
+        -> digest : sha1 hex digest of items, stable between runs
+    """
+    __slots__ = ('items', 'digest')
+
+    def __init__(self, settings):
+        if not isinstance(settings, dict):
+            settings = {k: v for k, v in vars(settings).items() if not k.startswith('_')}
+        object.__setattr__(self, 'items', tuple(sorted((str(k), _freeze(v)) for k, v in settings.items())))
+        object.__setattr__(self, 'digest', hashlib.sha1(repr(self.items).encode()).hexdigest())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrozenSettings are immutable")
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __eq__(self, other):
+        return isinstance(other, FrozenSettings) and self.items == other.items
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "FrozenSettings(%s)" % self.digest
+
+    def asDict(self):
+        """
+        Returns settings as nested dicts (sequences as tuples, arrays and functions as their signatures).
+        """
+        return {k: _thaw(v) for k, v in self.items}
+
+
+def freezeSettings(settings):
+    """
+    Create FrozenSettings from settings object (GeneralSettings, DataSettings, ...) or dict.
+    """
+    return FrozenSettings(settings)
+
 def getModuleMembers(module):
     d = {}
     for member in dir(module):
@@ -36,6 +168,7 @@ class GeneralSettings(object):
             dataPath=module.DATA_PATH,
             dataSettings=module.DATA_SETTINGS,
             dataExt=module.DATA_EXT,
+            datasetExt=module.DATASET_EXT,
 
             # model settings
             modelPath=module.MODEL_PATH,
@@ -47,7 +180,8 @@ class GeneralSettings(object):
 
             # results settings
             resultsPath=module.RESULTS_PATH,
-            resultsExt=module.RESULTS_EXT
+            resultsExt=module.RESULTS_EXT,
+            spikeStoreExt=module.SPIKE_STORE_EXT
         )
         return settings
 
@@ -58,9 +192,7 @@ class DataSettings(object):
         if not fileExists:
             raise ValueError("Missing data settings: %s"%(dataSettingsPath))
 
-        dataSettingsFileName = os.path.basename(dataSettingsPath)
-        settingsModule = imp.load_source(dataSettingsFileName, dataSettingsPath)
-        self.__dict__ = self._createSettings(settingsModule)
+        self.__dict__ = loadCachedSettings('data', dataSettingsPath, self._createSettings)
 
     def _createSettings(self, module):
         if module.PATTERN_CLASS == "BarRatePatterns":
@@ -177,17 +309,20 @@ class SimulationSettings(object):
         if not fileExists:
             raise ValueError("Missing simulation settings: %s"%(simulationSettingsName))
 	
-        settingsModule = imp.load_source(simulationSettingsName, simulationSettingsName)
-        self.__dict__ = self._createSettings(settingsModule)
+        self.__dict__ = loadCachedSettings('simulation', simulationSettingsName, self._createSettings)
 	
     def _createSettings(self, module):
         mustHaveSettings = ['SIMULATION_CHAIN', 'NETWORK_MODEL', 'NETWORK_PARAMS']
-        optionalSettings = {'DT': 1e-3, 'SIMULATION_SEED': 42, 'SHOW_LEARNING_PROGRESS': False}
+        optionalSettings = {'DT': 1e-3, 'SIMULATION_SEED': 42, 'SHOW_LEARNING_PROGRESS': False,
+                            'LEARNING_PROGRESS_OUTPUT': None, 'LOCAL_NUM_THREADS': None, 'CPU_AFFINITY': None,
+                            'BATCH_REPLICAS': None, 'INSTRUMENTATION': None, 'REUSE_NETWORK': True,
+                            'SAVE_CONNECTIVITY': False, 'WEIGHT_TRAJECTORY': None,
+                            'MEMBRANE_RECORDING': None}
         settings = getModuleMembers(module)
         setDefaultSettings(settings, mustHaveSettings, optionalSettings)
 
         simChainMustHaveSettings = ['data', 'simTime', 'result']
-        simChainOptionalSettings = {'learning': False, 'init': None}
+        simChainOptionalSettings = {'learning': False, 'init': None, 'connectivity': None, 'spikeFile': None}
         simChain = []
         for ds in module.SIMULATION_CHAIN:
             setDefaultSettings(ds, simChainMustHaveSettings, simChainOptionalSettings)
@@ -196,10 +331,19 @@ class SimulationSettings(object):
         config = dict(
             dt=settings['DT'], 
             simulationRNGSeed=settings['SIMULATION_SEED'],
+            localNumThreads=settings['LOCAL_NUM_THREADS'],
+            cpuAffinity=settings['CPU_AFFINITY'],
             simulationChain=simChain,
             model=settings['NETWORK_MODEL'],
             modelAdditionalParams=settings['NETWORK_PARAMS'],
-            showLearningProgress=settings['SHOW_LEARNING_PROGRESS']
+            showLearningProgress=settings['SHOW_LEARNING_PROGRESS'],
+            learningProgressOutput=settings['LEARNING_PROGRESS_OUTPUT'],
+            batchReplicas=settings['BATCH_REPLICAS'],
+            instrumentation=settings['INSTRUMENTATION'],
+            reuseNetwork=settings['REUSE_NETWORK'],
+            saveConnectivity=settings['SAVE_CONNECTIVITY'],
+            weightTrajectory=settings['WEIGHT_TRAJECTORY'],
+            membraneRecording=settings['MEMBRANE_RECORDING']
         )
 				
         return config
@@ -234,11 +378,12 @@ class ModuleSettings(object):
 		
         if structureIsOk:
             try:
-                import imp
                 # load settings loader and settings module
-                settingsLoader = imp.load_source(moduleSettingsLoaderName, settingsLoaderFile)
-                defaultSettings = imp.load_source(moduleSettingsLoaderName, settingsFile)
-                self.__dict__ = settingsLoader.createSettings(defaultSettings, additionalSettings)
+                settingsLoader = loadSettingsModule(settingsLoaderFile, moduleInstanceName + '_' + os.path.splitext(moduleSettingsLoaderName)[0])
+                # settings are created once per version of both files and additional settings
+                params = dict(loader=_fileKey(settingsLoaderFile), settings=additionalSettings)
+                self.__dict__ = loadCachedSettings(
+                    'module', settingsFile, lambda module: settingsLoader.createSettings(module, additionalSettings), params)
             except:
                 raise ValueError("Failed to load settings: %s %s %s" % (moduleDir, settingsFile, settingsLoaderFile))
         else:
@@ -251,3 +396,12 @@ class NetworkModelSettings(ModuleSettings):
         currentPath = os.path.dirname(os.path.realpath(__file__))
         super(NetworkModelSettings, self).__init__(currentPath + '/' + gs.modelPath, modelName, gs.modelSettings, gs.modelSettingsLoader, modelAdditionalParams)
 
+
+def createBatchModelSettings(generalSettings, simulationSettings):
+    """
+    Returns model settings for each replica of a batched simulation (BATCH_REPLICAS),
+    replica params overwrite NETWORK_PARAMS.
+    """
+    ss = simulationSettings
+    return [NetworkModelSettings(generalSettings, ss.model, dict(ss.modelAdditionalParams, **replicaParams))
+            for replicaParams in ss.batchReplicas]
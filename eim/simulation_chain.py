@@ -2,6 +2,57 @@ import os
 from .common import DictClass, getDirAndFileName
 from .settings_loader import DataSettings
 from .data import loadData, saveData
+from .dataset import ChunkedDataset, isChunkedDataset
+from . import instrument
+
+
+def storeResultSpikes(result, resultPath, ext):
+    """
+    Writes spikes of each pool of result to spike store <resultPath>_<pool><ext> (see eim.spike_store),
+    returns result referring to the stores (relative to the directory of the result). Spikes which can not
+    be stored are kept compressed in result (see eim.spike_codec).
+    """
+    from .spike_store import writeSpikeStore, SpikeStore
+    from .spike_codec import encodeSpikes
+    if 'spikes' not in result:
+        return result
+    result = dict(result)
+    directory, name = os.path.split(resultPath)
+    spikes = {}
+    for pool, poolSpikes in result['spikes'].items():
+        storeName = name + '_' + pool + ext
+        try:
+            writeSpikeStore(os.path.join(directory, storeName), poolSpikes)
+            spikes[pool] = SpikeStore(storeName, directory)
+        except ValueError:
+            spikes[pool] = encodeSpikes(poolSpikes)
+    result['spikes'] = spikes
+    return result
+
+
+def createSpikeFile(path, data, generalSettings):
+    """
+    Writes spikes of data (shelf or chunked data set, without extension) to spike file (see eim.spike_file).
+    The file is written under a temporary name and then renamed, so concurrent simulations creating the
+    same spike file never read it half written.
+    """
+    import tempfile
+    from .spike_file import writeSpikeFile
+    gs = generalSettings
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(path) + '.', dir=os.path.dirname(path) or '.')
+    os.close(fd)
+    try:
+        if isChunkedDataset(data + gs.datasetExt):
+            ChunkedDataset(data + gs.datasetExt).writeSpikeFile(tmp)
+        else:
+            train = loadData(data + gs.dataExt)['train']
+            if getattr(train, 'spikes', None) is None:
+                raise ValueError("Data has no spikes to write to spike file: " + data)
+            writeSpikeFile(tmp, train.spikes)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
 
 
 class SimulationChainData:
@@ -12,9 +63,20 @@ class SimulationChainData:
 
         for singleSimParams in simulationChain:
             dataDir, dataFileName = getDirAndFileName(singleSimParams.data)
-            ds = DataSettings(dataDir + '/' + gs.dataSettings)
-            df = DictClass(loadData(singleSimParams.data + gs.dataExt))
-            singleSimParams.update(dict(dataSettings=ds, train=df.train))
+            spikeFile = getattr(singleSimParams, 'spikeFile', None)
+            with instrument.span('data_load', data=singleSimParams.data):
+                ds = DataSettings(dataDir + '/' + gs.dataSettings)
+                if spikeFile:
+                    # input is streamed from spike file, spikes of data are not loaded
+                    if not os.path.exists(spikeFile):
+                        instrument.event('spike_file_create', path=spikeFile)
+                        createSpikeFile(spikeFile, singleSimParams.data, gs)
+                    train = None
+                elif isChunkedDataset(singleSimParams.data + gs.datasetExt):
+                    train = ChunkedDataset(singleSimParams.data + gs.datasetExt).toData()['train']
+                else:
+                    train = DictClass(loadData(singleSimParams.data + gs.dataExt)).train
+            singleSimParams.update(dict(dataSettings=ds, train=train))
             self._simulationsData.append(singleSimParams)
 
     def getSimulationsData(self):
@@ -27,12 +89,12 @@ class SimulationChainData:
         # first search cash, then file
         r = self._results.get(dataName, None)
         if r:
-            print("Results fatched from cache")
+            instrument.event('result_load', result=dataName, source='cache')
             return r
 
         r = loadData(dataName + self._gs.dataExt)
         if r:
-            print("Results fatched from file: ", dataName)
+            instrument.event('result_load', result=dataName, source='file')
             return r
 
         assert r, "No init data or file found! %s" % (dataName)
@@ -41,6 +103,6 @@ class SimulationChainData:
         gs = self._gs
         for dataPath, result in self._results.items():
             rfile = dataPath + gs.resultsExt
-            print(rfile)
-            saveData(rfile, **result)
+            with instrument.span('save', result=dataPath, file=rfile):
+                saveData(rfile, **storeResultSpikes(result, dataPath, gs.spikeStoreExt))
 
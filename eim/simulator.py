@@ -1,6 +1,99 @@
-from .network import Network, findPool
+import numpy as np
+from .network import Network, findPool, isRootRank
 from .data import assertNoLearning
-from . import plot
+from .analysis import numberOfSpikesInTrain
+from . import instrument
+
+
+def createNetwork(simulationSettings, modelSettings, connectivity=None):
+    """
+    Create network with backend of the model ('nest' or 'numpy', see model settings loader).
+        -> connectivity : connectivity snapshot to create connections from (see eim.connectivity)
+    """
+    backend = getattr(modelSettings, 'backend', 'nest')
+    if backend == 'numpy':
+        from .network_numpy import NumpyNetwork
+        return NumpyNetwork(simulationSettings, modelSettings, connectivity)
+    elif backend == 'nest':
+        return Network(simulationSettings, modelSettings, connectivity)
+    raise ValueError("Unknown network backend: " + backend)
+
+
+def getStimulus(simData):
+    """
+    Input of in_ pool: spike file of chain entry, spikes of the train, or its pattern schedule if it was
+    created without spikes.
+    """
+    if getattr(simData, 'spikeFile', None):
+        return simData.spikeFile
+    train = simData.train
+    return train if getattr(train, 'spikes', None) is None and train.hasSchedule() else train.spikes
+
+
+def canReuseNetwork(simulationSettings, net, netResult, simData):
+    """
+    Network of previous chain entry is reused if entry initializes weights from a result
+    (so fresh random weights are not needed) and number of input channels is the same.
+    Connectivity of rebuilt network would be identical (same general seed), unless entry
+    loads connectivity of another result.
+    """
+    return (simulationSettings.reuseNetwork and net is not None and bool(simData.init)
+            and net.pools['in_'].N == simData.dataSettings.nChannels
+            and (not getattr(simData, 'connectivity', None) or simData.connectivity == netResult))
+
+
+def createWeightTrajectoryRecorder(trajectory, result, shape):
+    """
+    Creates recorder of in -> e weights from WEIGHT_TRAJECTORY settings.
+    """
+    from .recorders import WeightTrajectoryRecorder
+    path = trajectory.get('path', '{result}_trajectory').replace('{result}', result)
+    return WeightTrajectoryRecorder(path, shape, trajectory.get('interval'), trajectory.get('minChange'),
+                                    trajectory.get('dtype', 'float32'), trajectory.get('deltas', False))
+
+
+def createMembraneRecorder(net, recording, result, dt):
+    """
+    Attaches membrane recording (MEMBRANE_RECORDING settings) to network, returns recorder (on root rank, else None).
+        -> dt : simulation step in sec
+    """
+    from .recorders import MembraneRecorder
+    poolName = recording.get('pool', 'e')
+    neurons = recording.get('neurons', 10)
+    if np.isscalar(neurons):
+        # first neurons of the pool
+        neurons = range(min(int(neurons), net.pools[poolName].N))
+    recordables = recording.get('recordables', ['V_m', 'E_sfa'])
+    factor, mode = recording.get('factor', 1), recording.get('mode', 'decimate')
+    recorder = None
+    if isRootRank():
+        path = recording.get('path', '{result}_membrane').replace('{result}', result)
+        recorder = MembraneRecorder(path, neurons, recordables, dt * 1000., factor, mode, recording.get('capacity', 1024))
+    # multimeter is needed on all ranks
+    interval = dt * 1000. * (factor if mode == 'decimate' else 1)
+    net.enableMembraneRecording(poolName, list(neurons), recordables, interval)
+    return recorder
+
+
+def getCheckpoints(simTime, dt, showProgress, trajectory, segment=None):
+    """
+    Returns list of (time, showProgress, readWeights) at which simulation stops: 10 times for learning
+    progress, every trajectory step (default: trajectory interval) for trajectory recording and every
+    segment (sec) to collect membrane samples. Weights are read only for progress and trajectory.
+    """
+    points = {}
+    if segment:
+        steps = np.rint(np.arange(1, int(np.floor(simTime / segment + 1e-9)) + 1) * segment / dt).astype(int)
+        points.update({k: (False, False) for k in steps})
+    if trajectory:
+        step = trajectory.get('step') or trajectory.get('interval') or simTime / 10.
+        steps = np.rint(np.arange(1, int(np.floor(simTime / step + 1e-9)) + 1) * step / dt).astype(int)
+        points.update({k: (False, True) for k in list(steps) + [int(np.rint(simTime / dt))]})
+    if showProgress:
+        points.update({k: (True, True) for k in np.rint(np.arange(1, 11) * simTime / 10. / dt).astype(int)})
+    points.setdefault(int(np.rint(simTime / dt)), (False, False))
+    return [(k * dt,) + points[k] for k in sorted(points) if k > 0]
+
 
 def simulate(generalSettings, simulationSettings, modelSettings, simulationChainData, save=True):
     gs = generalSettings
@@ -8,36 +101,170 @@ def simulate(generalSettings, simulationSettings, modelSettings, simulationChain
     ms = modelSettings
     scd = simulationChainData
 
+    if not instrument.isConfigured():
+        instrument.configure(ss.instrumentation)
+
+    if ss.batchReplicas:
+        from .settings_loader import createBatchModelSettings
+        return simulateBatch(gs, ss, createBatchModelSettings(gs, ss), scd, save)
+
+    net = None
+    netResult = None  # result of last simulation of net, its weights are in net
     for i, simData in enumerate(scd.getSimulationsData()):
-        print("SIMULATION", i)
+        instrument.event('simulation', index=i, result=simData.result)
 
-        # set number of input neurons based on nChannels in patterns
-        findPool(ms.pools, "in")['N'] = simData.dataSettings.nChannels
-        findPool(ms.pools, "in_")['N'] = simData.dataSettings.nChannels
+        if canReuseNetwork(ss, net, netResult, simData):
+            # same connectivity, only input, state, STDP traces, seeds and recorders are reset (in net.simulate)
+            with instrument.span('network_reuse', result=simData.result):
+                net.simulate(0., getStimulus(simData), result=simData.result)
+        else:
+            # set number of input neurons based on nChannels in patterns
+            findPool(ms.pools, "in")['N'] = simData.dataSettings.nChannels
+            findPool(ms.pools, "in_")['N'] = simData.dataSettings.nChannels
 
-        net = Network(ss, ms)
-        net.simulate(0., simData.train.spikes)
+            connectivity = None
+            if getattr(simData, 'connectivity', None):
+                instrument.event('connectivity_init', source=simData.connectivity)
+                connectivity = scd.getResult(simData.connectivity)['connectivity']
+            with instrument.span('network_build', result=simData.result):
+                net = createNetwork(ss, ms, connectivity)
+                net.simulate(0., getStimulus(simData), result=simData.result)
+            netResult = None
+        if instrument.isEnabled():
+            instrument.count('synapses', net.getNumConnections())
 
-        if simData.init:
+        if simData.init and simData.init == netResult:
+            instrument.event('weights_init', source=simData.init, reused=True)
+        elif simData.init:
             r = scd.getResult(simData.init)
             if r:
-                print("Network initialized based on: ", simData.init)
+                instrument.event('weights_init', source=simData.init, reused=False)
                 W = r["finalW"]
-                net.setWeights('in', 'e', W)
+                with instrument.span('weight_set'):
+                    net.setWeights('in', 'e', W)
 
-        initW = net.getShapedWeights('in','e')
+        with instrument.span('weight_readout'):
+            initW = net.getShapedWeights('in','e')
         net.setLearning(simData.learning, 'in', 'e')
-        if simData.learning and ss.showLearningProgress:
-            for i in range(10):
-                net.simulate(simData.simTime / 10., None, reset=False)
+        progress = simData.learning and ss.showLearningProgress
+        trajectory = ss.weightTrajectory if simData.learning else None
+        if progress:
+            from . import plot
+        writer = None
+        recorder = None
+        membraneRecorder = None
+        if progress and ss.learningProgressOutput and isRootRank():
+            # render in background to file instead of showing figures
+            output = ss.learningProgressOutput.replace('{result}', simData.result)
+            writer = plot.WeightsWriter(output, simData.dataSettings.patternShape)
+        if trajectory and isRootRank():
+            recorder = createWeightTrajectoryRecorder(trajectory, simData.result, initW.shape)
+            recorder.record(0., initW, force=True)
+        if ss.membraneRecording:
+            membraneRecorder = createMembraneRecorder(net, ss.membraneRecording, simData.result, ss.dt)
+        segment = ss.membraneRecording.get('segment', 1.) if ss.membraneRecording else None
+        t = 0.
+        for tNext, showProgress, readWeights in getCheckpoints(simData.simTime, ss.dt, progress, trajectory, segment):
+            with instrument.span('simulate', Tsim=tNext - t, learning=simData.learning):
+                net.simulate(tNext - t, None, reset=False)
+            t = tNext
+            if ss.membraneRecording:
+                # samples are drained every segment, so recorders hold at most one segment
+                samples = net.getMembraneSamples(ss.membraneRecording.get('pool', 'e'))
+                if membraneRecorder:
+                    membraneRecorder.add(*samples)
+            if not readWeights:
+                continue
+            with instrument.span('weight_readout'):
                 W = net.getShapedWeights('in','e')
+            if recorder:
+                recorder.record(t, W, force=t >= simData.simTime)
+            if not showProgress:
+                continue
+            if writer:
+                writer.add(W)
+            elif not ss.learningProgressOutput:
                 plot.showWeights(simData.dataSettings.patternShape, W)
-        else:
-            net.simulate(simData.simTime, None, reset=False)
+        if writer:
+            writer.close()
+        if recorder:
+            recorder.close()
+        if membraneRecorder:
+            membraneRecorder.close()
 
-        finalW = net.getShapedWeights('in','e')
+        with instrument.span('weight_readout'):
+            finalW = net.getShapedWeights('in','e')
         assertNoLearning(initW, finalW, simData.learning)
-        scd.addResult(simData.result, dict(initW=initW, finalW=finalW,  spikes=net.getAllSpikes()))
-    if save:
+        with instrument.span('spike_collection'):
+            spikes = net.getAllSpikes()
+        if instrument.isEnabled():
+            instrument.count('spikes', sum(numberOfSpikesInTrain(s) for s in spikes.values()))
+        instrument.flush(result=simData.result)
+        result = dict(initW=initW, finalW=finalW,  spikes=spikes)
+        if ss.saveConnectivity:
+            with instrument.span('connectivity_readout'):
+                result['connectivity'] = net.getConnectivity()
+        scd.addResult(simData.result, result)
+        netResult = simData.result
+    # in distributed mode results are collected on rank 0
+    if save and isRootRank():
         scd.saveResults()
 
+
+def getReplicaResultName(result, replica):
+    return "%s_%d" % (result, replica)
+
+
+def simulateBatch(generalSettings, simulationSettings, modelSettingsList, simulationChainData, save=True):
+    """
+    Simulate replicas of the model (different seeds or parameters) together with NumPy backend.
+    Replica k uses simulation seed SIMULATION_SEED + k, its results are stored as '<result>_<k>'.
+        -> modelSettingsList : model settings of each replica
+    """
+    from .network_numpy import BatchedNumpyNetwork
+    ss = simulationSettings
+    scd = simulationChainData
+    K = len(modelSettingsList)
+
+    for ms in modelSettingsList:
+        if getattr(ms, 'backend', 'nest') != 'numpy':
+            raise ValueError("Batched simulation requires NumPy backend (e.g. NETWORK_MODEL = 'swta_numpy')")
+
+    for i, simData in enumerate(scd.getSimulationsData()):
+        instrument.event('simulation', index=i, result=simData.result, replicas=K)
+
+        for ms in modelSettingsList:
+            findPool(ms.pools, "in")['N'] = simData.dataSettings.nChannels
+            findPool(ms.pools, "in_")['N'] = simData.dataSettings.nChannels
+
+        with instrument.span('network_build', result=simData.result, replicas=K):
+            net = BatchedNumpyNetwork(ss, modelSettingsList)
+            net.simulate(0., getStimulus(simData), result=simData.result)
+        if instrument.isEnabled():
+            instrument.count('synapses', net.getNumConnections())
+
+        if simData.init:
+            with instrument.span('weight_set'):
+                for k in range(K):
+                    r = scd.getResult(getReplicaResultName(simData.init, k))
+                    if r:
+                        net.setWeights('in', 'e', r["finalW"], k)
+
+        with instrument.span('weight_readout'):
+            initW = net.getShapedWeights('in', 'e')
+        net.setLearning(simData.learning, 'in', 'e')
+        with instrument.span('simulate', Tsim=simData.simTime, learning=simData.learning, replicas=K):
+            net.simulate(simData.simTime, None, reset=False)
+
+        with instrument.span('weight_readout'):
+            finalW = net.getShapedWeights('in', 'e')
+        with instrument.span('spike_collection'):
+            spikes = net.getAllSpikes()
+        if instrument.isEnabled():
+            instrument.count('spikes', sum(numberOfSpikesInTrain(s) for sp in spikes for s in sp.values()))
+        instrument.flush(result=simData.result)
+        for k in range(K):
+            assertNoLearning(initW[k], finalW[k], simData.learning)
+            scd.addResult(getReplicaResultName(simData.result, k), dict(initW=initW[k], finalW=finalW[k], spikes=spikes[k]))
+    if save:
+        scd.saveResults()
@@ -0,0 +1,243 @@
+"""
+Compressed spike trains. Spike times (in sec) are integer ticks of the simulation step, so a train is stored as
+ticks of all channels concatenated, delta encoded (first spike of each channel and of each block absolute) and
+written as varints (LEB128) in blocks of BLOCK_SPIKES spikes, optionally zlib compressed. Any channel can be
+decoded alone by decoding only the blocks holding its spikes.
+
+EncodedTrain can be used as the list of channels it was created from (len, indexing, iteration), channels are
+decoded into NumPy arrays with times identical to the encoded ones.
+
+Varints take 1-2 bytes per spike (4-7x less than float64), zlib saves only 10-20 % more but doubles decoding
+time, so it is off by default. Decoding all channels is still slower than unpickling float64 arrays from the
+page cache; the gain is the size on disk (and reading it) and decoding single channels only.
+"""
+import zlib
+import warnings
+import numpy as np
+
+BLOCK_SPIKES = 16384                        # spikes per block
+TICKS_PER_SECOND = (1000, 10000, 100000)    # tried grids of spike times (1 ms, 0.1 ms, 0.01 ms)
+COMPRESS_LEVEL = 0                          # zlib level of blocks, 0: varints are stored uncompressed
+
+
+def varintEncode(values):
+    """
+    Returns LEB128 bytes of uint64 values.
+    """
+    nbytes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += (values >> np.uint64(7 * k)) > 0
+    ends = np.cumsum(nbytes)
+    starts = ends - nbytes
+    out = np.empty(int(ends[-1]) if len(ends) else 0, dtype=np.uint8)
+    for k in range(int(nbytes.max()) if len(nbytes) else 0):
+        sel = nbytes > k
+        byte = (values[sel] >> np.uint64(7 * k)) & np.uint64(0x7f)
+        byte |= np.where(nbytes[sel] > k + 1, np.uint64(0x80), np.uint64(0))
+        out[starts[sel] + k] = byte
+    return out.tobytes()
+
+
+def varintDecode(data):
+    """
+    Returns values (int64) of LEB128 bytes.
+    """
+    b = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(b < 0x80)
+    values = b[ends].astype(np.int64)
+    lens = np.diff(ends, prepend=-1)
+    if len(ends) == len(b):
+        return values
+    # from last byte of each varint to its first: second last bytes of all varints at once (spike deltas
+    # mostly take 2 bytes, single byte varints OR their own byte), longer varints one step per byte
+    multi = lens > 1
+    values <<= 7 * multi
+    values |= b[ends - multi] & 0x7f
+    sel = np.flatnonzero(lens > 2)
+    k = 2
+    while len(sel):
+        values[sel] = (values[sel] << 7) | (b[ends[sel] - k] & 0x7f)
+        k += 1
+        sel = sel[lens[sel] > k]
+    return values
+
+
+def undelta(deltas, resets):
+    """
+    Cumulative sum of deltas restarting at resets (sorted indices, first is 0), where deltas hold absolute values.
+    """
+    # absolute values are turned into differences to the last value of the previous segment, then one cumsum
+    cs = np.cumsum(deltas)
+    last = deltas[resets[:-1]] + cs[resets[1:] - 1] - cs[resets[:-1]]
+    d = deltas.copy()
+    d[resets[1:]] -= last
+    return np.cumsum(d, out=d)
+
+
+def findGrid(times, ticksPerSecond=None):
+    """
+    Returns (ticks per second, decode by division?, ticks) for which decoding gives times (in sec) exactly.
+    Times are decoded as ticks / ticksPerSecond (e.g. ms / 1000.) or ticks * (1. / ticksPerSecond)
+    (e.g. steps * dt). Raises ValueError if there is no such grid.
+        -> ticksPerSecond : grid to use, by default the coarsest of TICKS_PER_SECOND holding all times
+    """
+    candidates = [ticksPerSecond] if ticksPerSecond else TICKS_PER_SECOND
+    for tps in candidates:
+        ticks = np.rint(times * tps).astype(np.int64)
+        if np.array_equal(ticks / float(tps), times):
+            return tps, True, ticks
+        if np.array_equal(ticks * (1. / tps), times):
+            return tps, False, ticks
+    raise ValueError("Spike times are not on a grid of %s ticks per second" % (candidates,))
+
+
+def ticksToTimes(ticks, ticksPerSecond, divide):
+    """
+    Returns times (in sec) of ticks, as found by findGrid.
+    """
+    if divide:
+        return ticks / float(ticksPerSecond)
+    return ticks * (1. / ticksPerSecond)
+
+
+class EncodedTrain:
+    """
+    Spike train (list of spike times in sec of each channel) compressed with delta + varint (+ zlib) blocks.
+    """
+    def __init__(self, spikes, ticksPerSecond=None, compressLevel=COMPRESS_LEVEL):
+        """
+            -> spikes : list of spike times (in sec) of each channel, sorted within channel
+            -> ticksPerSecond : grid of spike times, by default the coarsest of TICKS_PER_SECOND holding all spikes
+            -> compressLevel : zlib level of blocks, 0 for no zlib
+        Raises ValueError if spikes are not sorted or not exactly on the grid.
+        """
+        channels = [np.asarray(s, dtype=float).ravel() for s in spikes]
+        counts = np.array([len(s) for s in channels], dtype=np.int64)
+        self.indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        times = np.concatenate(channels) if channels else np.zeros(0)
+
+        self.ticksPerSecond, self.divide, ticks = findGrid(times, ticksPerSecond)
+        if len(ticks) and ticks.min() < 0:
+            raise ValueError("Negative spike times can not be encoded")
+
+        nspikes = len(ticks)
+        resets = self._resets(0, nspikes)
+        deltas = ticks.copy()
+        deltas[1:] -= ticks[:-1]
+        deltas[resets] = ticks[resets]
+        if len(deltas) and deltas.min() < 0:
+            raise ValueError("Spikes of channels must be sorted")
+
+        deltas = deltas.astype(np.uint64)
+        self.compressLevel = compressLevel
+        self.blocks = [varintEncode(deltas[b: b + BLOCK_SPIKES]) for b in range(0, nspikes, BLOCK_SPIKES)]
+        if compressLevel:
+            self.blocks = [zlib.compress(block, compressLevel) for block in self.blocks]
+
+    def _block(self, b):
+        # trains pickled before zlib was optional have no compressLevel, their blocks are compressed
+        if getattr(self, 'compressLevel', 1):
+            return zlib.decompress(self.blocks[b])
+        return self.blocks[b]
+
+    def _resets(self, start, end):
+        """
+        Positions (relative to start) of absolute values in spikes [start, end): channel and block starts.
+        """
+        cs = self.indptr[(self.indptr > start) & (self.indptr < end)] - start
+        bs = np.arange(-start % BLOCK_SPIKES, end - start, BLOCK_SPIKES)
+        return np.union1d(np.union1d(cs, bs), [0]).astype(np.int64) if end > start else np.zeros(0, dtype=np.int64)
+
+    def _decodeTicks(self, start, end):
+        """
+        Returns ticks of spikes [start, end) of concatenated channels.
+        """
+        if end <= start:
+            return np.zeros(0, dtype=np.int64)
+        b0, b1 = start // BLOCK_SPIKES, (end - 1) // BLOCK_SPIKES + 1
+        # varints of consecutive blocks continue each other, so they are decoded at once
+        deltas = varintDecode(b''.join([self._block(b) for b in range(b0, b1)]))
+        first = b0 * BLOCK_SPIKES
+        ticks = undelta(deltas, self._resets(first, first + len(deltas)))
+        return ticks[start - first: end - first]
+
+    def _toTimes(self, ticks):
+        return ticksToTimes(ticks, self.ticksPerSecond, self.divide)
+
+    @property
+    def nchannels(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nspikes(self):
+        return int(self.indptr[-1])
+
+    @property
+    def nbytes(self):
+        return sum(len(b) for b in self.blocks) + self.indptr.nbytes
+
+    def counts(self):
+        """
+        Returns number of spikes of each channel.
+        """
+        return np.diff(self.indptr)
+
+    def channelTicks(self, channel):
+        """
+        Returns spike times of channel in ticks (int64).
+        """
+        return self._decodeTicks(int(self.indptr[channel]), int(self.indptr[channel + 1]))
+
+    def decodeTicks(self):
+        """
+        Returns (indptr, ticks) of all channels, spikes of channel c are ticks[indptr[c]:indptr[c + 1]].
+        """
+        return self.indptr, self._decodeTicks(0, self.nspikes)
+
+    def decode(self):
+        """
+        Returns list of spike times (in sec) of each channel.
+        """
+        if self.nchannels == 0:
+            return []
+        indptr, ticks = self.decodeTicks()
+        return np.split(self._toTimes(ticks), indptr[1:-1])
+
+    def __len__(self):
+        return self.nchannels
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[c] for c in range(*index.indices(self.nchannels))]
+        if index < 0:
+            index += self.nchannels
+        if index < 0 or index >= self.nchannels:
+            raise IndexError("channel index out of range")
+        return self._toTimes(self.channelTicks(index))
+
+    def __iter__(self):
+        return iter(self.decode())
+
+
+def encodeSpikes(spikes, ticksPerSecond=None):
+    """
+    Returns spikes as EncodedTrain, or spikes unchanged if they can not be encoded exactly
+    (not on the grid or unsorted).
+        -> spikes : list of spike times (in sec) of each channel
+    """
+    if isinstance(spikes, EncodedTrain):
+        return spikes
+    try:
+        return EncodedTrain(spikes, ticksPerSecond)
+    except ValueError as e:
+        warnings.warn("Spikes stored uncompressed: %s" % e)
+        return spikes
+
+
+def decodeSpikes(spikes):
+    """
+    Returns list of spike times (in sec) of each channel, decoded if spikes are EncodedTrain.
+    """
+    if isinstance(spikes, EncodedTrain):
+        return spikes.decode()
+    return spikes
@@ -0,0 +1,91 @@
+"""
+Binary spike files in CSR layout, input of spike_file_generator (nest-swtamodule), which reads
+them block by block during the simulation. Layout (little endian):
+    magic : 8 bytes b'EIMSPK01'
+    channels, spikes : uint64
+    indptr : uint64[channels + 1], spikes of channel c are times[indptr[c]:indptr[c + 1]]
+    times : float64[spikes], spike times in ms, sorted within each channel
+"""
+import numpy as np
+
+MAGIC = b'EIMSPK01'
+HEADER_SIZE = len(MAGIC) + 2 * 8
+
+
+def _toFileTimes(spikes):
+    times = np.sort(np.asarray(spikes, dtype=float))
+    # as with spike_generator, spikes at 0 are moved to 1 ms
+    times[times == 0] = 0.001
+    return (times * 1000.).astype('<f8')  # converting sec to ms
+
+
+def _writeHeader(f, indptr):
+    f.write(MAGIC)
+    np.array([len(indptr) - 1, indptr[-1]], dtype='<u8').tofile(f)
+    indptr.tofile(f)
+
+
+def writeSpikeFile(path, spikes):
+    """
+    Writes spike train to spike file.
+        -> spikes : list of spike times (in sec) of each channel
+    """
+    counts = np.array([len(s) for s in spikes], dtype='<u8')
+    indptr = np.concatenate(([0], np.cumsum(counts))).astype('<u8')
+    with open(path, 'wb') as f:
+        _writeHeader(f, indptr)
+        for s in spikes:
+            _toFileTimes(s).tofile(f)
+
+
+def writeChunkedSpikeFile(path, getChunks):
+    """
+    Writes spike train given in consecutive chunks of time to spike file, holding one chunk in memory.
+        -> getChunks : function returning iterator over chunks, each a list of spike times (in sec) of each
+                       channel, later chunks have later spikes (called twice, first to count spikes)
+    """
+    counts = None
+    for chunk in getChunks():
+        chunkCounts = np.array([len(s) for s in chunk], dtype='<u8')
+        counts = chunkCounts if counts is None else counts + chunkCounts
+    indptr = np.concatenate(([0], np.cumsum(counts))).astype('<u8')
+    with open(path, 'wb') as f:
+        _writeHeader(f, indptr)
+        f.truncate(HEADER_SIZE + 8 * (len(indptr) + int(indptr[-1])))
+    if indptr[-1] == 0:
+        return
+    times = np.memmap(path, dtype='<f8', mode='r+', offset=HEADER_SIZE + 8 * len(indptr), shape=(int(indptr[-1]),))
+    pos = indptr[:-1].astype(np.int64)
+    for chunk in getChunks():
+        for c, s in enumerate(chunk):
+            times[pos[c]:pos[c] + len(s)] = _toFileTimes(s)
+            pos[c] += len(s)
+    times.flush()
+    del times
+
+
+def openSpikeFile(path):
+    """
+    Returns (indptr, times in ms) of spike file, times are memory-mapped.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a spike file: " + path)
+        channels, nspikes = np.fromfile(f, dtype='<u8', count=2)
+        indptr = np.fromfile(f, dtype='<u8', count=channels + 1).astype(np.int64)
+    if nspikes == 0:
+        return indptr, np.zeros(0)
+    offset = HEADER_SIZE + 8 * (int(channels) + 1)
+    return indptr, np.memmap(path, dtype='<f8', mode='r', offset=offset, shape=(int(nspikes),))
+
+
+def getSpikeFileChannels(path):
+    return len(openSpikeFile(path)[0]) - 1
+
+
+def readSpikeFile(path):
+    """
+    Reads spike file, returns list of spike times (in sec) of each channel.
+    """
+    indptr, times = openSpikeFile(path)
+    return [np.array(times[indptr[c]:indptr[c + 1]]) / 1000. for c in range(len(indptr) - 1)]
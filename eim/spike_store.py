@@ -0,0 +1,226 @@
+"""
+Spike stores: spike trains on disk with a per channel index of time blocks (1 s by default), so spikes of a
+time window and some channels are read and decoded without touching the rest of the train.
+Layout (little endian):
+    magic : 8 bytes b'EIMSTR01'
+    channels, blocks, blockTicks, ticksPerSecond, divide, spikes : uint64
+    channelOffset : uint64[channels + 1], byte range of channel c in data is channelOffset[c]:channelOffset[c + 1]
+    blockOffset : uint32[channels, blocks + 1], byte offset of time block b within channel (relative to channel)
+    data : varints (see eim.spike_codec) of spike ticks, first spike of a block relative to block start,
+           the others relative to the previous spike
+Spike times are integer ticks of a grid (see spike_codec.findGrid) and decoded to the exact stored times.
+
+SpikeStore is used as the list of channels (len, indexing, iteration) and is pickled as its path, so results
+refer to their spike stores instead of holding the spikes. The path is relative to the directory of the result
+(resolved by eim.data.loadData), and the file is opened on first access, so a result loads without its stores.
+"""
+import os
+import numpy as np
+from .spike_codec import varintEncode, varintDecode, undelta, findGrid, ticksToTimes
+
+MAGIC = b'EIMSTR01'
+INDEX = ('blockTicks', 'ticksPerSecond', 'divide', 'nspikes', 'nblocks', 'channelOffset', 'blockOffset',
+         '_dataOffset', '_dataSize')   # attributes read from file on first access
+HEADER_SIZE = len(MAGIC) + 6 * 8
+BLOCK_DURATION = 1.     # duration of indexed time blocks in sec
+
+
+def writeSpikeStore(path, spikes, blockDuration=BLOCK_DURATION, ticksPerSecond=None):
+    """
+    Writes spike train to spike store, returns SpikeStore.
+        -> spikes : list of spike times (in sec) of each channel, sorted within channel, not negative
+        -> blockDuration : duration of indexed time blocks in sec
+        -> ticksPerSecond : grid of spike times (see spike_codec.findGrid)
+    Raises ValueError if spikes are not on a grid, negative or not sorted.
+    """
+    channels = [np.asarray(s, dtype=float).ravel() for s in spikes]
+    times = np.concatenate(channels) if channels else np.zeros(0)
+    tps, divide, ticks = findGrid(times, ticksPerSecond)
+    if len(ticks) and ticks.min() < 0:
+        raise ValueError("Negative spike times can not be stored")
+    blockTicks = max(int(round(blockDuration * tps)), 1)
+    nblocks = int(ticks.max()) // blockTicks + 1 if len(ticks) else 0
+
+    channelOffset = np.zeros(len(channels) + 1, dtype='<u8')
+    blockOffset = np.zeros((len(channels), nblocks + 1), dtype='<u4')
+    data = []
+    first = 0
+    for ch, s in enumerate(channels):
+        chticks = ticks[first: first + len(s)]
+        first += len(s)
+        if len(chticks) and np.any(np.diff(chticks) < 0):
+            raise ValueError("Spikes of channels must be sorted")
+        block = chticks // blockTicks
+        # first spike of each block relative to block start, the others to previous spike
+        deltas = chticks.copy()
+        deltas[1:] -= chticks[:-1]
+        starts = np.flatnonzero(np.diff(block, prepend=-1) != 0)
+        deltas[starts] = chticks[starts] - block[starts] * blockTicks
+        encoded = varintEncode(deltas.astype(np.uint64))
+        # byte offset of each block: bytes of spikes before first spike of block
+        nbytes = np.ones(len(deltas), dtype=np.int64)
+        for k in range(1, 10):
+            nbytes += (deltas >> (7 * k)) > 0
+        byteEnds = np.concatenate(([0], np.cumsum(nbytes)))
+        blockOffset[ch] = byteEnds[np.searchsorted(block, np.arange(nblocks + 1), side='left')]
+        if len(encoded) > np.iinfo(np.uint32).max:
+            raise ValueError("Channel too large for spike store")
+        channelOffset[ch + 1] = channelOffset[ch] + len(encoded)
+        data.append(encoded)
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        np.array([len(channels), nblocks, blockTicks, tps, int(divide), len(ticks)], dtype='<u8').tofile(f)
+        channelOffset.tofile(f)
+        blockOffset.tofile(f)
+        for encoded in data:
+            f.write(encoded)
+    return SpikeStore(path)
+
+
+class SpikeStore:
+    """
+    Spike train in spike store file, see module description.
+    """
+    def __init__(self, path, directory=None):
+        """
+            -> path : spike store file, relative to directory
+            -> directory : directory path is relative to (e.g. of result shelf), default current directory
+        """
+        self.path = path
+        self.directory = directory
+
+    @property
+    def file(self):
+        return os.path.join(self.directory, self.path) if self.directory else self.path
+
+    def resolvePath(self, directory):
+        """
+        Sets directory the path is relative to (directory of loaded result).
+        """
+        self.directory = directory
+
+    def __getattr__(self, name):
+        # index is read on first access
+        if name not in INDEX:
+            raise AttributeError(name)
+        self._open()
+        return self.__dict__[name]
+
+    def _open(self):
+        if not os.path.exists(self.file):
+            raise IOError("Missing spike store: " + self.file)
+        with open(self.file, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("Not a spike store: " + self.file)
+            header = np.fromfile(f, dtype='<u8', count=6)
+        channels, nblocks, self.blockTicks, self.ticksPerSecond, divide, self.nspikes = [int(h) for h in header]
+        self.divide = bool(divide)
+        self.nblocks = nblocks
+        offset = HEADER_SIZE
+        self.channelOffset = np.memmap(self.file, dtype='<u8', mode='r', offset=offset, shape=(channels + 1,))
+        offset += 8 * (channels + 1)
+        self.blockOffset = np.memmap(self.file, dtype='<u4', mode='r', offset=offset,
+                                     shape=(channels, nblocks + 1)) if channels and nblocks else \
+            np.zeros((channels, nblocks + 1), dtype='<u4')
+        offset += 4 * channels * (nblocks + 1)
+        self._dataOffset = offset
+        self._dataSize = int(self.channelOffset[-1])
+
+    def __getstate__(self):
+        return dict(path=self.path)
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self.directory = None
+
+    @property
+    def nchannels(self):
+        return len(self.channelOffset) - 1
+
+    @property
+    def blockDuration(self):
+        return self.blockTicks / float(self.ticksPerSecond)
+
+    def _read(self, channels, b0, b1):
+        """
+        Returns (indptr, ticks) of spikes of channels in time blocks [b0, b1), spikes of the k-th channel are
+        ticks[indptr[k]:indptr[k + 1]]. Only the bytes of these blocks are read.
+        """
+        nb = max(b1 - b0, 0)
+        offsets = np.zeros((len(channels), nb + 1), dtype=np.int64)
+        if len(channels) and nb:
+            offsets += np.asarray(self.blockOffset[channels, b0: b1 + 1], dtype=np.int64)
+            offsets += np.asarray(self.channelOffset[channels], dtype=np.int64)[:, None]
+        # byte ranges of (channel, block) segments, gathered into one buffer
+        lens = np.diff(offsets, axis=1).ravel()
+        segEnds = np.cumsum(lens)
+        total = int(segEnds[-1]) if len(segEnds) else 0
+        if total == 0:
+            return np.zeros(len(channels) + 1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        data = np.memmap(self.file, dtype=np.uint8, mode='r', offset=self._dataOffset, shape=(self._dataSize,))
+        data = np.asarray(data[np.repeat(offsets[:, :-1].ravel() - (segEnds - lens), lens) + np.arange(total)])
+        deltas = varintDecode(data)
+        # segment of each spike from byte position of its last varint byte
+        seg = np.searchsorted(segEnds, np.flatnonzero(data < 0x80), side='right')
+        resets = np.flatnonzero(np.diff(seg, prepend=-1) != 0)
+        ticks = undelta(deltas, resets) + (seg % nb + b0) * self.blockTicks
+        counts = np.bincount(seg // nb, minlength=len(channels))
+        return np.concatenate(([0], np.cumsum(counts))), ticks
+
+    def window(self, start=0., end=None, channels=None):
+        """
+        Returns list of spike times (in sec) in [start, end] of channels, only time blocks of window are read.
+            -> start, end : window in sec, end None is end of train
+            -> channels : list of channel indices, default all channels
+        """
+        channels = np.arange(self.nchannels) if channels is None else np.asarray(channels, dtype=np.int64)
+        if len(channels) and (channels.min() < -self.nchannels or channels.max() >= self.nchannels):
+            raise IndexError("channel index out of range")
+        channels = channels % max(self.nchannels, 1)
+        tps = float(self.ticksPerSecond)
+        b0 = max(int(np.floor(start * tps / self.blockTicks)), 0)
+        b1 = self.nblocks if end is None else min(int(np.floor(end * tps / self.blockTicks)) + 1, self.nblocks)
+        indptr, ticks = self._read(channels, b0, b1)
+        times = ticksToTimes(ticks, self.ticksPerSecond, self.divide)
+        inside = times >= start
+        if end is not None:
+            inside &= times <= end
+        # counts of spikes inside window per channel
+        indptr = np.concatenate(([0], np.cumsum(inside)))[indptr]
+        return np.split(times[inside], indptr[1:-1]) if len(channels) else []
+
+    def decode(self):
+        """
+        Returns list of spike times (in sec) of each channel.
+        """
+        return self.window()
+
+    def __len__(self):
+        return self.nchannels
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.window(channels=range(*index.indices(self.nchannels)))
+        return self.window(channels=[index])[0]
+
+    def __iter__(self):
+        return iter(self.decode())
+
+
+def readWindow(spikes, start, end, channels=None):
+    """
+    Returns list of spike times in [start, end] of channels of spike train, read from disk only for the
+    window if spikes is SpikeStore.
+        -> spikes : list of spike times (in sec) of each channel, or SpikeStore
+        -> channels : list of channel indices, default all channels
+    """
+    if hasattr(spikes, 'window'):
+        return spikes.window(start, end, channels)
+    if channels is None:
+        channels = range(len(spikes))
+    result = []
+    for ch in channels:
+        s = np.asarray(spikes[ch], dtype=float)
+        result.append(s[np.searchsorted(s, start, side='left'): np.searchsorted(s, end, side='right')])
+    return result
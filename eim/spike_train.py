@@ -1,5 +1,6 @@
 import numpy as np
 from . import patterns
+from . import dtypes
 from .psp import createPSPShape
 from .common import OUProcess
 
@@ -13,7 +14,10 @@ def sigmoid(Value, offset=0., width=1.):
     return 1.0/(1.0 + np.exp(-(Value-offset)/width))
 
 
-def createSpikeTrainFromPatterns(patternsParams, trainDuration, pd=None, patternSeed=None, pdSeed=None, spikeTrainSeed=None):
+def createPatterns(patternsParams, patternSeed=None):
+    """
+    Creates pattern templates (pattern class of data settings).
+    """
     if patternSeed:
         np.random.seed(patternSeed)
     pp = patternsParams
@@ -27,6 +31,17 @@ def createSpikeTrainFromPatterns(patternsParams, trainDuration, pd=None, pattern
         pg = patterns.SpatioTemporalPatterns(pp.nChannels, pp.nPatterns, pp.rates, pp.patternLength, pp.dt, process=oup)
     else:
         raise ValueError("Unsupported pattern class: " + pp.patternsClass)
+    return pg
+
+
+def createSpikeTrainFromPatterns(patternsParams, trainDuration, pd=None, patternSeed=None, pdSeed=None, spikeTrainSeed=None,
+                                 createSpikes=True):
+    """
+        -> createSpikes : if False, only the schedule is created, spikes are drawn during the simulation
+                          (pattern_poisson_generator) or when input is set (see TTrain.createScheduledSpikes)
+    """
+    pp = patternsParams
+    pg = createPatterns(pp, patternSeed)
 
     pm = patterns.PatternManager(pp.dt)
     pm.addPatterns(pg.patterns, pp.patternIDs)
@@ -40,10 +55,15 @@ def createSpikeTrainFromPatterns(patternsParams, trainDuration, pd=None, pattern
         np.random.seed(spikeTrainSeed)
     train = TTrain(pm.patterns, pp.nChannels, pp.dt)
     train.add(0., trainDuration, pd)
-    train.combinePatterns(pp.combineRules)
 
     assert pp.maxOverlappingPatterns == len(pp.mixingDistribution)
 
+    if not createSpikes:
+        seed = spikeTrainSeed if spikeTrainSeed else np.random.randint(2**31)
+        train.setSchedule(pp.combineRules, pp.maxOverlappingPatterns, pp.dataFillNoiseRate, pp.dataInbetweenNoiseRate, seed)
+        return train, pg
+
+    train.combinePatterns(pp.combineRules)
     train.addFillNoise(pp.maxOverlappingPatterns, pp.dataFillNoiseRate, False, False)
     train.addInbetweenNoise(pp.dataInbetweenNoiseRate)
 
@@ -91,6 +111,16 @@ class TTrain:
         self.dt = dt # simultion time step in ms
         self.nchannels = nchannels
         self.noiseset = False
+        self.spikes = None
+        self.schedule = None
+
+    def __getstate__(self):
+        # spikes are stored compressed (see eim.spike_codec), decoded when read
+        from .spike_codec import encodeSpikes
+        state = dict(self.__dict__)
+        if state.get('spikes') is not None:
+            state['spikes'] = encodeSpikes(state['spikes'])
+        return state
 
     def add(self, trainstart, trainlength, patternsdistribution):
         """
@@ -110,19 +140,27 @@ class TTrain:
                 # sort added patternsdistribution
                 self.pd[ID].sort()
 
+    def _occurrence(self, t, patlen):
+        """
+        Returns (start, skipped steps of pattern, length) of pattern occurrence with onset t in the train.
+        Onsets before 0 are tails of patterns started before the train (e.g. in previous chunk of a dataset).
+        """
+        skip = max(-t, 0)
+        return t + skip, skip, max(min(patlen, self.duration - t) - skip, 0)
+
     def combinePatterns(self, params = {'function':'linear'}):
         """
         """
         #first create rates array(nchannels x trainlength), sum up all
         # assumption is that all IDs in pd are described in patterns
-        self.rates = np.zeros((self.nchannels,self.duration)) 
+        self.rates = np.zeros((self.nchannels,self.duration), dtype=dtypes.RATE)
         for ID in self.pd.keys():
             patrates = self.patterns[ID]
             patlen = patrates.shape[1]
             pd = self.pd[ID]
             for t in pd:
-                length = min(patlen,self.duration-t)
-                self.rates[:,t:t+length] += patrates[:,:length]
+                start, skip, length = self._occurrence(t, patlen)
+                self.rates[:,start:start+length] += patrates[:,skip:skip+length]
 
          # by default rates are just summed up (linear function)
          # otherwise combine them nonlinearly
@@ -130,7 +168,7 @@ class TTrain:
             rates = params['rates']
             offset = rates['low'] + rates['high']/2.
             width = rates['high']/2.*1/params['precision']
-            self.rates = rates['low']+rates['high']*sigmoid(self.rates, offset, width )
+            self.rates = np.asarray(rates['low']+rates['high']*sigmoid(self.rates, offset, width ), dtype=dtypes.RATE)
 
     def addNoise(self, maxrate, constTime = True, constCh = True):
         """
@@ -145,7 +183,7 @@ class TTrain:
             return
 			
         if self.noiseset == False:
-            self.noise = np.zeros((self.nchannels,self.duration)) 
+            self.noise = np.zeros((self.nchannels,self.duration), dtype=dtypes.RATE)
             self.noiseset = True
         
         if constTime == False:
@@ -181,15 +219,15 @@ class TTrain:
             patlen = self.patlen[ID]
             pd = self.pd[ID]
             for t in pd:
-                length = min(patlen,self.duration-t)
-                npat[t:t+length] += 1
+                start, skip, length = self._occurrence(t, patlen)
+                npat[start:start+length] += 1
         # calculate difference between maxpatterns and number of patterns at given time
         diff = np.maximum(maxpatterns-npat,0)
         # create noise
-        noise = np.zeros((self.nchannels,self.duration)) 
+        noise = np.zeros((self.nchannels,self.duration), dtype=dtypes.RATE)
         if constTime == False:
             if constCh == False:
-                noise=np.random.rand(self.nchannels,self.duration)*maxrate
+                noise=np.asarray(np.random.rand(self.nchannels,self.duration)*maxrate, dtype=dtypes.RATE)
             else:
                 noise = np.random.rand(self.duration)*maxrate
                 for ch in range(self.nchannels):
@@ -204,10 +242,8 @@ class TTrain:
         # now account for difference in target (max number of patterns) and actual number
         for ch in range(self.nchannels):
             noise[ch]*=diff
-        print(noise)
-        print(noise.sum() / (self.nchannels * self.duration))
         if self.noiseset == False:
-            self.noise = np.zeros((self.nchannels,self.duration)) 
+            self.noise = np.zeros((self.nchannels,self.duration), dtype=dtypes.RATE)
             self.noiseset = True
         # update the noise
         self.noise+=noise
@@ -229,12 +265,12 @@ class TTrain:
             patlen = self.patlen[ID]
             pd = self.pd[ID]
             for t in pd:
-                length = min(patlen,self.duration-t)
-                npat[t:t+length] += 1
+                start, skip, length = self._occurrence(t, patlen)
+                npat[start:start+length] += 1
         # times when there are no patterns - fill with noise
         diff = (npat==0)*1.
         # create noise
-        noise = np.zeros((self.nchannels,self.duration)) 
+        noise = np.zeros((self.nchannels,self.duration), dtype=dtypes.RATE)
         noise[:,:]= noiserate
 
         # now account for difference in target (max number of patterns) and actual number
@@ -242,7 +278,7 @@ class TTrain:
             noise[ch]*=diff
 
         if self.noiseset == False:
-            self.noise = np.zeros((self.nchannels,self.duration)) 
+            self.noise = np.zeros((self.nchannels,self.duration), dtype=dtypes.RATE)
             self.noiseset = True
         # update the noise
         self.noise+=noise
@@ -254,17 +290,17 @@ class TTrain:
         It is kept inside in self.spikes = [ch1,...chN], chN = [spike1,...,spikeM], spikes times in sec
         Freerate : it frees memory allocated with self.rates (this can be rebuild always).
         """
-        r = np.random.rand(self.nchannels, self.duration)/self.dt
         self.spikes = []
         inputtau_ms = int(inputtau/self.dt)
-        if self.noiseset == True:
-            bsp = self.rates + self.noise>r
-        else:
-            bsp = self.rates > r
-
+        # random numbers are drawn channel by channel (same stream as one (nchannels, duration) draw),
+        # so no float64 array of the whole train is needed
         for ch in range(self.nchannels):
-            chlen = len(bsp[ch,:])
-            chspikes=bsp[ch,:].nonzero()[0]*self.dt
+            r = np.random.rand(self.duration)/self.dt
+            if self.noiseset == True:
+                bsp = self.rates[ch] + self.noise[ch] > r
+            else:
+                bsp = self.rates[ch] > r
+            chspikes=bsp.nonzero()[0]*self.dt
             self.spikes.append(chspikes)
 
         if freerates:
@@ -272,6 +308,66 @@ class TTrain:
             if self.noiseset == True:
                 self.noise = None
 
+    def setSchedule(self, combineRules, maxPatterns, fillNoiseRate, inbetweenNoiseRate, seed):
+        """
+        Keeps rules turning patterns distribution into spikes (as combinePatterns, addFillNoise with random
+        noise in time and channels, addInbetweenNoise and createSpikes), instead of drawing spikes now.
+            -> seed : seed of spikes, channel ch of pattern_poisson_generator uses seed + ch
+        """
+        self.schedule = dict(combineRules=combineRules, maxPatterns=maxPatterns, fillNoiseRate=fillNoiseRate,
+                             inbetweenNoiseRate=inbetweenNoiseRate, seed=seed)
+
+    def hasSchedule(self):
+        return getattr(self, 'schedule', None) is not None
+
+    def getGeneratorStatus(self):
+        """
+        Returns status of pattern_poisson_generator of each channel.
+        """
+        sc = self.schedule
+        IDs = sorted(self.pd.keys())
+        onsets = np.concatenate([np.array(self.pd[ID], dtype=int) for ID in IDs] + [np.zeros(0, dtype=int)])
+        onsetPatterns = np.concatenate([np.full(len(self.pd[ID]), i, dtype=int) for i, ID in enumerate(IDs)] + [np.zeros(0, dtype=int)])
+        order = np.argsort(onsets, kind='stable')
+        common = {
+            'pattern_lengths': [int(self.patlen[ID]) for ID in IDs],
+            'onsets': onsets[order].tolist(),
+            'onset_patterns': onsetPatterns[order].tolist(),
+            'dt': self.dt * 1000.,  # converting sec to ms
+            'combine': sc['combineRules']['function'],
+            'max_patterns': int(sc['maxPatterns']),
+            'fill_noise_rate': float(sc['fillNoiseRate']),
+            'inbetween_noise_rate': float(sc['inbetweenNoiseRate']),
+        }
+        if common['combine'] == 'nonlinear':
+            common.update(rate_low=float(sc['combineRules']['rates']['low']), rate_high=float(sc['combineRules']['rates']['high']),
+                          precision=float(sc['combineRules']['precision']))
+
+        status = []
+        for ch in range(self.nchannels):
+            st = dict(common)
+            st['rates'] = np.concatenate([np.asarray(self.patterns[ID][ch], dtype=float) for ID in IDs]).tolist()
+            st['seed'] = int(sc['seed']) + ch
+            status.append(st)
+        return status
+
+    def createScheduledSpikes(self):
+        """
+        Draws spikes of the schedule (statistically as pattern_poisson_generator), returns spikes without keeping them.
+        Used when input is not drawn by the generator (spike_generator or NumPy backend).
+        """
+        sc = self.schedule
+        state = np.random.get_state()
+        np.random.seed(sc['seed'])
+        self.combinePatterns(sc['combineRules'])
+        self.addFillNoise(sc['maxPatterns'], sc['fillNoiseRate'], False, False)
+        self.addInbetweenNoise(sc['inbetweenNoiseRate'])
+        self.createSpikes()
+        np.random.set_state(state)
+        spikes, self.spikes = self.spikes, None
+        self.noiseset = False
+        return spikes
+
     def convertToEPSP(self, EPSP):
         """
         Convert the spike based samples into EPSP input given the EPSP shape and type
@@ -285,7 +381,7 @@ class TTrain:
         EPSPtype = EPSP['type']
         EPSPduration = len(epsp)
 
-        data = np.zeros((self.nchannels, self.duration))
+        data = np.zeros((self.nchannels, self.duration), dtype=dtypes.TRACE)
         # for each channel and each spike in it put prefered epsp shape
         for nch,ch in enumerate(self.spikes):
             for sp in ch:
@@ -309,7 +405,7 @@ class TTrain:
         EPSPtype = EPSP['type']
         EPSPduration = len(epsp)
 
-        data = np.zeros((self.nchannels, end-start))
+        data = np.zeros((self.nchannels, end-start), dtype=dtypes.TRACE)
         # for each channel and each spike in it put prefered epsp shape
         for nch,ch in enumerate(self.spikes):
             for sp in ch:
@@ -322,3 +418,46 @@ class TTrain:
                         data[nch,sp_ms-start:sp_ms-start+epspdur]+=epsp[:epspdur]
         return data
 
+    def epspAt(self, EPSP, times_ms):
+        """
+        EPSP state of all channels at given times, in one pass over all spikes.
+        Equals convertToEPSP2(EPSP, time_ms - EPSP duration, time_ms)[:, -1] for each time_ms.
+            -> EPSP: dictionary describing EPSP (see psp.createPSPShape)
+            -> times_ms : array of query times in ms (int)
+        Returns array(len(times_ms), nchannels)
+        """
+        epsp = createPSPShape(EPSP, self.dt)
+        EPSPtype = EPSP['type']
+        # spikes earlier than window have no effect at time_ms - 1
+        window = min(int(EPSP['duration'] * 1000), len(epsp))
+
+        times_ms = np.asarray(times_ms, dtype=np.int64)
+        nq = len(times_ms)
+        if nq == 0 or window <= 0:
+            return np.zeros((nq, self.nchannels), dtype=dtypes.TRACE)
+
+        # all spikes as sorted keys channel * span + spike time in ms
+        sp_ms = [np.asarray(np.asarray(ch) * 1000, dtype=np.int64) for ch in self.spikes]
+        tmin = min(0, times_ms.min() - window)
+        span = max([times_ms.max()] + [ch.max() + 1 for ch in sp_ms if len(ch)]) - tmin + 1
+        keys = np.concatenate([ch - tmin + nch * span for nch, ch in enumerate(sp_ms)])
+        order = np.argsort(keys, kind='stable')  # spikes in channel should be sorted already
+        keys = keys[order]
+
+        # spikes in [time_ms - window, time_ms) for each (time, channel) pair
+        base = (times_ms - tmin)[:, np.newaxis] + np.arange(self.nchannels)[np.newaxis, :] * span
+        lo = np.searchsorted(keys, base - window, side='left').ravel()
+        hi = np.searchsorted(keys, base, side='left').ravel()
+        counts = hi - lo
+        pair = np.repeat(np.arange(nq * self.nchannels), counts)
+        idx = lo[pair] + np.arange(len(pair)) - np.repeat(np.cumsum(counts) - counts, counts)
+        lag = (base.ravel()[pair] - 1) - keys[idx]
+        values = epsp[lag]
+
+        data = np.zeros(nq * self.nchannels, dtype=dtypes.TRACE)
+        if EPSPtype == "renewal":
+            np.maximum.at(data, pair, values)
+        elif EPSPtype == "additive":
+            np.add.at(data, pair, values)
+        return data.reshape((nq, self.nchannels))
+
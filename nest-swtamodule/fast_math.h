@@ -0,0 +1,108 @@
+/*
+ *  fast_math.h
+ */
+
+#ifndef FAST_MATH_H
+#define FAST_MATH_H
+
+// C++ includes:
+#include <cmath>
+#include <cstring>
+#include <stdint.h>
+
+namespace swtamodule_ns
+{
+
+/* BeginDocumentation
+  Name: fast_math - table based approximations of exp used in hot loops.
+
+  Description:
+
+  fast_exp( x ) rounds x * 64 / ln(2) to the nearest integer 64 * k + j and
+  evaluates
+
+      exp( x ) = 2^k * 2^(j / 64) * exp( r ),  |r| <= ln(2) / 128
+
+  with 2^(j / 64) taken from a table, exp( r ) from a 4th order Taylor
+  polynomial and 2^k assembled directly in the exponent bits. The relative
+  error is bounded by |r|^5 / 120 < 4e-14 (plus rounding). Compared to
+  std::exp it avoids the generic argument reduction and special case
+  handling.
+
+  fast_neg_expm1( x ) returns 1 - exp( -x ) for x >= 0, which is the
+  probability of at least one event of a Poisson process with mean x. Small
+  arguments use the Taylor series to avoid cancellation.
+*/
+
+const int FAST_EXP_TABLE_BITS = 6;
+const int FAST_EXP_TABLE_SIZE = 1 << FAST_EXP_TABLE_BITS;
+
+/**
+ * Table of 2^(j / FAST_EXP_TABLE_SIZE), j = 0 .. FAST_EXP_TABLE_SIZE - 1,
+ * correctly rounded. A constant at namespace scope is initialized statically,
+ * so lookups in fast_exp need no guard of a function local static.
+ */
+const double FAST_EXP_TABLE[ FAST_EXP_TABLE_SIZE ] = {
+  1.0, 1.0108892860517005, 1.0218971486541166, 1.0330248790212284,
+  1.0442737824274138, 1.0556451783605572, 1.0671404006768237, 1.0787607977571199,
+  1.0905077326652577, 1.102382583307841, 1.1143867425958924, 1.1265216186082418,
+  1.1387886347566916, 1.1511892299529827, 1.1637248587775775, 1.1763969916502812,
+  1.189207115002721, 1.202156731452703, 1.215247359980469, 1.22848053610687,
+  1.241857812073484, 1.255380757024691, 1.2690509571917332, 1.2828700160787783,
+  1.2968395546510096, 1.3109612115247644, 1.3252366431597413, 1.339667524053303,
+  1.3542555469368927, 1.3690024229745905, 1.383909881963832, 1.3989796725383112,
+  1.4142135623730951, 1.42961333839197, 1.4451808069770467, 1.460917794180647,
+  1.4768261459394993, 1.4929077282912648, 1.5091644275934228, 1.5255981507445384,
+  1.5422108254079407, 1.559004400237837, 1.5759808451078865, 1.593142151342267,
+  1.6104903319492543, 1.6280274218573478, 1.645755478153965, 1.6636765803267364,
+  1.681792830507429, 1.7001063537185235, 1.718619298122478, 1.7373338352737062,
+  1.7562521603732995, 1.7753764925265212, 1.7947090750031072, 1.8142521755003989,
+  1.8340080864093424, 1.8539791250833855, 1.8741676341103, 1.8945759815869656,
+  1.9152065613971474, 1.9360617934922943, 1.9571441241754002, 1.978456026387951,
+};
+
+inline double
+fast_exp( double x )
+{
+  // outside of this range the result is 0 or overflows, leave it to std::exp
+  if ( x < -700.0 || x > 700.0 )
+  {
+    return std::exp( x );
+  }
+
+  // adding 1.5 * 2^52 rounds to the nearest integer (needs strict IEEE
+  // arithmetic, do not compile with -ffast-math)
+  const double shift = 6755399441055744.0;
+  const double n = ( x * ( 1.4426950408889634 * FAST_EXP_TABLE_SIZE ) + shift ) - shift;
+  const int64_t in = static_cast< int64_t >( n );
+  const double r = x - n * ( 0.6931471805599453 / FAST_EXP_TABLE_SIZE );
+
+  // exp( r ), |r| <= ln(2) / 128
+  const double p =
+    1.0 + r * ( 1.0 + r * ( 0.5 + r * ( 1.0 / 6.0 + r * ( 1.0 / 24.0 ) ) ) );
+
+  const int64_t k = in >> FAST_EXP_TABLE_BITS; // floor division, also for negative in
+  const int j = static_cast< int >( in & ( FAST_EXP_TABLE_SIZE - 1 ) );
+
+  // 2^k, k is in normal range of doubles for |x| <= 700
+  const uint64_t bits = static_cast< uint64_t >( k + 1023 ) << 52;
+  double scale;
+  std::memcpy( &scale, &bits, sizeof( scale ) );
+
+  return FAST_EXP_TABLE[ j ] * p * scale;
+}
+
+inline double
+fast_neg_expm1( double x )
+{
+  if ( x < 1e-2 )
+  {
+    // 1 - exp(-x) = x - x^2/2 + x^3/6 - x^4/24 + O(x^5)
+    return x * ( 1.0 - x * ( 0.5 - x * ( 1.0 / 6.0 - x * ( 1.0 / 24.0 ) ) ) );
+  }
+  return 1.0 - fast_exp( -x );
+}
+
+} // namespace swtamodule_ns
+
+#endif /* #ifndef FAST_MATH_H */
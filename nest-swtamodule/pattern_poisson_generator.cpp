@@ -0,0 +1,323 @@
+/*
+ *  pattern_poisson_generator.cpp
+ *
+ *  pattern_poisson_generator: Poisson generator following pattern rates of
+ *  a pattern schedule.
+ */
+
+#include "pattern_poisson_generator.h"
+
+// C++ includes:
+#include <algorithm>
+#include <cmath>
+
+// Includes from libnestutil:
+#include "compose.hpp"
+
+// Includes from nestkernel:
+#include "event_delivery_manager_impl.h"
+#include "exceptions.h"
+#include "kernel_manager.h"
+
+// Includes from sli:
+#include "dict.h"
+#include "dictutils.h"
+#include "doubledatum.h"
+#include "doublevectordatum.h"
+#include "integerdatum.h"
+#include "intvectordatum.h"
+#include "stringdatum.h"
+
+namespace nest
+{
+
+/* ----------------------------------------------------------------
+ * Default constructors defining default parameter
+ * ---------------------------------------------------------------- */
+
+nest::pattern_poisson_generator::Parameters_::Parameters_()
+  : rates_()
+  , pattern_lengths_()
+  , onsets_()
+  , onset_patterns_()
+  , dt_( 1.0 )             // ms
+  , nonlinear_( false )
+  , rate_low_( 0.0 )       // Hz
+  , rate_high_( 0.0 )      // Hz
+  , precision_( 1.0 )
+  , max_patterns_( 0 )
+  , fill_noise_rate_( 0.0 )      // Hz
+  , inbetween_noise_rate_( 0.0 ) // Hz
+  , seed_( 0 )
+{
+}
+
+nest::pattern_poisson_generator::State_::State_()
+  : next_onset_( 0 )
+  , active_()
+  , reseed_( true )
+{
+}
+
+/* ----------------------------------------------------------------
+ * Parameter extraction and manipulation functions
+ * ---------------------------------------------------------------- */
+
+void
+nest::pattern_poisson_generator::Parameters_::get( DictionaryDatum& d ) const
+{
+  ( *d )[ "rates" ] = DoubleVectorDatum( new std::vector< double >( rates_ ) );
+  ( *d )[ "pattern_lengths" ] =
+    IntVectorDatum( new std::vector< long >( pattern_lengths_ ) );
+  ( *d )[ "onsets" ] = IntVectorDatum( new std::vector< long >( onsets_ ) );
+  ( *d )[ "onset_patterns" ] =
+    IntVectorDatum( new std::vector< long >( onset_patterns_ ) );
+  def< double >( d, "dt", dt_ );
+  def< std::string >( d, "combine", nonlinear_ ? "nonlinear" : "linear" );
+  def< double >( d, "rate_low", rate_low_ );
+  def< double >( d, "rate_high", rate_high_ );
+  def< double >( d, "precision", precision_ );
+  def< long >( d, "max_patterns", max_patterns_ );
+  def< double >( d, "fill_noise_rate", fill_noise_rate_ );
+  def< double >( d, "inbetween_noise_rate", inbetween_noise_rate_ );
+  def< long >( d, "seed", seed_ );
+}
+
+void
+nest::pattern_poisson_generator::Parameters_::set( const DictionaryDatum& d )
+{
+  updateValue< std::vector< double > >( d, "rates", rates_ );
+  updateValue< std::vector< long > >( d, "pattern_lengths", pattern_lengths_ );
+  updateValue< std::vector< long > >( d, "onsets", onsets_ );
+  updateValue< std::vector< long > >( d, "onset_patterns", onset_patterns_ );
+  updateValue< double >( d, "dt", dt_ );
+
+  std::string combine = nonlinear_ ? "nonlinear" : "linear";
+  updateValue< std::string >( d, "combine", combine );
+  if ( combine != "linear" && combine != "nonlinear" )
+  {
+    throw BadProperty( "combine must be 'linear' or 'nonlinear'." );
+  }
+  nonlinear_ = combine == "nonlinear";
+
+  updateValue< double >( d, "rate_low", rate_low_ );
+  updateValue< double >( d, "rate_high", rate_high_ );
+  updateValue< double >( d, "precision", precision_ );
+  updateValue< long >( d, "max_patterns", max_patterns_ );
+  updateValue< double >( d, "fill_noise_rate", fill_noise_rate_ );
+  updateValue< double >( d, "inbetween_noise_rate", inbetween_noise_rate_ );
+  updateValue< long >( d, "seed", seed_ );
+
+  if ( dt_ <= 0 )
+  {
+    throw BadProperty( "Pattern step dt must be strictly positive." );
+  }
+
+  if ( nonlinear_ && ( rate_high_ <= 0 || precision_ <= 0 ) )
+  {
+    throw BadProperty(
+      "rate_high and precision must be strictly positive for nonlinear "
+      "combination." );
+  }
+
+  if ( onsets_.size() != onset_patterns_.size() )
+  {
+    throw BadProperty( "onsets and onset_patterns need to have the same size." );
+  }
+
+  long total = 0;
+  for ( unsigned int i = 0; i < pattern_lengths_.size(); i++ )
+  {
+    if ( pattern_lengths_[ i ] < 0 )
+    {
+      throw BadProperty( "Pattern lengths must not be negative." );
+    }
+    total += pattern_lengths_[ i ];
+  }
+  if ( total != static_cast< long >( rates_.size() ) )
+  {
+    throw BadProperty( String::compose(
+      "rates must hold all pattern steps (%1), got %2.", total, rates_.size() ) );
+  }
+
+  for ( unsigned int i = 0; i < onsets_.size(); i++ )
+  {
+    if ( onset_patterns_[ i ] < 0
+      || onset_patterns_[ i ] >= static_cast< long >( pattern_lengths_.size() ) )
+    {
+      throw BadProperty( "onset_patterns must be indices of patterns." );
+    }
+    if ( i > 0 && onsets_[ i ] < onsets_[ i - 1 ] )
+    {
+      throw BadProperty( "onsets must be sorted." );
+    }
+  }
+}
+
+/* ----------------------------------------------------------------
+ * Default and copy constructor for node
+ * ---------------------------------------------------------------- */
+
+nest::pattern_poisson_generator::pattern_poisson_generator()
+  : DeviceNode()
+  , device_()
+  , P_()
+  , S_()
+{
+  V_.dt_steps_ = 1;
+}
+
+nest::pattern_poisson_generator::pattern_poisson_generator(
+  const pattern_poisson_generator& n )
+  : DeviceNode( n )
+  , device_( n.device_ )
+  , P_( n.P_ )
+  , S_( n.S_ )
+{
+  V_.dt_steps_ = n.V_.dt_steps_;
+}
+
+/* ----------------------------------------------------------------
+ * Node initialization functions
+ * ---------------------------------------------------------------- */
+
+void
+nest::pattern_poisson_generator::init_state_( const Node& proto )
+{
+  const pattern_poisson_generator& pr =
+    downcast< pattern_poisson_generator >( proto );
+
+  device_.init_state( pr.device_ );
+  S_ = State_();
+}
+
+void
+nest::pattern_poisson_generator::init_buffers_()
+{
+  device_.init_buffers();
+}
+
+void
+nest::pattern_poisson_generator::calibrate()
+{
+  device_.calibrate();
+
+  const Time dt = Time::ms( P_.dt_ );
+  if ( not dt.is_grid_time() )
+  {
+    throw KernelException(
+      "pattern_poisson_generator: dt must be a multiple of the resolution." );
+  }
+  V_.dt_steps_ = dt.get_steps();
+
+  V_.pattern_start_.resize( P_.pattern_lengths_.size() );
+  unsigned long start = 0;
+  for ( unsigned int i = 0; i < P_.pattern_lengths_.size(); i++ )
+  {
+    V_.pattern_start_[ i ] = start;
+    start += P_.pattern_lengths_[ i ];
+  }
+
+  // calibrate is called at each Simulate call, the stream continues
+  // unless the schedule was set or reset
+  if ( S_.reseed_ || not V_.rng_.valid() )
+  {
+    V_.rng_ = librandom::RandomGen::create_knuthlfg_rng( P_.seed_ );
+    S_.reseed_ = false;
+  }
+}
+
+unsigned long
+nest::pattern_poisson_generator::draw_( long step )
+{
+  // patterns starting up to this step become active
+  while ( S_.next_onset_ < P_.onsets_.size()
+    && P_.onsets_[ S_.next_onset_ ] <= step )
+  {
+    S_.active_.push_back( S_.next_onset_ );
+    ++S_.next_onset_;
+  }
+
+  double rate = 0.0;
+  long n_active = 0;
+  std::vector< unsigned long >::iterator it = S_.active_.begin();
+  while ( it != S_.active_.end() )
+  {
+    const long pattern = P_.onset_patterns_[ *it ];
+    const long k = step - P_.onsets_[ *it ];
+    if ( k >= P_.pattern_lengths_[ pattern ] )
+    {
+      // pattern is over
+      it = S_.active_.erase( it );
+      continue;
+    }
+    rate += P_.rates_[ V_.pattern_start_[ pattern ] + k ];
+    ++n_active;
+    ++it;
+  }
+
+  if ( P_.nonlinear_ )
+  {
+    const double offset = P_.rate_low_ + P_.rate_high_ / 2.;
+    const double width = P_.rate_high_ / 2. / P_.precision_;
+    rate = P_.rate_low_
+      + P_.rate_high_ / ( 1. + std::exp( -( rate - offset ) / width ) );
+  }
+
+  if ( P_.fill_noise_rate_ > 0. && n_active < P_.max_patterns_ )
+  {
+    rate += V_.rng_->drand() * P_.fill_noise_rate_
+      * ( P_.max_patterns_ - n_active );
+  }
+  if ( n_active == 0 )
+  {
+    rate += P_.inbetween_noise_rate_;
+  }
+
+  return V_.rng_->drand() < rate * P_.dt_ * 1e-3 ? 1 : 0;
+}
+
+/* ----------------------------------------------------------------
+ * Update function
+ * ---------------------------------------------------------------- */
+
+void
+nest::pattern_poisson_generator::update( Time const& T,
+  const long from,
+  const long to )
+{
+  assert(
+    to >= 0 && ( delay ) from < kernel().connection_manager.get_min_delay() );
+  assert( from < to );
+
+  const long origin = device_.get_origin().get_steps();
+
+  for ( long lag = from; lag < to; ++lag )
+  {
+    // pattern step k starts at origin + k * dt, its spikes have this stamp
+    const long stamp = T.get_steps() + lag + 1;
+    const long rel = stamp - origin;
+    if ( rel < V_.dt_steps_ || rel % V_.dt_steps_ != 0 )
+    {
+      continue;
+    }
+    const long step = rel / V_.dt_steps_;
+
+    unsigned long n_spikes = 0;
+    if ( step == 1 )
+    {
+      // spikes of the first step can not be sent at origin
+      n_spikes += draw_( 0 );
+    }
+    n_spikes += draw_( step );
+
+    if ( n_spikes > 0 && device_.is_active( Time::step( stamp ) ) )
+    {
+      SpikeEvent se;
+      se.set_multiplicity( n_spikes );
+      kernel().event_delivery_manager.send( *this, se, lag );
+    }
+  }
+}
+
+} // namespace nest
@@ -0,0 +1,223 @@
+/*
+ *  pattern_poisson_generator.h
+ */
+
+#ifndef PATTERN_POISSON_GENERATOR_H
+#define PATTERN_POISSON_GENERATOR_H
+
+// C++ includes:
+#include <string>
+#include <vector>
+
+// Includes from librandom:
+#include "randomgen.h"
+
+// Includes from nestkernel:
+#include "connection.h"
+#include "device_node.h"
+#include "event.h"
+#include "nest_types.h"
+#include "stimulating_device.h"
+
+namespace nest
+{
+
+/* BeginDocumentation
+   Name: pattern_poisson_generator - draws spikes of one input channel from
+      pattern rates and a pattern schedule during the simulation.
+
+  Description:
+
+  Generates the input of eim.spike_train.TTrain on the fly: the rate of the
+  channel in each pattern step is the sum of the rates of all patterns
+  active in that step (rates of the channel in each pattern template, onsets
+  of the patterns in the schedule), optionally combined by a sigmoid
+  (combine = "nonlinear"):
+
+      rate = rate_low + rate_high * sigmoid(rate, rate_low + rate_high / 2,
+                                            rate_high / 2 / precision)
+
+  On top of it noise is added:
+      fill noise      - uniform in [0, fill_noise_rate] times the number of
+                        missing patterns (max_patterns - active patterns),
+                        drawn in each step
+      inbetween noise - inbetween_noise_rate when no pattern is active
+
+  A spike is emitted in a pattern step with probability rate * dt, at the
+  beginning of the step (spikes of the first step at the end of it, as
+  spike_generator can not spike at origin). Each generator draws from its
+  own random generator seeded by seed, so spikes do not depend on the
+  number of threads. Setting the schedule or origin restarts the schedule.
+
+  Parameters:
+
+  The following parameters can be set in the status dictionary.
+
+  rates                 double vector - Rates (Hz) of the channel in each
+                                        pattern step of all patterns,
+                                        concatenated.
+  pattern_lengths       int vector    - Number of steps of each pattern.
+  onsets                int vector    - Onset steps of patterns, sorted.
+  onset_patterns        int vector    - Index of pattern of each onset.
+  dt                    double        - Pattern step in ms, multiple of
+                                        the resolution.
+  combine               string        - "linear" or "nonlinear".
+  rate_low              double        - Low rate of nonlinear combination.
+  rate_high             double        - High rate of nonlinear combination.
+  precision             double        - Precision of nonlinear combination.
+  max_patterns          int           - Number of patterns filled by noise.
+  fill_noise_rate       double        - Max fill noise rate per missing
+                                        pattern in Hz.
+  inbetween_noise_rate  double        - Noise rate without patterns in Hz.
+  seed                  int           - Seed of the random generator.
+
+
+  Sends: SpikeEvent
+
+  SeeAlso: poisson_generator, spike_generator
+*/
+
+/**
+ * Poisson generator following pattern rates of a pattern schedule.
+ */
+class pattern_poisson_generator : public DeviceNode
+{
+
+public:
+  pattern_poisson_generator();
+  pattern_poisson_generator( const pattern_poisson_generator& );
+
+  port send_test_event( Node&, rport, synindex, bool );
+
+  void get_status( DictionaryDatum& ) const;
+  void set_status( const DictionaryDatum& );
+
+private:
+  void init_state_( const Node& proto );
+  void init_buffers_();
+  void calibrate();
+
+  void update( Time const&, const long, const long );
+
+  //! Returns number of spikes (0 or 1) in pattern step, steps must increase
+  unsigned long draw_( long step );
+
+  // ----------------------------------------------------------------
+
+  /**
+   * Independent parameters of the model.
+   */
+  struct Parameters_
+  {
+    std::vector< double > rates_;
+    std::vector< long > pattern_lengths_;
+    std::vector< long > onsets_;
+    std::vector< long > onset_patterns_;
+
+    /** Pattern step in ms. */
+    double dt_;
+
+    /** Combine rates nonlinearly (sigmoid)? */
+    bool nonlinear_;
+    double rate_low_;
+    double rate_high_;
+    double precision_;
+
+    long max_patterns_;
+    double fill_noise_rate_;
+    double inbetween_noise_rate_;
+
+    long seed_;
+
+    Parameters_(); //!< Sets default parameter values
+
+    void get( DictionaryDatum& ) const; //!< Store current values in dictionary
+    void set( const DictionaryDatum& ); //!< Set values from dictionary
+  };
+
+  // ----------------------------------------------------------------
+
+  /**
+   * State variables of the model, kept across Simulate calls.
+   */
+  struct State_
+  {
+    //! Index of the next onset to become active
+    unsigned long next_onset_;
+
+    //! Onsets (indices) of active patterns
+    std::vector< unsigned long > active_;
+
+    //! Random generator has to be seeded again
+    bool reseed_;
+
+    State_(); //!< Default initialization
+  };
+
+  // ----------------------------------------------------------------
+
+  /**
+   * Internal variables of the model.
+   */
+  struct Variables_
+  {
+    //! Pattern step in simulation steps
+    long dt_steps_;
+
+    //! Index of the first rate of each pattern in rates
+    std::vector< unsigned long > pattern_start_;
+
+    //! Random generator of this channel
+    librandom::RngPtr rng_;
+  };
+
+  // ----------------------------------------------------------------
+
+  StimulatingDevice< SpikeEvent > device_;
+
+  Parameters_ P_;
+  State_ S_;
+  Variables_ V_;
+};
+
+inline port
+pattern_poisson_generator::send_test_event( Node& target,
+  rport receptor_type,
+  synindex syn_id,
+  bool )
+{
+  device_.enforce_single_syn_type( syn_id );
+
+  SpikeEvent e;
+  e.set_sender( *this );
+  return target.handles_test_event( e, receptor_type );
+}
+
+inline void
+pattern_poisson_generator::get_status( DictionaryDatum& d ) const
+{
+  P_.get( d );
+  device_.get_status( d );
+}
+
+inline void
+pattern_poisson_generator::set_status( const DictionaryDatum& d )
+{
+  Parameters_ ptmp = P_; // temporary copy in case of errors
+  ptmp.set( d );         // throws if BadProperty
+
+  // We now know that ptmp is consistent. We do not write it back
+  // to P_ before we are also sure that the properties to be set
+  // in the parent class are internally consistent.
+  device_.set_status( d );
+
+  // if we get here, temporaries contain consistent set of properties
+  P_ = ptmp;
+
+  // new schedule (or origin) starts from the beginning
+  S_ = State_();
+}
+
+} // namespace
+
+#endif /* #ifndef PATTERN_POISSON_GENERATOR_H */
@@ -0,0 +1,282 @@
+/*
+ *  spike_file_generator.cpp
+ *
+ *  spike_file_generator: spike generator streaming spike times of one
+ *  channel of a binary spike file.
+ */
+
+#include "spike_file_generator.h"
+
+// C++ includes:
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <cstring>
+
+// Includes from libnestutil:
+#include "compose.hpp"
+
+// Includes from nestkernel:
+#include "event_delivery_manager_impl.h"
+#include "exceptions.h"
+#include "kernel_manager.h"
+
+// Includes from sli:
+#include "dict.h"
+#include "dictutils.h"
+#include "integerdatum.h"
+#include "stringdatum.h"
+
+namespace nest
+{
+
+// magic number at the beginning of spike files
+static const char SPIKE_FILE_MAGIC[ 8 ] = { 'E', 'I', 'M', 'S', 'P', 'K', '0', '1' };
+
+/* ----------------------------------------------------------------
+ * Default constructors defining default parameter
+ * ---------------------------------------------------------------- */
+
+nest::spike_file_generator::Parameters_::Parameters_()
+  : filename_( "" )
+  , channel_( 0 )
+  , block_size_( 4096 )
+{
+}
+
+nest::spike_file_generator::State_::State_()
+  : position_( 0 )
+{
+}
+
+nest::spike_file_generator::Buffers_::Buffers_()
+  : file_()
+  , block_()
+  , block_start_( 0 )
+{
+}
+
+/* ----------------------------------------------------------------
+ * Parameter extraction and manipulation functions
+ * ---------------------------------------------------------------- */
+
+void
+nest::spike_file_generator::Parameters_::get( DictionaryDatum& d ) const
+{
+  def< std::string >( d, "filename", filename_ );
+  def< long >( d, "channel", channel_ );
+  def< long >( d, "block_size", block_size_ );
+}
+
+bool
+nest::spike_file_generator::Parameters_::set( const DictionaryDatum& d )
+{
+  updateValue< std::string >( d, "filename", filename_ );
+  updateValue< long >( d, "channel", channel_ );
+  updateValue< long >( d, "block_size", block_size_ );
+
+  if ( channel_ < 0 )
+  {
+    throw BadProperty( "Channel must not be negative." );
+  }
+
+  if ( block_size_ < 1 )
+  {
+    throw BadProperty( "Block size must be at least 1." );
+  }
+
+  return d->known( "filename" ) || d->known( "channel" );
+}
+
+/* ----------------------------------------------------------------
+ * Default and copy constructor for node
+ * ---------------------------------------------------------------- */
+
+nest::spike_file_generator::spike_file_generator()
+  : DeviceNode()
+  , device_()
+  , P_()
+  , S_()
+  , B_()
+{
+  V_.first_ = 0;
+  V_.count_ = 0;
+  V_.data_offset_ = 0;
+  V_.h_ = 0.;
+}
+
+nest::spike_file_generator::spike_file_generator(
+  const spike_file_generator& n )
+  : DeviceNode( n )
+  , device_( n.device_ )
+  , P_( n.P_ )
+  , S_( n.S_ )
+  , B_()
+{
+  V_ = n.V_;
+}
+
+/* ----------------------------------------------------------------
+ * Node initialization functions
+ * ---------------------------------------------------------------- */
+
+void
+nest::spike_file_generator::init_state_( const Node& proto )
+{
+  const spike_file_generator& pr = downcast< spike_file_generator >( proto );
+
+  device_.init_state( pr.device_ );
+  S_.position_ = 0;
+}
+
+void
+nest::spike_file_generator::init_buffers_()
+{
+  device_.init_buffers();
+  B_.block_.clear();
+  B_.block_start_ = S_.position_;
+}
+
+void
+nest::spike_file_generator::calibrate()
+{
+  device_.calibrate();
+
+  V_.h_ = Time::get_resolution().get_ms();
+  V_.first_ = 0;
+  V_.count_ = 0;
+  if ( B_.file_.is_open() )
+  {
+    B_.file_.close();
+  }
+  if ( P_.filename_.empty() )
+  {
+    return;
+  }
+
+  // header and the two entries of indptr of the channel are read,
+  // spike times are read in blocks during update
+  B_.file_.open( P_.filename_.c_str(), std::ios::in | std::ios::binary );
+  char magic[ 8 ];
+  uint64_t header[ 2 ];
+  B_.file_.read( magic, sizeof( magic ) );
+  B_.file_.read( reinterpret_cast< char* >( header ), sizeof( header ) );
+  if ( not B_.file_ || std::memcmp( magic, SPIKE_FILE_MAGIC, 8 ) != 0 )
+  {
+    throw KernelException( String::compose(
+      "spike_file_generator: '%1' is not a spike file.", P_.filename_ ) );
+  }
+
+  const uint64_t n_channels = header[ 0 ];
+  if ( static_cast< uint64_t >( P_.channel_ ) >= n_channels )
+  {
+    throw KernelException(
+      String::compose( "spike_file_generator: channel %1 not in '%2' (%3 "
+                       "channels).",
+        P_.channel_,
+        P_.filename_,
+        n_channels ) );
+  }
+
+  uint64_t range[ 2 ];
+  B_.file_.seekg( sizeof( magic ) + sizeof( header )
+    + P_.channel_ * sizeof( uint64_t ) );
+  B_.file_.read( reinterpret_cast< char* >( range ), sizeof( range ) );
+  if ( not B_.file_ )
+  {
+    throw KernelException( String::compose(
+      "spike_file_generator: could not read '%1'.", P_.filename_ ) );
+  }
+  V_.first_ = range[ 0 ];
+  V_.count_ = range[ 1 ] - range[ 0 ];
+  V_.data_offset_ =
+    sizeof( magic ) + sizeof( header ) + ( n_channels + 1 ) * sizeof( uint64_t );
+
+  B_.block_.clear();
+  B_.block_start_ = S_.position_;
+}
+
+void
+nest::spike_file_generator::load_block_()
+{
+  const unsigned long n = std::min(
+    static_cast< unsigned long >( P_.block_size_ ), V_.count_ - S_.position_ );
+  std::vector< double > times( n );
+
+  B_.file_.seekg(
+    V_.data_offset_ + ( V_.first_ + S_.position_ ) * sizeof( double ) );
+  B_.file_.read( reinterpret_cast< char* >( &times[ 0 ] ), n * sizeof( double ) );
+  if ( not B_.file_ )
+  {
+    throw KernelException( String::compose(
+      "spike_file_generator: could not read '%1'.", P_.filename_ ) );
+  }
+
+  // times are converted to steps once per block
+  B_.block_.resize( n );
+  for ( unsigned long i = 0; i < n; i++ )
+  {
+    B_.block_[ i ] = static_cast< long >( std::floor( times[ i ] / V_.h_ + 0.5 ) );
+  }
+  B_.block_start_ = S_.position_;
+}
+
+/* ----------------------------------------------------------------
+ * Update function
+ * ---------------------------------------------------------------- */
+
+void
+nest::spike_file_generator::update( Time const& T,
+  const long from,
+  const long to )
+{
+  assert(
+    to >= 0 && ( delay ) from < kernel().connection_manager.get_min_delay() );
+  assert( from < to );
+
+  const long t_start = T.get_steps() + from;
+  const long t_stop = T.get_steps() + to;
+  const long origin = device_.get_origin().get_steps();
+
+  while ( S_.position_ < V_.count_ )
+  {
+    if ( S_.position_ - B_.block_start_ >= B_.block_.size() )
+    {
+      load_block_();
+    }
+    const long stamp = origin + B_.block_[ S_.position_ - B_.block_start_ ];
+
+    if ( stamp > t_stop )
+    {
+      break;
+    }
+
+    // spikes at the same step are sent as one event
+    unsigned long multiplicity = 1;
+    ++S_.position_;
+    while ( S_.position_ < V_.count_ )
+    {
+      if ( S_.position_ - B_.block_start_ >= B_.block_.size() )
+      {
+        load_block_();
+      }
+      if ( origin + B_.block_[ S_.position_ - B_.block_start_ ] != stamp )
+      {
+        break;
+      }
+      ++multiplicity;
+      ++S_.position_;
+    }
+
+    // spikes in the past (e.g. input with earlier origin) are skipped
+    if ( stamp > t_start && device_.is_active( Time::step( stamp ) ) )
+    {
+      SpikeEvent se;
+      se.set_multiplicity( multiplicity );
+      kernel().event_delivery_manager.send(
+        *this, se, stamp - T.get_steps() - 1 );
+    }
+  }
+}
+
+} // namespace nest
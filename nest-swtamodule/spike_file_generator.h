@@ -0,0 +1,225 @@
+/*
+ *  spike_file_generator.h
+ */
+
+#ifndef SPIKE_FILE_GENERATOR_H
+#define SPIKE_FILE_GENERATOR_H
+
+// C++ includes:
+#include <fstream>
+#include <string>
+#include <vector>
+
+// Includes from nestkernel:
+#include "connection.h"
+#include "device_node.h"
+#include "event.h"
+#include "nest_types.h"
+#include "stimulating_device.h"
+
+namespace nest
+{
+
+/* BeginDocumentation
+   Name: spike_file_generator - emits spike times of one channel of a spike
+      file, read block by block during the simulation.
+
+  Description:
+
+  Works as spike_generator, but spike times are not kept in the node. They
+  are read from a binary spike file in blocks of block_size spikes while the
+  simulation runs, so memory of the input does not grow with the length of
+  the input and one file can be shared by many generators and simulations.
+
+  Spike times are given in ms relative to origin and are rounded to the
+  simulation grid. Several spikes in the same time step are sent as one
+  event with multiplicity. Setting filename, channel or origin restarts the
+  generator at the first spike of its channel, spikes before the current
+  simulation time are skipped.
+
+  File format (little endian, written by eim.spike_file.writeSpikeFile):
+
+      char[8]  magic "EIMSPK01"
+      uint64   number of channels C
+      uint64   number of spikes S
+      uint64   indptr[C + 1]  spikes of channel c are times[indptr[c]] ...
+                              times[indptr[c + 1] - 1]
+      double   times[S]       spike times in ms, sorted within each channel
+
+  Parameters:
+
+  The following parameters can be set in the status dictionary.
+
+  filename    string - Spike file.
+  channel     int    - Channel of the file emitted by this generator.
+  block_size  int    - Number of spike times read from the file at once.
+
+  The following parameters can only be read.
+
+  n_spikes    int    - Number of spikes of the channel.
+  position    int    - Index of the next spike of the channel.
+
+
+  Sends: SpikeEvent
+
+  SeeAlso: spike_generator
+*/
+
+/**
+ * Spike generator streaming its spike times from a spike file.
+ */
+class spike_file_generator : public DeviceNode
+{
+
+public:
+  spike_file_generator();
+  spike_file_generator( const spike_file_generator& );
+
+  port send_test_event( Node&, rport, synindex, bool );
+
+  void get_status( DictionaryDatum& ) const;
+  void set_status( const DictionaryDatum& );
+
+private:
+  void init_state_( const Node& proto );
+  void init_buffers_();
+  void calibrate();
+
+  void update( Time const&, const long, const long );
+
+  //! Loads block of spikes starting at position of the generator
+  void load_block_();
+
+  // ----------------------------------------------------------------
+
+  /**
+   * Independent parameters of the model.
+   */
+  struct Parameters_
+  {
+    /** Spike file. */
+    std::string filename_;
+
+    /** Channel of the file emitted by this generator. */
+    long channel_;
+
+    /** Number of spike times read at once. */
+    long block_size_;
+
+    Parameters_(); //!< Sets default parameter values
+
+    void get( DictionaryDatum& ) const; //!< Store current values in dictionary
+
+    /**
+     * Set values from dictionary.
+     * @returns true if input (filename or channel) changed
+     */
+    bool set( const DictionaryDatum& );
+  };
+
+  // ----------------------------------------------------------------
+
+  /**
+   * State variables of the model.
+   */
+  struct State_
+  {
+    //! Index of the next spike within the channel, kept across Simulate calls
+    unsigned long position_;
+
+    State_(); //!< Default initialization
+  };
+
+  // ----------------------------------------------------------------
+
+  /**
+   * Buffers of the model.
+   */
+  struct Buffers_
+  {
+    std::ifstream file_;
+
+    //! Spike times of the current block in steps (relative to origin)
+    std::vector< long > block_;
+
+    //! Position of the first spike of the current block
+    unsigned long block_start_;
+
+    Buffers_();
+  };
+
+  // ----------------------------------------------------------------
+
+  /**
+   * Internal variables of the model.
+   */
+  struct Variables_
+  {
+    //! Index of the first spike of the channel in the file
+    unsigned long first_;
+
+    //! Number of spikes of the channel
+    unsigned long count_;
+
+    //! Offset of spike times in the file, in bytes
+    std::streamoff data_offset_;
+
+    //! Simulation resolution in ms
+    double h_;
+  };
+
+  // ----------------------------------------------------------------
+
+  StimulatingDevice< SpikeEvent > device_;
+
+  Parameters_ P_;
+  State_ S_;
+  Variables_ V_;
+  Buffers_ B_;
+};
+
+inline port
+spike_file_generator::send_test_event( Node& target,
+  rport receptor_type,
+  synindex syn_id,
+  bool )
+{
+  device_.enforce_single_syn_type( syn_id );
+
+  SpikeEvent e;
+  e.set_sender( *this );
+  return target.handles_test_event( e, receptor_type );
+}
+
+inline void
+spike_file_generator::get_status( DictionaryDatum& d ) const
+{
+  P_.get( d );
+  device_.get_status( d );
+  def< long >( d, "position", S_.position_ );
+  def< long >( d, "n_spikes", V_.count_ );
+}
+
+inline void
+spike_file_generator::set_status( const DictionaryDatum& d )
+{
+  Parameters_ ptmp = P_; // temporary copy in case of errors
+  const bool changed = ptmp.set( d ); // throws if BadProperty
+
+  // We now know that ptmp is consistent. We do not write it back
+  // to P_ before we are also sure that the properties to be set
+  // in the parent class are internally consistent.
+  device_.set_status( d );
+
+  // if we get here, temporaries contain consistent set of properties
+  P_ = ptmp;
+  if ( changed || d->known( names::origin ) )
+  {
+    // new input starts at the first spike of the channel
+    S_.position_ = 0;
+  }
+}
+
+} // namespace
+
+#endif /* #ifndef SPIKE_FILE_GENERATOR_H */
@@ -43,6 +43,8 @@
    nu_minus        double - Set weight dependency of depressing update
    tau_plus        double - Time constant of STDP window, potentiation in ms
    A               double - Set negative offset for both updates
+   Kplus           double - Pre-synaptic trace (set to 0 to forget spikes of
+                            a previous simulation)
 
    (tau_minus is defined in the post-synaptic neuron.)
 
@@ -360,6 +362,7 @@ STDPConnectionSem< targetidentifierT >::get_status( DictionaryDatum& d ) const
   def< double >( d, "tau_plus", tau_plus_ );
   def< bool >( d, "scale_with_Wmax", scale_with_Wmax_ );
   def< double >( d, "learning_is_active", learning_is_active_ );
+  def< double >( d, names::Kplus, Kplus_ );
   def< long >( d, names::size_of, sizeof( *this ) );
 }
 
@@ -379,6 +382,7 @@ STDPConnectionSem< targetidentifierT >::set_status( const DictionaryDatum& d,
   updateValue< double >( d, "tau_plus", tau_plus_ );
   updateValue< bool >( d, "scale_with_Wmax", scale_with_Wmax_ );
   updateValue< double >( d, "learning_is_active", learning_is_active_ );
+  updateValue< double >( d, names::Kplus, Kplus_ );
 
   // check if weight_ and Wmax_ has the same sign
   if ( not( ( ( weight_ >= 0 ) - ( weight_ < 0 ) )
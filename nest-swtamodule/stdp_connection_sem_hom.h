@@ -0,0 +1,568 @@
+/*
+ *  stdp_connection_sem_hom.h
+ */
+
+#ifndef STDP_CONNECTION_SEM_HOM_H
+#define STDP_CONNECTION_SEM_HOM_H
+
+/* BeginDocumentation
+  Name: sem_synapse_hom - sem_synapse with homogeneous parameters and
+   precomputed STDP factors.
+
+  Description:
+   sem_synapse_hom implements the same update equations as sem_synapse,
+   but all plasticity parameters are common to all synapses of the model
+   (as in stdp_synapse_hom) and can only be set with SetDefaults or
+   CopyModel. This allows to precompute what sem_synapse evaluates for
+   every post-synaptic history entry on every pre-synaptic spike:
+
+   - Spike times and delays are on the simulation grid, so the decay
+     exp(-n * h / tau_+) of the pre-synaptic trace is taken from a table
+     indexed by the number of steps n (computed with std::exp, beyond the
+     table std::exp is called directly).
+   - K_+(w) and K_-(w) are skipped if nu_+ or nu_- is 0, otherwise they
+     are evaluated with fast_exp (see fast_math.h).
+   - The post-synaptic trace K_- at the arrival time of a pre-synaptic spike
+     is cached per target neuron. All synapses onto a neuron whose spikes
+     arrive at the same step (spikes of the same step with equal delays, or
+     later spikes with shorter delays) read the trace from the neuron's
+     history only once. The cache keeps KMINUS_CACHE_SLOTS steps of each
+     target, enough for delays of up to KMINUS_CACHE_SLOTS steps. Entries
+     are dropped when the target spikes (its history may be pruned) or is
+     reset (ResetNetwork clears its history), so cached values equal those
+     read from the history.
+
+   If learning_is_active is 0, only the post-synaptic history is read (to
+   keep the access counters of its archive consistent) and the trace is
+   advanced, facilitation and depression are skipped entirely.
+
+   Weight trajectories equal those of sem_synapse up to the relative error
+   of fast_exp (< 4e-14 per update), benchmarks/validate_sem_hom.py compares
+   them.
+
+   The cache is part of the common properties, which NEST keeps per thread,
+   and is indexed by the thread local id of the target.
+
+  Parameters:
+   Common properties (SetDefaults only):
+   lambda          double - Step size
+   Wmax            double - Maximum allowed weight (must have the same sign
+                            as weights)
+   scale_with_Wmax  bool  - see sem_synapse
+   alpha           double - Determine shape of depression term
+   nu_plus         double - Set weight dependency of facilitating update
+   nu_minus        double - Set weight dependency of depressing update
+   tau_plus        double - Time constant of STDP window, potentiation in ms
+   A               double - Set negative offset for both updates
+
+   Individual properties:
+   learning_is_active double - If 0, weight is frozen
+   Kplus           double - Pre-synaptic trace
+
+   (tau_minus is defined in the post-synaptic neuron.)
+
+  Transmits: SpikeEvent
+
+  SeeAlso: sem_synapse, stdp_synapse_hom
+*/
+
+// C++ includes:
+#include <cmath>
+#include <limits>
+#include <vector>
+
+// Includes from nestkernel:
+#include "archiving_node.h"
+#include "common_synapse_properties.h"
+#include "connection.h"
+#include "connector_model.h"
+#include "event.h"
+
+// Includes from sli:
+#include "dictdatum.h"
+#include "dictutils.h"
+
+#include "fast_math.h"
+
+
+namespace swtamodule_ns
+{
+
+using namespace nest;
+
+//! Steps of K_- cached per target neuron, power of 2
+const long KMINUS_CACHE_SLOTS = 16;
+
+/**
+ * Class containing the common properties for all synapses of type
+ * sem_synapse_hom, and the factors precomputed from them.
+ */
+class STDPSemHomCommonProperties : public CommonSynapseProperties
+{
+
+public:
+  /**
+   * Default constructor.
+   * Sets all property values to defaults.
+   */
+  STDPSemHomCommonProperties();
+
+  /**
+   * Get all properties and put them into a dictionary.
+   */
+  void get_status( DictionaryDatum& d ) const;
+
+  /**
+   * Set properties from the values given in dictionary.
+   */
+  void set_status( const DictionaryDatum& d, ConnectorModel& cm );
+
+  /**
+   * Recompute tables after the resolution changed.
+   */
+  void calibrate( const TimeConverter& );
+
+  /**
+   * Decay of the pre-synaptic trace over n simulation steps.
+   */
+  double
+  decay_plus( long n ) const
+  {
+    if ( n < static_cast< long >( decay_plus_.size() ) )
+    {
+      return decay_plus_[ n ];
+    }
+    return std::exp( -n * h_ / tau_plus_ );
+  }
+
+  /**
+   * Number of simulation steps in the time interval dt (in ms).
+   */
+  long
+  steps( double dt ) const
+  {
+    return Time( Time::ms( dt ) ).get_steps();
+  }
+
+  /**
+   * Trace K_- of the post-synaptic neuron target at time t (in ms, at the
+   * given simulation step), cached per target and step.
+   */
+  double get_K_value( Node* target, long step, double t ) const;
+
+  double facilitate( double w, double kplus ) const;
+  double depress( double w, double kminus ) const;
+
+  // data members common to all connections
+  double Wmax_;
+  double lambda_;
+  double alpha_;
+  double nu_plus_;
+  double nu_minus_;
+  double A_;
+  double tau_plus_;
+  bool scale_with_Wmax_;
+
+private:
+  void compute_tables_();
+
+  //! simulation time step in ms the tables were computed for
+  double h_;
+
+  //! exp(-n * h / tau_plus) for n steps
+  std::vector< double > decay_plus_;
+
+  struct KminusCacheEntry
+  {
+    long step;
+    //! last spike of the target when K was read
+    double t_lastspike;
+    double K;
+
+    KminusCacheEntry()
+      : step( std::numeric_limits< long >::min() )
+      , t_lastspike( 0.0 )
+      , K( 0.0 )
+    {
+    }
+  };
+
+  //! K_- by thread local id of the target and step modulo
+  //! KMINUS_CACHE_SLOTS, filled while spikes are delivered
+  mutable std::vector< KminusCacheEntry > kminus_cache_;
+};
+
+inline double
+STDPSemHomCommonProperties::get_K_value( Node* target,
+  long step,
+  double t ) const
+{
+  const size_t offset = target->get_thread_lid() * KMINUS_CACHE_SLOTS;
+  if ( offset >= kminus_cache_.size() )
+  {
+    kminus_cache_.resize( offset + KMINUS_CACHE_SLOTS );
+  }
+
+  // targets of STDP connections are archiving nodes, check_connection
+  // fails for others
+  const double t_lastspike =
+    static_cast< Archiving_Node* >( target )->get_spiketime_ms();
+
+  KminusCacheEntry& entry =
+    kminus_cache_[ offset + ( step & ( KMINUS_CACHE_SLOTS - 1 ) ) ];
+  if ( entry.step != step || entry.t_lastspike != t_lastspike )
+  {
+    entry.step = step;
+    entry.t_lastspike = t_lastspike;
+    entry.K = target->get_K_value( t );
+  }
+  return entry.K;
+}
+
+inline double
+STDPSemHomCommonProperties::facilitate( double w, double kplus ) const
+{
+  if ( scale_with_Wmax_ )
+  {
+    w = w / Wmax_;
+  }
+
+  const double K_w = nu_plus_ == 0.0 ? 1.0 : fast_exp( nu_plus_ * w );
+
+  double dW = lambda_ * ( K_w * kplus - A_ );
+  double new_w = w + dW;
+
+  if ( scale_with_Wmax_ )
+  {
+    // new_w is normalized
+    return new_w < 1.0 ? new_w * Wmax_ : Wmax_;
+  }
+  else
+  {
+    // new_w is the absolute proposed value
+    return new_w < Wmax_ ? new_w : Wmax_;
+  }
+}
+
+inline double
+STDPSemHomCommonProperties::depress( double w, double kminus ) const
+{
+  if ( scale_with_Wmax_ )
+  {
+    w = w / Wmax_;
+  }
+
+  const double K_w = nu_minus_ == 0.0 ? 1.0 : fast_exp( nu_minus_ * w );
+
+  double dW = lambda_ * ( -alpha_ * K_w * kminus - A_ );
+  double new_w = w + dW;
+
+  if ( scale_with_Wmax_ )
+  {
+    // new_w is normalized
+    return new_w > 0.0 ? new_w * Wmax_ : 0.0;
+  }
+  else
+  {
+    // new_w is the absolute proposed value
+    return new_w > 0.0 ? new_w : 0.0;
+  }
+}
+
+inline STDPSemHomCommonProperties::STDPSemHomCommonProperties()
+  : CommonSynapseProperties()
+  , Wmax_( 100.0 )
+  , lambda_( 0.01 )
+  , alpha_( 1.0 )
+  , nu_plus_( 0.0 )
+  , nu_minus_( 0.0 )
+  , A_( 0.0 )
+  , tau_plus_( 20.0 )
+  , scale_with_Wmax_( 0.0 )
+  , h_( 0.0 )
+{
+  compute_tables_();
+}
+
+inline void
+STDPSemHomCommonProperties::get_status( DictionaryDatum& d ) const
+{
+  CommonSynapseProperties::get_status( d );
+
+  def< double >( d, "Wmax", Wmax_ );
+  def< double >( d, "lambda", lambda_ );
+  def< double >( d, "alpha", alpha_ );
+  def< double >( d, "nu_plus", nu_plus_ );
+  def< double >( d, "nu_minus", nu_minus_ );
+  def< double >( d, "A", A_ );
+  def< double >( d, "tau_plus", tau_plus_ );
+  def< bool >( d, "scale_with_Wmax", scale_with_Wmax_ );
+}
+
+inline void
+STDPSemHomCommonProperties::set_status( const DictionaryDatum& d,
+  ConnectorModel& cm )
+{
+  CommonSynapseProperties::set_status( d, cm );
+
+  updateValue< double >( d, "Wmax", Wmax_ );
+  updateValue< double >( d, "lambda", lambda_ );
+  updateValue< double >( d, "alpha", alpha_ );
+  updateValue< double >( d, "nu_plus", nu_plus_ );
+  updateValue< double >( d, "nu_minus", nu_minus_ );
+  updateValue< double >( d, "A", A_ );
+  updateValue< double >( d, "tau_plus", tau_plus_ );
+  updateValue< bool >( d, "scale_with_Wmax", scale_with_Wmax_ );
+
+  if ( tau_plus_ <= 0 )
+  {
+    throw BadProperty( "tau_plus must be strictly positive." );
+  }
+
+  compute_tables_();
+}
+
+inline void
+STDPSemHomCommonProperties::calibrate( const TimeConverter& )
+{
+  compute_tables_();
+}
+
+inline void
+STDPSemHomCommonProperties::compute_tables_()
+{
+  h_ = Time::get_resolution().get_ms();
+
+  // table covers 20 time constants, the trace is below 2e-9 afterwards
+  const long n_steps = static_cast< long >( std::ceil( 20.0 * tau_plus_ / h_ ) ) + 1;
+  decay_plus_.resize( n_steps );
+  for ( long n = 0; n < n_steps; ++n )
+  {
+    decay_plus_[ n ] = std::exp( -n * h_ / tau_plus_ );
+  }
+
+  // cached steps refer to the old resolution
+  kminus_cache_.clear();
+}
+
+
+// connections are templates of target identifier type (used for pointer /
+// target index addressing) derived from generic connection template
+template < typename targetidentifierT >
+class STDPConnectionSemHom : public Connection< targetidentifierT >
+{
+
+public:
+  typedef STDPSemHomCommonProperties CommonPropertiesType;
+  typedef Connection< targetidentifierT > ConnectionBase;
+
+  /**
+   * Default Constructor.
+   * Sets default values for all parameters. Needed by GenericConnectorModel.
+   */
+  STDPConnectionSemHom();
+
+  /**
+   * Copy constructor.
+   * Needs to be defined properly in order for GenericConnector to work.
+   */
+  STDPConnectionSemHom( const STDPConnectionSemHom& );
+
+  // Explicitly declare all methods inherited from the dependent base
+  // ConnectionBase. This avoids explicit name prefixes in all places these
+  // functions are used. Since ConnectionBase depends on the template parameter,
+  // they are not automatically found in the base class.
+  using ConnectionBase::get_delay_steps;
+  using ConnectionBase::get_delay;
+  using ConnectionBase::get_rport;
+  using ConnectionBase::get_target;
+
+  /**
+   * Get all properties of this connection and put them into a dictionary.
+   */
+  void get_status( DictionaryDatum& d ) const;
+
+  /**
+   * Set properties of this connection from the values given in dictionary.
+   */
+  void set_status( const DictionaryDatum& d, ConnectorModel& cm );
+
+  /**
+   * Send an event to the receiver of this connection.
+   * \param e The event to send
+   * \param t_lastspike Point in time of last spike sent.
+   * \param cp common properties of all synapses, with precomputed factors.
+   */
+  void send( Event& e,
+    thread t,
+    double t_lastspike,
+    const STDPSemHomCommonProperties& cp );
+
+
+  class ConnTestDummyNode : public ConnTestDummyNodeBase
+  {
+  public:
+    // Ensure proper overriding of overloaded virtual functions.
+    // Return values from functions are ignored.
+    using ConnTestDummyNodeBase::handles_test_event;
+    port
+    handles_test_event( SpikeEvent&, rport )
+    {
+      return invalid_port_;
+    }
+  };
+
+  void
+  check_connection( Node& s,
+    Node& t,
+    rport receptor_type,
+    double t_lastspike,
+    const CommonPropertiesType& )
+  {
+    ConnTestDummyNode dummy_target;
+
+    ConnectionBase::check_connection_( dummy_target, s, t, receptor_type );
+
+    t.register_stdp_connection( t_lastspike - get_delay() );
+  }
+
+  /**
+   * Common properties cannot be set by Connect. SetDefaults and CopyModel
+   * set them through set_status of the default connection, which ignores
+   * them (individual synapses leave them unread, so SetStatus of a synapse
+   * fails).
+   */
+  void
+  check_synapse_params( const DictionaryDatum& syn_spec ) const
+  {
+    if ( syn_spec->known( "Wmax" ) || syn_spec->known( "lambda" )
+      || syn_spec->known( "alpha" ) || syn_spec->known( "nu_plus" )
+      || syn_spec->known( "nu_minus" ) || syn_spec->known( "A" )
+      || syn_spec->known( "tau_plus" ) || syn_spec->known( "scale_with_Wmax" ) )
+    {
+      throw NotImplemented(
+        "Connect doesn't support the setting of homogeneous parameters of "
+        "sem_synapse_hom, use SetDefaults or CopyModel." );
+    }
+  }
+
+  void
+  set_weight( double w )
+  {
+    weight_ = w;
+  }
+
+private:
+  // data members of each connection
+  double weight_;
+  double Kplus_;
+  double learning_is_active_;
+};
+
+
+/**
+ * Send an event to the receiver of this connection.
+ * \param e The event to send
+ * \param t The thread on which this connection is stored.
+ * \param t_lastspike Time point of last spike emitted
+ * \param cp Common properties object, containing the stdp parameters.
+ */
+template < typename targetidentifierT >
+inline void
+STDPConnectionSemHom< targetidentifierT >::send( Event& e,
+  thread t,
+  double t_lastspike,
+  const STDPSemHomCommonProperties& cp )
+{
+  double t_spike = e.get_stamp().get_ms();
+
+  // use accessor functions (inherited from Connection< >) to obtain delay and
+  // target
+  Node* target = get_target( t );
+  double dendritic_delay = get_delay();
+
+  // get spike history in relevant range (t1, t2] from post-synaptic neuron,
+  // this is done also for frozen weights as it increases the access counters
+  // of the history entries, see sem_synapse
+  std::deque< histentry >::iterator start;
+  std::deque< histentry >::iterator finish;
+  target->get_history(
+    t_lastspike - dendritic_delay, t_spike - dendritic_delay, &start, &finish );
+
+  if ( learning_is_active_ != 0.0 )
+  {
+    // facilitation due to post-synaptic spikes since last pre-synaptic spike
+    while ( start != finish )
+    {
+      const long minus_steps =
+        cp.steps( ( start->t_ + dendritic_delay ) - t_lastspike );
+      ++start;
+
+      if ( minus_steps == 0 )
+        continue;
+
+      weight_ = cp.facilitate( weight_, Kplus_ * cp.decay_plus( minus_steps ) );
+    }
+
+    // depression due to new pre-synaptic spike
+    weight_ = cp.depress( weight_,
+      cp.get_K_value( target,
+        e.get_stamp().get_steps() - get_delay_steps(),
+        t_spike - dendritic_delay ) );
+  }
+
+  e.set_receiver( *target );
+  e.set_weight( weight_ );
+  // use accessor functions (inherited from Connection< >) to obtain delay in
+  // steps and rport
+  e.set_delay( get_delay_steps() );
+  e.set_rport( get_rport() );
+  e();
+
+  Kplus_ = Kplus_ * cp.decay_plus( cp.steps( t_spike - t_lastspike ) ) + 1.0;
+}
+
+template < typename targetidentifierT >
+STDPConnectionSemHom< targetidentifierT >::STDPConnectionSemHom()
+  : ConnectionBase()
+  , weight_( 1.0 )
+  , Kplus_( 0.0 )
+  , learning_is_active_( 1.0 )
+{
+}
+
+template < typename targetidentifierT >
+STDPConnectionSemHom< targetidentifierT >::STDPConnectionSemHom(
+  const STDPConnectionSemHom< targetidentifierT >& rhs )
+  : ConnectionBase( rhs )
+  , weight_( rhs.weight_ )
+  , Kplus_( rhs.Kplus_ )
+  , learning_is_active_( rhs.learning_is_active_ )
+{
+}
+
+template < typename targetidentifierT >
+void
+STDPConnectionSemHom< targetidentifierT >::get_status( DictionaryDatum& d ) const
+{
+  ConnectionBase::get_status( d );
+  def< double >( d, names::weight, weight_ );
+  def< double >( d, names::Kplus, Kplus_ );
+  def< double >( d, "learning_is_active", learning_is_active_ );
+  def< long >( d, names::size_of, sizeof( *this ) );
+}
+
+template < typename targetidentifierT >
+void
+STDPConnectionSemHom< targetidentifierT >::set_status( const DictionaryDatum& d,
+  ConnectorModel& cm )
+{
+  ConnectionBase::set_status( d, cm );
+  updateValue< double >( d, names::weight, weight_ );
+  updateValue< double >( d, names::Kplus, Kplus_ );
+  updateValue< double >( d, "learning_is_active", learning_is_active_ );
+}
+
+} // of namespace swtamodule_ns
+
+#endif // of #ifndef STDP_CONNECTION_SEM_HOM_H
@@ -7,7 +7,10 @@
 
 #include "swta_neuron_dbl_exp.h"
 
+#include "fast_math.h"
+
 // C++ includes:
+#include <algorithm>
 #include <limits>
 #include <cmath>
 
@@ -70,6 +73,9 @@ nest::swta_neuron_dbl_exp::Parameters_::Parameters_()
   , t_ref_remaining_( 0.0 ) // ms
   , E_sfa_clip_( 0 ) // ms
   , E_sfa_max_( 0.0 )  // mV
+  , fast_rate_( false )
+  , thinning_( false )
+  , thinning_margin_( 0.0 ) // mV
 {
   tau_sfa_.clear();
   q_sfa_.clear();
@@ -82,6 +88,9 @@ nest::swta_neuron_dbl_exp::State_::State_()
   , u_rise_ (0.0)
   , u_fall_ (0.0)
   , r_(0)
+  , candidate_(-1)
+  , V_max_(0.0)
+  , p_max_(0.0)
   , initialized_(false)
 {
   q_elems_.clear();
@@ -111,6 +120,9 @@ nest::swta_neuron_dbl_exp::Parameters_::get( DictionaryDatum& d ) const
   def< double >( d, "I_scale", I_scale_ );
   def< bool >( d, "E_sfa_clip", E_sfa_clip_ );
   def< double >( d, "E_sfa_max", E_sfa_max_ );
+  def< bool >( d, "fast_rate", fast_rate_ );
+  def< bool >( d, "thinning", thinning_ );
+  def< double >( d, "thinning_margin", thinning_margin_ );
   def< double >( d, names::t_ref_remaining, t_ref_remaining_ );
 
   if ( multi_param_ )
@@ -156,6 +168,9 @@ nest::swta_neuron_dbl_exp::Parameters_::set( const DictionaryDatum& d )
   updateValue< double >( d, "I_scale", I_scale_ );
   updateValue< bool >( d, "E_sfa_clip", E_sfa_clip_ );
   updateValue< double >( d, "E_sfa_max", E_sfa_max_ );
+  updateValue< bool >( d, "fast_rate", fast_rate_ );
+  updateValue< bool >( d, "thinning", thinning_ );
+  updateValue< double >( d, "thinning_margin", thinning_margin_ );
   updateValue< double >( d, names::t_ref_remaining, t_ref_remaining_ );
 
   try
@@ -217,6 +232,18 @@ nest::swta_neuron_dbl_exp::Parameters_::set( const DictionaryDatum& d )
   {
     throw BadProperty( "c_3 must be positive." );
   }
+
+  if ( thinning_ && ( c_1_ < 0 || c_2_ < 0 ) )
+  {
+    throw BadProperty(
+      "Thinning needs a rate increasing with the membrane potential "
+      "(c_1 and c_2 must not be negative)." );
+  }
+
+  if ( thinning_margin_ < 0 )
+  {
+    throw BadProperty( "thinning_margin must not be negative." );
+  }
 }
 
 void
@@ -233,6 +260,8 @@ nest::swta_neuron_dbl_exp::State_::set( const DictionaryDatum& d, const Paramete
   updateValue< double >( d, names::E_sfa, q_ );
   // vectors of the state should be initialized with new parameter set.
   initialized_ = false;
+  // pending thinning candidate was drawn with old parameters
+  candidate_ = -1;
 }
 
 nest::swta_neuron_dbl_exp::Buffers_::Buffers_( swta_neuron_dbl_exp& n )
@@ -300,6 +329,11 @@ nest::swta_neuron_dbl_exp::calibrate()
   V_.u_rise_dt_ = std::exp(-V_.h_ / P_.tau_r_);
   V_.u_fall_dt_ = std::exp(-V_.h_ / P_.tau_f_);
 
+  // constants of the fast rate path
+  V_.h_sec_ = V_.h_ * 1e-3;
+  V_.c_2_c_4_ = P_.c_2_ * P_.c_4_;
+  V_.linear_rate_ = ( P_.c_2_ == 0.0 );
+
   if ( P_.dead_time_ != 0 && P_.dead_time_ < V_.h_ )
   {
     P_.dead_time_ = V_.h_;
@@ -429,67 +463,78 @@ nest::swta_neuron_dbl_exp::update( Time const& origin, const long from, const lo
       // rate of pp_psc_delta:
       //double rate = ( P_.c_1_ * V_eff + P_.c_2_ * std::exp( P_.c_3_ * V_eff ) );
 
-      // modified rate:
-      double rate = P_.c_1_ * V_eff + P_.c_2_ * (std::exp(P_.c_3_ * V_eff) - P_.c_4_);
+      unsigned long n_spikes = 0;
 
-      if ( rate > 0.0 )
+      if ( P_.thinning_ && P_.dead_time_ > 0.0 )
+      {
+        // rate is only evaluated at candidate steps
+        n_spikes = thinning_spike_( V_eff ) ? 1 : 0;
+      }
+      else
       {
-        unsigned long n_spikes = 0;
+        // modified rate:
+        const double rate = compute_rate_( V_eff );
 
-        if ( P_.dead_time_ > 0.0 )
+        if ( rate > 0.0 )
         {
-          // Draw random number and compare to prob to have a spike
-          if ( V_.rng_->drand() <= -numerics::expm1( -rate * V_.h_ * 1e-3 ) )  // continuous time
-          //if ( V_.rng_->drand() < rate * V_.h_ * 1e-3 )                      // simplified continuous time
-          //if ( V_.rng_->drand() < 1. / (1 + exp(- rate) * V_.h_ * 1e-3) )    // discrete time
+          if ( P_.dead_time_ > 0.0 )
           {
-            n_spikes = 1;
+            // probability to have a spike in this step
+            const double p_spike = compute_p_spike_( rate );
+
+            // Draw random number and compare to prob to have a spike
+            if ( V_.rng_->drand() <= p_spike )  // continuous time
+            //if ( V_.rng_->drand() < rate * V_.h_ * 1e-3 )                      // simplified continuous time
+            //if ( V_.rng_->drand() < 1. / (1 + exp(- rate) * V_.h_ * 1e-3) )    // discrete time
+            {
+              n_spikes = 1;
+            }
+          }
+          else
+          {
+            // Draw Poisson random number of spikes
+            V_.poisson_dev_.set_lambda( rate * V_.h_ * 1e-3 );
+            n_spikes = V_.poisson_dev_.ldev( V_.rng_ );
           }
         }
-        else
+      }
+
+      if ( n_spikes > 0 ) // Is there a spike? Then set the new dead time.
+      {
+        // Set dead time interval according to paramters
+        if ( P_.dead_time_random_ )
         {
-          // Draw Poisson random number of spikes
-          V_.poisson_dev_.set_lambda( rate * V_.h_ * 1e-3 );
-          n_spikes = V_.poisson_dev_.ldev( V_.rng_ );
+          S_.r_ = Time( Time::ms( V_.gamma_dev_( V_.rng_ ) / V_.dt_rate_ ) )
+                    .get_steps();
+        }
+        else{
+          S_.r_ = V_.DeadTimeCounts_ - 1;
         }
 
-        if ( n_spikes > 0 ) // Is there a spike? Then set the new dead time.
+        for ( unsigned int i = 0; i < S_.q_elems_.size(); i++ )
         {
-          // Set dead time interval according to paramters
-          if ( P_.dead_time_random_ )
-          {
-            S_.r_ = Time( Time::ms( V_.gamma_dev_( V_.rng_ ) / V_.dt_rate_ ) )
-                      .get_steps();
-          }
-          else{
-            S_.r_ = V_.DeadTimeCounts_ - 1;
-          }
-
-          for ( unsigned int i = 0; i < S_.q_elems_.size(); i++ )
-          {
-            S_.q_elems_[ i ] += P_.q_sfa_[ i ] * n_spikes;
-          }
+          S_.q_elems_[ i ] += P_.q_sfa_[ i ] * n_spikes;
+        }
 
 
-          // And send the spike event
-          SpikeEvent se;
-          se.set_multiplicity( n_spikes );
-          kernel().event_delivery_manager.send( *this, se, lag );
+        // And send the spike event
+        SpikeEvent se;
+        se.set_multiplicity( n_spikes );
+        kernel().event_delivery_manager.send( *this, se, lag );
 
-          // set spike time for STDP to work,
-          // see https://github.com/nest/nest-simulator/issues/77
-          for ( unsigned int i = 0; i < n_spikes; i++ )
-          {
-            set_spiketime( Time::step( origin.get_steps() + lag + 1 ) );
-          }
+        // set spike time for STDP to work,
+        // see https://github.com/nest/nest-simulator/issues/77
+        for ( unsigned int i = 0; i < n_spikes; i++ )
+        {
+          set_spiketime( Time::step( origin.get_steps() + lag + 1 ) );
+        }
 
-          // Reset the potential if applicable
-          if ( P_.with_reset_ )
-          {
-            S_.y3_ = P_.V_reset_;
-          }
+        // Reset the potential if applicable
+        if ( P_.with_reset_ )
+        {
+          S_.y3_ = P_.V_reset_;
         }
-      }   // if (rate > 0.0)
+      }
     }
     else // Neuron is within dead time
     {
@@ -504,6 +549,119 @@ nest::swta_neuron_dbl_exp::update( Time const& origin, const long from, const lo
   }
 }
 
+double
+nest::swta_neuron_dbl_exp::compute_fast_rate_( double V_eff ) const
+{
+  // linear transfer function (e.g. inhibitory neurons), no exp needed
+  if ( V_.linear_rate_ )
+  {
+    return P_.c_1_ * V_eff;
+  }
+
+  // exponential transfer function (e.g. excitatory neurons, c_1 = 0)
+  const double rate = P_.c_2_ * swtamodule_ns::fast_exp( P_.c_3_ * V_eff ) - V_.c_2_c_4_;
+  return P_.c_1_ == 0.0 ? rate : rate + P_.c_1_ * V_eff;
+}
+
+double
+nest::swta_neuron_dbl_exp::compute_rate_( double V_eff ) const
+{
+  if ( P_.fast_rate_ )
+  {
+    return compute_fast_rate_( V_eff );
+  }
+  return P_.c_1_ * V_eff + P_.c_2_ * (std::exp(P_.c_3_ * V_eff) - P_.c_4_);
+}
+
+double
+nest::swta_neuron_dbl_exp::compute_p_spike_( double rate ) const
+{
+  return P_.fast_rate_ ? swtamodule_ns::fast_neg_expm1( rate * V_.h_sec_ )
+                       : -numerics::expm1( -rate * V_.h_ * 1e-3 );
+}
+
+double
+nest::swta_neuron_dbl_exp::compute_V_bound_() const
+{
+  // without input both exponentials of the PSP decay towards 0, so each
+  // one contributes at most its current value if this raises V
+  double V_bound = std::max( P_.z_scale_ * S_.u_fall_, 0.0 )
+    + std::max( -P_.z_scale_ * S_.u_rise_, 0.0 )
+    + P_.I_scale_ * ( S_.y0_ + P_.I_e_ );
+
+  // elements of E_sfa decay towards 0 as well, only negative ones can
+  // raise V' later
+  double neg_q = 0.0;
+  for ( unsigned int i = 0; i < S_.q_elems_.size(); i++ )
+  {
+    neg_q -= std::min( S_.q_elems_[ i ], 0.0 );
+  }
+  if ( P_.E_sfa_clip_ )
+  {
+    if ( P_.E_sfa_max_ < 0. )
+    {
+      neg_q = std::min( neg_q, -P_.E_sfa_max_ );
+    }
+    else if ( P_.E_sfa_max_ > 0. )
+    {
+      neg_q = std::max( neg_q, -P_.E_sfa_max_ );
+    }
+  }
+
+  return V_bound + neg_q;
+}
+
+void
+nest::swta_neuron_dbl_exp::draw_candidate_( double V_max )
+{
+  S_.V_max_ = V_max;
+  const double rate_max = compute_rate_( V_max );
+  S_.p_max_ = rate_max > 0.0 ? compute_p_spike_( rate_max ) : 0.0;
+
+  if ( S_.p_max_ <= 0.0 )
+  {
+    // no spikes possible until input raises the bound
+    S_.candidate_ = std::numeric_limits< long >::max();
+    return;
+  }
+
+  // number of steps before the candidate is geometric with parameter p_max:
+  // P( gap >= k ) = P( U <= ( 1 - p_max )^k ) = ( 1 - p_max )^k
+  const double gap =
+    std::log( V_.rng_->drandpos() ) / std::log1p( -S_.p_max_ );
+  S_.candidate_ = gap < static_cast< double >( std::numeric_limits< long >::max() )
+    ? static_cast< long >( gap )
+    : std::numeric_limits< long >::max();
+}
+
+bool
+nest::swta_neuron_dbl_exp::thinning_spike_( double V_eff )
+{
+  // input can raise V' above the bound of the pending candidate, it is
+  // drawn again then (memoryless)
+  const double V_bound = compute_V_bound_();
+  if ( S_.candidate_ < 0 || V_bound > S_.V_max_ )
+  {
+    draw_candidate_( V_bound + P_.thinning_margin_ );
+  }
+
+  if ( S_.candidate_ > 0 )
+  {
+    --S_.candidate_;
+    return false;
+  }
+
+  // candidate step: accept with p_spike / p_max, the next candidate is drawn
+  // from the bound of the state of the next step
+  S_.candidate_ = -1;
+  const double rate = compute_rate_( V_eff );
+  if ( rate <= 0.0 )
+  {
+    return false;
+  }
+  return V_.rng_->drand() * S_.p_max_ <= compute_p_spike_( rate );
+}
+
 void
 nest::swta_neuron_dbl_exp::handle( SpikeEvent& e )
 {
@@ -85,7 +85,41 @@ namespace nest
   E_sfa_clip        bool   - Use the max value for E_sfa?
   E_sfa_max         double - Maximum or minimum allow value for E_sfa,
                              depending on sign of q_sfa.
-
+  fast_rate         bool   - Use the fast path for rate and spike
+                             probability: constants are precomputed, exp is
+                             skipped for purely linear transfer functions
+                             (c_2 = 0) and evaluated with a table based
+                             approximation otherwise (relative error < 1e-10,
+                             see fast_math.h).
+  thinning          bool   - Sample spikes by thinning instead of drawing a
+                             random number in each step, see below.
+  thinning_margin   double - Headroom in mV added to the bound of the
+                             membrane potential when candidates are drawn.
+
+
+  Thinning:
+
+  With dead_time > 0 the neuron spikes in a non-refractory step with
+  probability p = 1 - exp(-rho * h). With thinning = true it does not draw a
+  random number in each step. Without input, u_rise, u_fall and all elements
+  of E_sfa decay towards 0, so
+
+      V_max = max(z_scale * u_fall, 0) + max(-z_scale * u_rise, 0)
+              + I_scale * (I + I_e) + sum_i max(-E_sfa_i, 0)   (+ clipping)
+
+  bounds V' until the next input, and p_max = p(rho(V_max)) bounds p. The
+  next candidate step is drawn with one uniform variate from the geometric
+  distribution with parameter p_max, and a candidate is accepted with
+  probability p / p_max. When input raises the bound above V_max of the
+  pending candidate, the candidate is drawn again (the geometric
+  distribution is memoryless), after each candidate the bound is computed
+  from the current state. Spikes have the same distribution as with the per
+  step sampler, while random numbers (and evaluations of the transfer
+  function) scale with the number of candidates instead of the number of
+  steps. thinning_margin trades redraws after small inputs for rejected
+  candidates. The rate has to increase with V' (c_1, c_2 >= 0). With
+  dead_time = 0 spikes are drawn from the Poisson distribution in each step
+  as before.
 
   Sends: SpikeEvent
 
@@ -213,6 +247,15 @@ private:
     /** Maximum or minimum allow value for E_sfa, depending on sign. */
     double E_sfa_max_;
 
+    /** Use precomputed constants and approximated exp for the rate? */
+    bool fast_rate_;
+
+    /** Sample spikes by thinning instead of one draw per step? */
+    bool thinning_;
+
+    /** Headroom in mV of the membrane potential bound of thinning. */
+    double thinning_margin_;
+
     Parameters_(); //!< Sets default parameter values
 
     void get( DictionaryDatum& ) const; //!< Store current values in dictionary
@@ -239,6 +282,11 @@ private:
 
     int r_; //!< Number of refractory steps remaining
 
+    //! Thinning: steps before the next candidate, -1 if none is drawn
+    long candidate_;
+    double V_max_; //!< Thinning: bound of V' of the pending candidate
+    double p_max_; //!< Thinning: bound of spike probability per step
+
     bool initialized_; //!< it is true if the vectors are initialized
 
     State_(); //!< Default initialization
@@ -286,8 +334,31 @@ private:
     librandom::GammaRandomDev gamma_dev_;     //!< random deviate generator
 
     int DeadTimeCounts_;
+
+    // constants of the fast rate path
+    double h_sec_;       //!< simulation time step in s, converts rate to mean
+    double c_2_c_4_;     //!< offset of exponential part, c_2 * c_4
+    bool linear_rate_;   //!< transfer function has no exponential part
   };
 
+  //! Rate of the fast path, see fast_rate parameter
+  double compute_fast_rate_( double V_eff ) const;
+
+  //! Rate of effective membrane potential (fast or exact path)
+  double compute_rate_( double V_eff ) const;
+
+  //! Probability to spike in one step with rate (fast or exact path)
+  double compute_p_spike_( double rate ) const;
+
+  //! Bound of V' until the next input, see thinning
+  double compute_V_bound_() const;
+
+  //! Draws the next thinning candidate for bound V_max of V'
+  void draw_candidate_( double V_max );
+
+  //! Thinning step of a non-refractory neuron, returns true to spike
+  bool thinning_spike_( double V_eff );
+
   // Access functions for UniversalDataLogger -----------------------
 
   //! Read out the real membrane potential
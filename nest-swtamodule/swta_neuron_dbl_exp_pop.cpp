@@ -0,0 +1,957 @@
+/*
+ *  swta_neuron_dbl_exp_pop.cpp
+ *
+ *  swta_neuron_dbl_exp_pop: swta_neuron_dbl_exp with the state of all
+ *  neurons of a population in contiguous arrays.
+ */
+
+#include "swta_neuron_dbl_exp_pop.h"
+
+#include "fast_math.h"
+
+// C++ includes:
+#include <algorithm>
+#include <cmath>
+#include <limits>
+
+// Includes from librandom:
+#include "poisson_randomdev.h"
+
+// Includes from libnestutil:
+#include "compose.hpp"
+#include "numerics.h"
+
+// Includes from nestkernel:
+#include "event_delivery_manager_impl.h"
+#include "exceptions.h"
+#include "kernel_manager.h"
+#include "universal_data_logger_impl.h"
+
+// Includes from sli:
+#include "arraydatum.h"
+#include "dict.h"
+#include "dictutils.h"
+#include "doubledatum.h"
+#include "integerdatum.h"
+
+namespace nest
+{
+
+/* ----------------------------------------------------------------
+ * Population: state arrays and update of all neurons
+ * ---------------------------------------------------------------- */
+
+class swta_neuron_dbl_exp_pop::Population_
+{
+public:
+  Population_( thread t, const Parameters_& p );
+
+  const Parameters_ P_; //!< Parameters of all neurons
+  const thread thread_; //!< Thread of all neurons
+
+  //! Adds neuron with state s, returns its index
+  size_t add( swta_neuron_dbl_exp_pop* node, const State_& s );
+
+  //! Removes neuron, its index is not used again
+  void remove( size_t i );
+
+  //! Number of neurons in the population
+  size_t count() const
+  {
+    return n_members_;
+  }
+
+  State_ get_state( size_t i ) const;
+  void set_state( size_t i, const State_& s );
+
+  //! Clears input buffered for neuron i
+  void clear_input( size_t i );
+
+  void
+  add_spike( size_t i, long steps, double w )
+  {
+    spikes_[ kernel().event_delivery_manager.get_modulo( steps ) * size_ + i ] += w;
+  }
+
+  void
+  add_current( size_t i, long steps, double c )
+  {
+    currents_[ kernel().event_delivery_manager.get_modulo( steps ) * size_ + i ] += c;
+  }
+
+  //! Called by calibrate of each neuron i
+  void calibrate( size_t i, bool recorded );
+
+  //! Updates all neurons, only the first call in a slice does the work
+  void update( Time const& origin, const long from, const long to );
+
+  double
+  get_V_m( size_t i ) const
+  {
+    return y3_[ i ];
+  }
+
+  double
+  get_E_sfa( size_t i ) const
+  {
+    return q_[ i ];
+  }
+
+private:
+  //! Changes number of neurons and input slots, keeps state and input
+  void resize_( size_t size, size_t slots );
+
+  //! Spike probability (mean number of spikes without dead time)
+  double spike_probability_( double V_eff ) const;
+
+  //! Handles spike of neuron i in step lag
+  void spike_( size_t i, unsigned long n_spikes, Time const& origin, long lag );
+
+  std::vector< swta_neuron_dbl_exp_pop* > members_; //!< Nodes, 0 if removed
+  size_t size_;                                    //!< Length of arrays
+  size_t n_members_;                               //!< Neurons not removed
+
+  // state of the neurons, index of neuron
+  std::vector< double > y0_;
+  std::vector< double > y3_;
+  std::vector< double > q_;
+  std::vector< double > u_rise_;
+  std::vector< double > u_fall_;
+  std::vector< long > r_;
+  std::vector< double > q_elems_; //!< [ element ][ neuron ]
+
+  // input of the neurons, [ slot ][ neuron ], slots as RingBuffer
+  std::vector< double > spikes_;
+  std::vector< double > currents_;
+  size_t slots_;
+
+  std::vector< double > p_spike_; //!< Spike probabilities of current step
+
+  std::vector< bool > is_recorded_; //!< Neurons with multimeters
+  std::vector< size_t > recorded_;  //!< Indices of neurons with multimeters
+  bool recorded_changed_;
+
+  // internal variables as in swta_neuron_dbl_exp
+  double h_;
+  double h_sec_;
+  double u_rise_dt_;
+  double u_fall_dt_;
+  std::vector< double > Q33_;
+  double c_2_c_4_;
+  bool linear_rate_;
+  bool poisson_; //!< Poisson number of spikes (dead_time = 0)
+  long dead_time_counts_;
+
+  librandom::RngPtr rng_;
+  librandom::PoissonRandomDev poisson_dev_;
+
+  long updated_to_; //!< End of the last updated slice
+};
+
+nest::swta_neuron_dbl_exp_pop::Population_::Population_( thread t,
+  const Parameters_& p )
+  : P_( p )
+  , thread_( t )
+  , size_( 0 )
+  , n_members_( 0 )
+  , slots_( 0 )
+  , recorded_changed_( false )
+  , updated_to_( std::numeric_limits< long >::min() )
+{
+}
+
+size_t
+nest::swta_neuron_dbl_exp_pop::Population_::add( swta_neuron_dbl_exp_pop* node,
+  const State_& s )
+{
+  const size_t i = size_;
+  resize_( size_ + 1,
+    kernel().connection_manager.get_min_delay()
+      + kernel().connection_manager.get_max_delay() );
+  members_[ i ] = node;
+  ++n_members_;
+  set_state( i, s );
+  return i;
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::Population_::remove( size_t i )
+{
+  members_[ i ] = 0;
+  is_recorded_[ i ] = false;
+  recorded_changed_ = true;
+  --n_members_;
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::Population_::resize_( size_t size, size_t slots )
+{
+  const size_t n = std::min( size, size_ );
+
+  // arrays of neurons keep their values
+  members_.resize( size, 0 );
+  y0_.resize( size, 0.0 );
+  y3_.resize( size, 0.0 );
+  q_.resize( size, 0.0 );
+  u_rise_.resize( size, 0.0 );
+  u_fall_.resize( size, 0.0 );
+  r_.resize( size, 0 );
+  p_spike_.resize( size, 0.0 );
+  is_recorded_.resize( size, false );
+
+  // arrays laid out by neuron are copied
+  const size_t n_sfa = P_.tau_sfa_.size();
+  std::vector< double > q_elems( n_sfa * size, 0.0 );
+  for ( size_t j = 0; j < n_sfa; ++j )
+  {
+    std::copy( q_elems_.begin() + j * size_,
+      q_elems_.begin() + j * size_ + n,
+      q_elems.begin() + j * size );
+  }
+  q_elems_.swap( q_elems );
+
+  std::vector< double > spikes( slots * size, 0.0 );
+  std::vector< double > currents( slots * size, 0.0 );
+  if ( slots == slots_ )
+  {
+    // otherwise slots do not match, RingBuffer loses its input as well
+    for ( size_t s = 0; s < slots; ++s )
+    {
+      std::copy( spikes_.begin() + s * size_,
+        spikes_.begin() + s * size_ + n,
+        spikes.begin() + s * size );
+      std::copy( currents_.begin() + s * size_,
+        currents_.begin() + s * size_ + n,
+        currents.begin() + s * size );
+    }
+  }
+  spikes_.swap( spikes );
+  currents_.swap( currents );
+
+  size_ = size;
+  slots_ = slots;
+  recorded_changed_ = true;
+}
+
+nest::swta_neuron_dbl_exp_pop::State_
+nest::swta_neuron_dbl_exp_pop::Population_::get_state( size_t i ) const
+{
+  State_ s;
+  s.y0_ = y0_[ i ];
+  s.y3_ = y3_[ i ];
+  s.q_ = q_[ i ];
+  s.u_rise_ = u_rise_[ i ];
+  s.u_fall_ = u_fall_[ i ];
+  s.r_ = r_[ i ];
+  s.q_elems_.resize( P_.tau_sfa_.size() );
+  for ( size_t j = 0; j < s.q_elems_.size(); ++j )
+  {
+    s.q_elems_[ j ] = q_elems_[ j * size_ + i ];
+  }
+  return s;
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::Population_::set_state( size_t i, const State_& s )
+{
+  y0_[ i ] = s.y0_;
+  y3_[ i ] = s.y3_;
+  q_[ i ] = s.q_;
+  u_rise_[ i ] = s.u_rise_;
+  u_fall_[ i ] = s.u_fall_;
+  r_[ i ] = s.r_;
+  // elements of adaptation of other parameters start at 0
+  for ( size_t j = 0; j < P_.tau_sfa_.size(); ++j )
+  {
+    q_elems_[ j * size_ + i ] = j < s.q_elems_.size() ? s.q_elems_[ j ] : 0.0;
+  }
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::Population_::clear_input( size_t i )
+{
+  for ( size_t s = 0; s < slots_; ++s )
+  {
+    spikes_[ s * size_ + i ] = 0.0;
+    currents_[ s * size_ + i ] = 0.0;
+  }
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::Population_::calibrate( size_t i, bool recorded )
+{
+  h_ = Time::get_resolution().get_ms();
+  h_sec_ = h_ * 1e-3;
+  rng_ = kernel().rng_manager.get_rng( thread_ );
+
+  u_rise_dt_ = std::exp( -h_ / P_.tau_r_ );
+  u_fall_dt_ = std::exp( -h_ / P_.tau_f_ );
+  Q33_.resize( P_.tau_sfa_.size() );
+  for ( size_t j = 0; j < Q33_.size(); ++j )
+  {
+    Q33_[ j ] = std::exp( -h_ / P_.tau_sfa_[ j ] );
+  }
+
+  c_2_c_4_ = P_.c_2_ * P_.c_4_;
+  linear_rate_ = ( P_.c_2_ == 0.0 );
+
+  const double dead_time =
+    ( P_.dead_time_ != 0 && P_.dead_time_ < h_ ) ? h_ : P_.dead_time_;
+  poisson_ = ( dead_time == 0.0 );
+  dead_time_counts_ = Time( Time::ms( dead_time ) ).get_steps();
+
+  // delays may have changed since the neurons were added
+  const size_t slots = kernel().connection_manager.get_min_delay()
+    + kernel().connection_manager.get_max_delay();
+  if ( slots != slots_ )
+  {
+    resize_( size_, slots );
+  }
+
+  if ( is_recorded_[ i ] != recorded )
+  {
+    is_recorded_[ i ] = recorded;
+    recorded_changed_ = true;
+  }
+
+  // next update is done even if the time of the slice repeats
+  updated_to_ = std::numeric_limits< long >::min();
+}
+
+double
+nest::swta_neuron_dbl_exp_pop::Population_::spike_probability_( double V_eff ) const
+{
+  double rate;
+  if ( linear_rate_ )
+  {
+    rate = P_.c_1_ * V_eff;
+  }
+  else
+  {
+    const double e = P_.fast_rate_ ? swtamodule_ns::fast_exp( P_.c_3_ * V_eff )
+                                   : std::exp( P_.c_3_ * V_eff );
+    rate = P_.c_1_ * V_eff + P_.c_2_ * e - c_2_c_4_;
+  }
+
+  if ( rate <= 0.0 )
+  {
+    return 0.0;
+  }
+  if ( poisson_ )
+  {
+    return rate * h_sec_;
+  }
+  return P_.fast_rate_ ? swtamodule_ns::fast_neg_expm1( rate * h_sec_ )
+                       : -numerics::expm1( -rate * h_sec_ );
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::Population_::spike_( size_t i,
+  unsigned long n_spikes,
+  Time const& origin,
+  long lag )
+{
+  r_[ i ] = dead_time_counts_ - 1;
+
+  for ( size_t j = 0; j < Q33_.size(); ++j )
+  {
+    q_elems_[ j * size_ + i ] += P_.q_sfa_[ j ] * n_spikes;
+  }
+
+  // the spike is sent by the node of the neuron
+  swta_neuron_dbl_exp_pop& node = *members_[ i ];
+  SpikeEvent se;
+  se.set_multiplicity( n_spikes );
+  kernel().event_delivery_manager.send( node, se, lag );
+
+  // set spike time for STDP to work,
+  // see https://github.com/nest/nest-simulator/issues/77
+  for ( unsigned long k = 0; k < n_spikes; k++ )
+  {
+    node.set_spiketime( Time::step( origin.get_steps() + lag + 1 ) );
+  }
+
+  if ( P_.with_reset_ )
+  {
+    y3_[ i ] = P_.V_reset_;
+  }
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::Population_::update( Time const& origin,
+  const long from,
+  const long to )
+{
+  // the first neuron updated in a slice updates all neurons
+  if ( origin.get_steps() + to == updated_to_ )
+  {
+    return;
+  }
+  updated_to_ = origin.get_steps() + to;
+
+  if ( recorded_changed_ )
+  {
+    recorded_.clear();
+    for ( size_t i = 0; i < size_; ++i )
+    {
+      if ( is_recorded_[ i ] )
+      {
+        recorded_.push_back( i );
+      }
+    }
+    recorded_changed_ = false;
+  }
+
+  const size_t n = size_;
+  const size_t n_sfa = Q33_.size();
+
+  for ( long lag = from; lag < to; ++lag )
+  {
+    const size_t slot = kernel().event_delivery_manager.get_modulo( lag );
+    double* const spikes = &spikes_[ slot * n ];
+    double* const currents = &currents_[ slot * n ];
+
+    // advance PSPs and membrane potentials
+    for ( size_t i = 0; i < n; ++i )
+    {
+      u_rise_[ i ] = u_rise_[ i ] * u_rise_dt_ + spikes[ i ];
+      u_fall_[ i ] = u_fall_[ i ] * u_fall_dt_ + spikes[ i ];
+      spikes[ i ] = 0.0;
+      y3_[ i ] = P_.z_scale_ * ( u_fall_[ i ] - u_rise_[ i ] )
+        + P_.I_scale_ * ( y0_[ i ] + P_.I_e_ );
+    }
+
+    // calculate new E_sfa, one pass per element of adaptation
+    std::fill( q_.begin(), q_.end(), 0.0 );
+    for ( size_t j = 0; j < n_sfa; ++j )
+    {
+      double* const q_elems = &q_elems_[ j * n ];
+      const double decay = Q33_[ j ];
+      for ( size_t i = 0; i < n; ++i )
+      {
+        q_elems[ i ] *= decay;
+        q_[ i ] += q_elems[ i ];
+      }
+    }
+
+    // clip E_sfa according to settings, as swta_neuron_dbl_exp
+    if ( P_.E_sfa_clip_ && P_.E_sfa_max_ < 0. )
+    {
+      for ( size_t i = 0; i < n; ++i )
+      {
+        q_[ i ] = std::max( q_[ i ], P_.E_sfa_max_ );
+      }
+    }
+    else if ( P_.E_sfa_clip_ && P_.E_sfa_max_ > 0. )
+    {
+      for ( size_t i = 0; i < n; ++i )
+      {
+        q_[ i ] = std::min( q_[ i ], P_.E_sfa_max_ );
+      }
+    }
+
+    for ( size_t i = 0; i < n; ++i )
+    {
+      p_spike_[ i ] = spike_probability_( y3_[ i ] - q_[ i ] );
+    }
+
+    // random numbers are drawn for neurons not in dead time
+    for ( size_t i = 0; i < n; ++i )
+    {
+      if ( r_[ i ] > 0 )
+      {
+        --r_[ i ];
+        continue;
+      }
+      if ( p_spike_[ i ] <= 0.0 || members_[ i ] == 0 )
+      {
+        continue;
+      }
+
+      unsigned long n_spikes;
+      if ( poisson_ )
+      {
+        poisson_dev_.set_lambda( p_spike_[ i ] );
+        n_spikes = poisson_dev_.ldev( rng_ );
+      }
+      else
+      {
+        n_spikes = rng_->drand() <= p_spike_[ i ] ? 1 : 0;
+      }
+
+      if ( n_spikes > 0 )
+      {
+        spike_( i, n_spikes, origin, lag );
+      }
+    }
+
+    // set new input currents
+    for ( size_t i = 0; i < n; ++i )
+    {
+      y0_[ i ] = currents[ i ];
+      currents[ i ] = 0.0;
+    }
+
+    // voltage logging
+    for ( size_t k = 0; k < recorded_.size(); ++k )
+    {
+      members_[ recorded_[ k ] ]->B_.logger_.record_data( origin.get_steps() + lag );
+    }
+  }
+}
+
+/* ----------------------------------------------------------------
+ * Registry of populations
+ * ---------------------------------------------------------------- */
+
+std::vector< std::vector< swta_neuron_dbl_exp_pop::Population_* > >
+  swta_neuron_dbl_exp_pop::populations_;
+
+swta_neuron_dbl_exp_pop::Population_*
+swta_neuron_dbl_exp_pop::get_population_( thread t, const Parameters_& p )
+{
+  Population_* population = 0;
+#pragma omp critical( swta_neuron_dbl_exp_pop_registry )
+  {
+    if ( populations_.size() <= static_cast< size_t >( t ) )
+    {
+      populations_.resize( t + 1 );
+    }
+    std::vector< Population_* >& thread_populations = populations_[ t ];
+    for ( size_t k = 0; k < thread_populations.size(); ++k )
+    {
+      if ( thread_populations[ k ]->P_ == p )
+      {
+        population = thread_populations[ k ];
+        break;
+      }
+    }
+    if ( population == 0 )
+    {
+      population = new Population_( t, p );
+      thread_populations.push_back( population );
+    }
+  }
+  return population;
+}
+
+void
+swta_neuron_dbl_exp_pop::release_population_( Population_* population )
+{
+  if ( population->count() > 0 )
+  {
+    return;
+  }
+#pragma omp critical( swta_neuron_dbl_exp_pop_registry )
+  {
+    std::vector< Population_* >& thread_populations =
+      populations_[ population->thread_ ];
+    thread_populations.erase( std::find(
+      thread_populations.begin(), thread_populations.end(), population ) );
+  }
+  delete population;
+}
+
+/* ----------------------------------------------------------------
+ * Recordables map
+ * ---------------------------------------------------------------- */
+
+RecordablesMap< swta_neuron_dbl_exp_pop > swta_neuron_dbl_exp_pop::recordablesMap_;
+
+template <>
+void
+RecordablesMap< swta_neuron_dbl_exp_pop >::create()
+{
+  // use standard names whereever you can for consistency!
+  insert_( names::V_m, &swta_neuron_dbl_exp_pop::get_V_m_ );
+  insert_( names::E_sfa, &swta_neuron_dbl_exp_pop::get_E_sfa_ );
+}
+
+/* ----------------------------------------------------------------
+ * Default constructors defining default parameters and state
+ * ---------------------------------------------------------------- */
+
+nest::swta_neuron_dbl_exp_pop::Parameters_::Parameters_()
+  : tau_r_( 1.0 )           // ms
+  , tau_f_( 10.0 )          // ms
+  , dead_time_( 1.0 )       // ms
+  , with_reset_( true )
+  , tau_sfa_()
+  , q_sfa_()
+  , c_1_( 0.0 )             // Hz / mV
+  , c_2_( 1.238 )           // Hz / mV
+  , c_3_( 0.25 )            // 1.0 / mV
+  , c_4_( 1.0 )             // 1.0 / mV
+  , I_e_( 0.0 )             // pA
+  , V_reset_( 0.0 )         // mV
+  , z_scale_( 1.0 )         // mV
+  , I_scale_( 1.0 )         // mV / pA
+  , t_ref_remaining_( 0.0 ) // ms
+  , E_sfa_clip_( false )
+  , E_sfa_max_( 0.0 )       // mV
+  , fast_rate_( false )
+{
+}
+
+nest::swta_neuron_dbl_exp_pop::State_::State_()
+  : y0_( 0.0 )
+  , y3_( 0.0 )
+  , q_( 0.0 )
+  , u_rise_( 0.0 )
+  , u_fall_( 0.0 )
+  , q_elems_()
+  , r_( 0 )
+{
+}
+
+/* ----------------------------------------------------------------
+ * Parameter and state extractions and manipulation functions
+ * ---------------------------------------------------------------- */
+
+bool
+nest::swta_neuron_dbl_exp_pop::Parameters_::operator==( const Parameters_& p ) const
+{
+  return tau_r_ == p.tau_r_ && tau_f_ == p.tau_f_ && dead_time_ == p.dead_time_
+    && with_reset_ == p.with_reset_ && tau_sfa_ == p.tau_sfa_
+    && q_sfa_ == p.q_sfa_ && c_1_ == p.c_1_ && c_2_ == p.c_2_ && c_3_ == p.c_3_
+    && c_4_ == p.c_4_ && I_e_ == p.I_e_ && V_reset_ == p.V_reset_
+    && z_scale_ == p.z_scale_ && I_scale_ == p.I_scale_
+    && t_ref_remaining_ == p.t_ref_remaining_ && E_sfa_clip_ == p.E_sfa_clip_
+    && E_sfa_max_ == p.E_sfa_max_ && fast_rate_ == p.fast_rate_;
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::Parameters_::get( DictionaryDatum& d ) const
+{
+  def< double >( d, names::I_e, I_e_ );
+  def< double >( d, "tau_r", tau_r_ );
+  def< double >( d, "tau_f", tau_f_ );
+  def< double >( d, names::dead_time, dead_time_ );
+  def< bool >( d, names::with_reset, with_reset_ );
+
+  def< double >( d, names::c_1, c_1_ );
+  def< double >( d, names::c_2, c_2_ );
+  def< double >( d, names::c_3, c_3_ );
+  def< double >( d, "c_4", c_4_ );
+  def< double >( d, names::V_reset, V_reset_ );
+  def< double >( d, "z_scale", z_scale_ );
+  def< double >( d, "I_scale", I_scale_ );
+  def< bool >( d, "E_sfa_clip", E_sfa_clip_ );
+  def< double >( d, "E_sfa_max", E_sfa_max_ );
+  def< bool >( d, "fast_rate", fast_rate_ );
+  def< double >( d, names::t_ref_remaining, t_ref_remaining_ );
+
+  ArrayDatum tau_sfa_list_ad( tau_sfa_ );
+  def< ArrayDatum >( d, names::tau_sfa, tau_sfa_list_ad );
+
+  ArrayDatum q_sfa_list_ad( q_sfa_ );
+  def< ArrayDatum >( d, names::q_sfa, q_sfa_list_ad );
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::Parameters_::set( const DictionaryDatum& d )
+{
+  updateValue< double >( d, names::I_e, I_e_ );
+  updateValue< double >( d, "tau_r", tau_r_ );
+  updateValue< double >( d, "tau_f", tau_f_ );
+  updateValue< double >( d, names::dead_time, dead_time_ );
+  updateValue< bool >( d, names::with_reset, with_reset_ );
+  updateValue< double >( d, names::c_1, c_1_ );
+  updateValue< double >( d, names::c_2, c_2_ );
+  updateValue< double >( d, names::c_3, c_3_ );
+  updateValue< double >( d, "c_4", c_4_ );
+  updateValue< double >( d, names::V_reset, V_reset_ );
+  updateValue< double >( d, "z_scale", z_scale_ );
+  updateValue< double >( d, "I_scale", I_scale_ );
+  updateValue< bool >( d, "E_sfa_clip", E_sfa_clip_ );
+  updateValue< double >( d, "E_sfa_max", E_sfa_max_ );
+  updateValue< bool >( d, "fast_rate", fast_rate_ );
+  updateValue< double >( d, names::t_ref_remaining, t_ref_remaining_ );
+
+  try
+  {
+    updateValue< std::vector< double > >( d, names::tau_sfa, tau_sfa_ );
+    updateValue< std::vector< double > >( d, names::q_sfa, q_sfa_ );
+  }
+  catch ( TypeMismatch e )
+  {
+    // single element of adaptation given as number
+    double tau_sfa_temp_;
+    double q_sfa_temp_;
+    if ( updateValue< double >( d, names::tau_sfa, tau_sfa_temp_ ) )
+    {
+      tau_sfa_.assign( 1, tau_sfa_temp_ );
+    }
+    if ( updateValue< double >( d, names::q_sfa, q_sfa_temp_ ) )
+    {
+      q_sfa_.assign( 1, q_sfa_temp_ );
+    }
+  }
+
+  if ( tau_sfa_.size() != q_sfa_.size() )
+  {
+    throw BadProperty( String::compose(
+      "'tau_sfa' and 'q_sfa' need to have the same dimension.\nSize of "
+      "tau_sfa: %1\nSize of q_sfa: %2",
+      tau_sfa_.size(),
+      q_sfa_.size() ) );
+  }
+
+  if ( dead_time_ < 0 )
+  {
+    throw BadProperty( "Absolute refractory time must not be negative." );
+  }
+
+  bool dead_time_random = false;
+  updateValue< bool >( d, names::dead_time_random, dead_time_random );
+  if ( dead_time_random )
+  {
+    throw BadProperty(
+      "swta_neuron_dbl_exp_pop does not support random dead times, use "
+      "swta_neuron_dbl_exp." );
+  }
+
+  if ( tau_r_ <= 0 || tau_f_ <= 0 )
+  {
+    throw BadProperty( "All time constants must be strictly positive." );
+  }
+
+  for ( unsigned int i = 0; i < tau_sfa_.size(); i++ )
+  {
+    if ( tau_sfa_[ i ] <= 0 )
+    {
+      throw BadProperty( "All time constants must be strictly positive." );
+    }
+  }
+
+  if ( t_ref_remaining_ < 0 )
+  {
+    throw BadProperty( "Remaining refractory time can not be negative." );
+  }
+
+  if ( c_3_ < 0 )
+  {
+    throw BadProperty( "c_3 must be positive." );
+  }
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::State_::get( DictionaryDatum& d ) const
+{
+  def< double >( d, names::V_m, y3_ );  // Membrane potential
+  def< double >( d, names::E_sfa, q_ ); // Adaptive threshold potential
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::State_::set( const DictionaryDatum& d )
+{
+  updateValue< double >( d, names::V_m, y3_ );
+  updateValue< double >( d, names::E_sfa, q_ );
+}
+
+nest::swta_neuron_dbl_exp_pop::Buffers_::Buffers_( swta_neuron_dbl_exp_pop& n )
+  : logger_( n )
+{
+}
+
+nest::swta_neuron_dbl_exp_pop::Buffers_::Buffers_( const Buffers_&,
+  swta_neuron_dbl_exp_pop& n )
+  : logger_( n )
+{
+}
+
+/* ----------------------------------------------------------------
+ * Default and copy constructor and destructor for node
+ * ---------------------------------------------------------------- */
+
+nest::swta_neuron_dbl_exp_pop::swta_neuron_dbl_exp_pop()
+  : Archiving_Node()
+  , P_()
+  , S_()
+  , B_( *this )
+  , population_( 0 )
+  , index_( 0 )
+  , recorded_( false )
+{
+  recordablesMap_.create();
+}
+
+nest::swta_neuron_dbl_exp_pop::swta_neuron_dbl_exp_pop(
+  const swta_neuron_dbl_exp_pop& n )
+  : Archiving_Node( n )
+  , P_( n.P_ )
+  , S_( n.get_state_() )
+  , B_( n.B_, *this )
+  , population_( 0 )
+  , index_( 0 )
+  , recorded_( false )
+{
+}
+
+nest::swta_neuron_dbl_exp_pop::~swta_neuron_dbl_exp_pop()
+{
+  if ( population_ != 0 )
+  {
+    deregister_();
+  }
+}
+
+/* ----------------------------------------------------------------
+ * Population membership and status
+ * ---------------------------------------------------------------- */
+
+void
+nest::swta_neuron_dbl_exp_pop::register_()
+{
+  population_ = get_population_( get_thread(), P_ );
+  index_ = population_->add( this, S_ );
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::deregister_()
+{
+  S_ = population_->get_state( index_ );
+  population_->remove( index_ );
+  release_population_( population_ );
+  population_ = 0;
+}
+
+nest::swta_neuron_dbl_exp_pop::State_
+nest::swta_neuron_dbl_exp_pop::get_state_() const
+{
+  return population_ != 0 ? population_->get_state( index_ ) : S_;
+}
+
+double
+nest::swta_neuron_dbl_exp_pop::get_V_m_() const
+{
+  return population_ != 0 ? population_->get_V_m( index_ ) : S_.y3_;
+}
+
+double
+nest::swta_neuron_dbl_exp_pop::get_E_sfa_() const
+{
+  return population_ != 0 ? population_->get_E_sfa( index_ ) : S_.q_;
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::get_status( DictionaryDatum& d ) const
+{
+  P_.get( d );
+  get_state_().get( d );
+  Archiving_Node::get_status( d );
+  ( *d )[ names::recordables ] = recordablesMap_.get_list();
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::set_status( const DictionaryDatum& d )
+{
+  Parameters_ ptmp = P_;      // temporary copy in case of errors
+  ptmp.set( d );              // throws if BadProperty
+  State_ stmp = get_state_(); // temporary copy in case of errors
+  stmp.set( d );              // throws if BadProperty
+
+  // We now know that (ptmp, stmp) are consistent. We do not
+  // write them back to (P_, S_) before we are also sure that
+  // the properties to be set in the parent class are internally
+  // consistent.
+  Archiving_Node::set_status( d );
+
+  // with new parameters the neuron joins another population at the next
+  // simulation
+  if ( population_ != 0 && not( ptmp == P_ ) )
+  {
+    deregister_();
+  }
+
+  // if we get here, temporaries contain consistent set of properties
+  P_ = ptmp;
+  S_ = stmp;
+  if ( population_ != 0 )
+  {
+    population_->set_state( index_, S_ );
+  }
+}
+
+/* ----------------------------------------------------------------
+ * Node initialization functions
+ * ---------------------------------------------------------------- */
+
+void
+nest::swta_neuron_dbl_exp_pop::init_state_( const Node& proto )
+{
+  const swta_neuron_dbl_exp_pop& pr = downcast< swta_neuron_dbl_exp_pop >( proto );
+  S_ = pr.S_;
+  S_.r_ = Time( Time::ms( P_.t_ref_remaining_ ) ).get_steps();
+  if ( population_ != 0 )
+  {
+    population_->set_state( index_, S_ );
+  }
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::init_buffers_()
+{
+  B_.logger_.reset(); //!< includes resize
+  Archiving_Node::clear_history();
+  if ( population_ != 0 )
+  {
+    population_->clear_input( index_ );
+  }
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::calibrate()
+{
+  B_.logger_.init();
+
+  if ( population_ == 0 )
+  {
+    register_();
+  }
+  population_->calibrate( index_, recorded_ );
+}
+
+/* ----------------------------------------------------------------
+ * Update and spike handling functions
+ */
+
+void
+nest::swta_neuron_dbl_exp_pop::update( Time const& origin,
+  const long from,
+  const long to )
+{
+  assert(
+    to >= 0 && ( delay ) from < kernel().connection_manager.get_min_delay() );
+  assert( from < to );
+
+  population_->update( origin, from, to );
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::handle( SpikeEvent& e )
+{
+  assert( e.get_delay() > 0 );
+
+  population_->add_spike( index_,
+    e.get_rel_delivery_steps( kernel().simulation_manager.get_slice_origin() ),
+    e.get_weight() * e.get_multiplicity() );
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::handle( CurrentEvent& e )
+{
+  assert( e.get_delay() > 0 );
+
+  population_->add_current( index_,
+    e.get_rel_delivery_steps( kernel().simulation_manager.get_slice_origin() ),
+    e.get_weight() * e.get_current() );
+}
+
+void
+nest::swta_neuron_dbl_exp_pop::handle( DataLoggingRequest& e )
+{
+  B_.logger_.handle( e );
+}
+
+} // namespace
@@ -0,0 +1,265 @@
+/*
+ *  swta_neuron_dbl_exp_pop.h
+ */
+
+#ifndef SWTA_NEURON_DBL_EXP_POP_H
+#define SWTA_NEURON_DBL_EXP_POP_H
+
+// C++ includes:
+#include <vector>
+
+// Includes from nestkernel:
+#include "archiving_node.h"
+#include "connection.h"
+#include "event.h"
+#include "nest_types.h"
+#include "universal_data_logger.h"
+
+namespace nest
+{
+
+/* BeginDocumentation
+   Name: swta_neuron_dbl_exp_pop - swta_neuron_dbl_exp whose state is updated
+      for a whole population at once.
+
+  Description:
+
+  Same neuron as swta_neuron_dbl_exp (same parameters and recordables), but
+  the state of the neurons is not kept in the nodes. All nodes of a thread
+  with equal parameters (e.g. the excitatory or inhibitory pool of a
+  network) form a population, which keeps u_rise, u_fall, y3, the input
+  current, E_sfa and its elements, the dead time counters and the input
+  buffers as contiguous arrays. The first node of a population updated in a
+  time slice updates all neurons of the population in one loop over these
+  arrays and sends their spikes, the other nodes only forward their input.
+  Each neuron still is a node with its own GID, so it can be connected,
+  recorded (spike_detector, multimeter) and used with STDP synapses as the
+  single neuron model.
+
+  Random numbers are drawn lag by lag for the whole population, while
+  swta_neuron_dbl_exp draws all lags of a slice node by node. If min_delay
+  is one step both orders agree and spikes equal those of
+  swta_neuron_dbl_exp (for the same seed and update order of the nodes of
+  a thread), with longer slices spikes have the same statistics but differ
+  individually.
+
+  Changing parameters of a node moves it to the population of its new
+  parameters at the next simulation. The state of a neuron is kept.
+
+  Parameters:
+
+  The parameters of swta_neuron_dbl_exp, except dead_time_random,
+  dead_time_shape, thinning and thinning_margin.
+
+  Sends: SpikeEvent
+
+  Receives: SpikeEvent, CurrentEvent, DataLoggingRequest
+
+  SeeAlso: swta_neuron_dbl_exp
+*/
+
+/**
+ * swta_neuron_dbl_exp updated for all neurons of a population at once.
+ */
+class swta_neuron_dbl_exp_pop : public Archiving_Node
+{
+
+public:
+  swta_neuron_dbl_exp_pop();
+  swta_neuron_dbl_exp_pop( const swta_neuron_dbl_exp_pop& );
+  ~swta_neuron_dbl_exp_pop();
+
+  /**
+   * Import sets of overloaded virtual functions.
+   * @see Technical Issues / Virtual Functions: Overriding, Overloading, and
+   * Hiding
+   */
+  using Node::handle;
+  using Node::handles_test_event;
+
+  port send_test_event( Node&, rport, synindex, bool );
+
+  void handle( SpikeEvent& );
+  void handle( CurrentEvent& );
+  void handle( DataLoggingRequest& );
+
+  port handles_test_event( SpikeEvent&, rport );
+  port handles_test_event( CurrentEvent&, rport );
+  port handles_test_event( DataLoggingRequest&, rport );
+
+
+  void get_status( DictionaryDatum& ) const;
+  void set_status( const DictionaryDatum& );
+
+private:
+  void init_state_( const Node& proto );
+  void init_buffers_();
+  void calibrate();
+
+  void update( Time const&, const long, const long );
+
+  // The next two classes need to be friends to access the State_ class/member
+  friend class RecordablesMap< swta_neuron_dbl_exp_pop >;
+  friend class UniversalDataLogger< swta_neuron_dbl_exp_pop >;
+
+  // ----------------------------------------------------------------
+
+  /**
+   * Independent parameters of the model, equal in a population.
+   */
+  struct Parameters_
+  {
+    double tau_r_;           //!< PSP rise time in ms
+    double tau_f_;           //!< PSP fall time in ms
+    double dead_time_;       //!< Dead time in ms
+    bool with_reset_;        //!< Reset the membrane potential after spike?
+    std::vector< double > tau_sfa_; //!< Adaptive threshold time constants in ms
+    std::vector< double > q_sfa_;   //!< Adaptive threshold jumps in mV
+    double c_1_;             //!< Slope of linear part of transfer function
+    double c_2_;             //!< Prefactor of exponential part
+    double c_3_;             //!< Coefficient of exponential non-linearity
+    double c_4_;             //!< Offset coefficient for exponential
+    double I_e_;             //!< External DC current in pA
+    double V_reset_;         //!< Reset value of the membrane potential
+    double z_scale_;         //!< Incoming spike scale factor
+    double I_scale_;         //!< Incoming current scale factor
+    double t_ref_remaining_; //!< Dead time from simulation start
+    bool E_sfa_clip_;        //!< Use the max value for E_sfa?
+    double E_sfa_max_;       //!< Maximum or minimum allowed value of E_sfa
+    bool fast_rate_;         //!< Use approximated exp for the rate?
+
+    Parameters_(); //!< Sets default parameter values
+
+    bool operator==( const Parameters_& ) const;
+
+    void get( DictionaryDatum& ) const; //!< Store current values in dictionary
+    void set( const DictionaryDatum& ); //!< Set values from dictionary
+  };
+
+  // ----------------------------------------------------------------
+
+  /**
+   * State variables of one neuron, kept in the node while it does not
+   * belong to a population.
+   */
+  struct State_
+  {
+    double y0_;     //!< Piecewise constant external current
+    double y3_;     //!< Membrane potential relative to resting potential
+    double q_;      //!< Change of the 'threshold' due to adaptation
+    double u_rise_; //!< Contribution of rise exponential to y3
+    double u_fall_; //!< Contribution of fall exponential to y3
+    std::vector< double > q_elems_; //!< Elements of adaptation
+    long r_;        //!< Number of refractory steps remaining
+
+    State_(); //!< Default initialization
+
+    void get( DictionaryDatum& ) const;
+    void set( const DictionaryDatum& );
+  };
+
+  // ----------------------------------------------------------------
+
+  /**
+   * Buffers of the model, input is buffered by the population.
+   */
+  struct Buffers_
+  {
+    Buffers_( swta_neuron_dbl_exp_pop& );
+    Buffers_( const Buffers_&, swta_neuron_dbl_exp_pop& );
+
+    //! Logger for all analog data
+    UniversalDataLogger< swta_neuron_dbl_exp_pop > logger_;
+  };
+
+  // ----------------------------------------------------------------
+
+  //! State arrays and update of all neurons of a population
+  class Population_;
+
+  //! Population of thread with parameters p, created if there is none
+  static Population_* get_population_( thread, const Parameters_& p );
+
+  //! Deletes population without neurons
+  static void release_population_( Population_* );
+
+  //! Populations of each thread
+  static std::vector< std::vector< Population_* > > populations_;
+
+  //! Adds neuron to population of its thread and parameters
+  void register_();
+
+  //! Removes neuron from its population, its state is copied back to S_
+  void deregister_();
+
+  //! State of the neuron, from its population if it belongs to one
+  State_ get_state_() const;
+
+  // Access functions for UniversalDataLogger -------------------------------
+
+  double get_V_m_() const;
+  double get_E_sfa_() const;
+
+  // ----------------------------------------------------------------
+
+  Parameters_ P_;
+  State_ S_;
+  Buffers_ B_;
+
+  Population_* population_; //!< Population of the neuron, 0 if none
+  size_t index_;            //!< Index of the neuron in its population
+  bool recorded_;           //!< Is a multimeter connected?
+
+  //! Mapping of recordables names to access functions
+  static RecordablesMap< swta_neuron_dbl_exp_pop > recordablesMap_;
+};
+
+inline port
+swta_neuron_dbl_exp_pop::send_test_event( Node& target,
+  rport receptor_type,
+  synindex,
+  bool )
+{
+  SpikeEvent e;
+  e.set_sender( *this );
+
+  return target.handles_test_event( e, receptor_type );
+}
+
+
+inline port
+swta_neuron_dbl_exp_pop::handles_test_event( SpikeEvent&, rport receptor_type )
+{
+  if ( receptor_type != 0 )
+  {
+    throw UnknownReceptorType( receptor_type, get_name() );
+  }
+  return 0;
+}
+
+inline port
+swta_neuron_dbl_exp_pop::handles_test_event( CurrentEvent&, rport receptor_type )
+{
+  if ( receptor_type != 0 )
+  {
+    throw UnknownReceptorType( receptor_type, get_name() );
+  }
+  return 0;
+}
+
+inline port
+swta_neuron_dbl_exp_pop::handles_test_event( DataLoggingRequest& dlr,
+  rport receptor_type )
+{
+  if ( receptor_type != 0 )
+  {
+    throw UnknownReceptorType( receptor_type, get_name() );
+  }
+  // the population logs only neurons with multimeters
+  recorded_ = true;
+  return B_.logger_.connect_logging_device( dlr, recordablesMap_ );
+}
+
+} // namespace
+
+#endif /* #ifndef SWTA_NEURON_DBL_EXP_POP_H */
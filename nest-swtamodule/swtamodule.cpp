@@ -9,7 +9,11 @@
 
 // include headers with your own stuff
 #include "stdp_connection_sem.h"
+#include "stdp_connection_sem_hom.h"
 #include "swta_neuron_dbl_exp.h"
+#include "swta_neuron_dbl_exp_pop.h"
+#include "spike_file_generator.h"
+#include "pattern_poisson_generator.h"
 
 // Includes from nestkernel:
 #include "connection_manager_impl.h"
@@ -91,8 +95,14 @@ swtamodule_ns::SWTAModule::init( SLIInterpreter* i )
 {
   // register neuron models
   nest::kernel().model_manager.register_node_model<swta_neuron_dbl_exp>("swta_neuron_dbl_exp");
+  nest::kernel().model_manager.register_node_model<swta_neuron_dbl_exp_pop>("swta_neuron_dbl_exp_pop");
+
+  // register devices
+  nest::kernel().model_manager.register_node_model<spike_file_generator>("spike_file_generator");
+  nest::kernel().model_manager.register_node_model<pattern_poisson_generator>("pattern_poisson_generator");
 
   // register synapse models
   nest::kernel().model_manager.register_connection_model<STDPConnectionSem<nest::TargetIdentifierPtrRport> >("sem_synapse");
+  nest::kernel().model_manager.register_connection_model<STDPConnectionSemHom<nest::TargetIdentifierPtrRport> >("sem_synapse_hom");
 
 } // SWTAModule::init()
@@ -18,6 +18,8 @@ NETWORK_PARAMS = dict(  # overwrite model default settings
 #    learning: enable/disable learning (bool)
 #    result: path to result file (string)
 #    init: path to data file to init model (string)
+#    connectivity: path to result saved with SAVE_CONNECTIVITY, model is connected exactly as in it (string)
+#    spikeFile: path to spike file (eim.spike_file) the input is read from instead of the spikes of data, created from data if missing (string)
 SIMULATION_CHAIN = [
     dict(data="data/training", simTime= 400., learning=True, result="results/training"),
     dict(data="data/testing", simTime= 200., learning=False, result="results/testing", init="results/training")
@@ -30,10 +32,19 @@ SIMULATION_CHAIN = [
 
 DT = 0.001                                               # simulation time step in sec
 SIMULATION_SEED = 42
+LOCAL_NUM_THREADS = None                                 # number of NEST threads, if None all available cores are used
+CPU_AFFINITY = None                                      # list of cores to pin simulation to, e.g. [0, 1, 2, 3] (None: no pinning)
+REUSE_NETWORK = True                                     # keep network of previous chain entry for entries with init and same number of channels (only input and state are reset)
+SAVE_CONNECTIVITY = False                                # save all connections (sources, targets, weights, delays of each projection) with results
+BATCH_REPLICAS = None                                    # NumPy backend only: list of NETWORK_PARAMS overrides, one replica each, e.g. [dict(GENERAL_SEED=1), dict(GENERAL_SEED=2)]; results are saved as '<result>_<k>'
+INSTRUMENTATION = None                                   # timing spans and counters as JSON lines, e.g. dict(output='instrumentation.jsonl', profile=['simulate'], memory=True)
 
 #################################
 ##   SIMULATION VISUALIZATION  ##
 #################################
 
 SHOW_LEARNING_PROGRESS = True                            # if True show network input weights every 10% of simulation time
+LEARNING_PROGRESS_OUTPUT = None                          # if set, weights are written in background to this file instead of shown, e.g. 'progress_{result}.mp4' or 'progress_{result}_%02d.png'
+WEIGHT_TRAJECTORY = None                                 # record in->e weights of learning runs to disk, e.g. dict(path='{result}_trajectory', interval=10., minChange=None, step=1., dtype='float16', deltas=False)
+MEMBRANE_RECORDING = None                                # record V_m/E_sfa of some neurons to disk, e.g. dict(pool='e', neurons=10, recordables=['V_m', 'E_sfa'], factor=10, mode='mean', segment=1., path='{result}_membrane')
 
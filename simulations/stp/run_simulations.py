@@ -1,9 +1,11 @@
 from eim.settings_loader import GeneralSettings, SimulationSettings, NetworkModelSettings
 from eim.simulation_chain import SimulationChainData
 from eim.simulator import simulate
+from eim import instrument
 
 gs = GeneralSettings()
 ss = SimulationSettings(gs.simulationSettings)
+instrument.configure(ss.instrumentation)
 scs = SimulationChainData(gs, ss.simulationChain)
 ms = NetworkModelSettings(gs, ss.model, ss.modelAdditionalParams)
 
@@ -2,6 +2,7 @@ from eim.settings_loader import GeneralSettings, DataSettings
 from eim.common import DictClass
 from eim.data import loadData
 from eim.spike_train import train_sec2ms
+from eim.spike_store import readWindow
 from figure_helper import plotSTPFig
 import matplotlib.pyplot as plt
 
@@ -29,19 +30,22 @@ pd = train.pd
 patlen = train.patlen
 pc = [(0.0, 0.3, 1.0), (0.0, 0.8, 0.0)]
 
+# only spikes of plotted window and neurons are read (see eim.spike_store), spikes are rounded to ms
+window = ((train_start_time_ms - 0.5) / 1000., (train_end_time_ms + 0.5) / 1000.)
+
 # input neurons spikes
-spikesIN_ms = train_sec2ms(ter.spikes['in'])[::2]  # take every 2nd
+spikesIN_ms = train_sec2ms(readWindow(ter.spikes['in'], *window, channels=range(0, len(ter.spikes['in']), 2)))  # take every 2nd
 
 # excitatory neurons spikes
-spikesE_ms = train_sec2ms(ter.spikes['e'])
 # pattern prefered neurons - spikes
-P1_spikesE_ms = [spikesE_ms[i] for i in anr.nrns_inds_P1]
-P2_spikesE_ms = [spikesE_ms[i] for i in anr.nrns_inds_P2]
+P1_spikesE_ms = train_sec2ms(readWindow(ter.spikes['e'], *window, channels=anr.nrns_inds_P1))
+P2_spikesE_ms = train_sec2ms(readWindow(ter.spikes['e'], *window, channels=anr.nrns_inds_P2))
 #non prefered neurons - subset
-rest_spikesE_ms = [spikesE_ms[i] for i in anr.nrns_nondist][:max_nrns_to_plot - len(P1_spikesE_ms)-len(P2_spikesE_ms)]
+rest_inds = list(anr.nrns_nondist)[:max_nrns_to_plot - len(P1_spikesE_ms)-len(P2_spikesE_ms)]
+rest_spikesE_ms = train_sec2ms(readWindow(ter.spikes['e'], *window, channels=rest_inds))
 
 # inhibitory neurons spikes
-spikesI_ms = train_sec2ms(ter.spikes['i'])[::2]  # take every 2nd
+spikesI_ms = train_sec2ms(readWindow(ter.spikes['i'], *window, channels=range(0, len(ter.spikes['i']), 2)))  # take every 2nd
 
 
 # PLOT FIGURE